@@ -0,0 +1,155 @@
+"""
+Teste de carga das ferramentas assíncronas com várias sessões simultâneas.
+
+Simula N sessões em um mesmo loop de eventos, como no servidor do ADK, cada
+uma fazendo uma sequência de chamadas de ferramentas (identificar usuário,
+buscar, pesquisar, sugerir, emprestar e devolver). Compara as ferramentas
+síncronas chamadas direto no loop com as versões de assincrono.assincrona e
+mede a vazão e o maior atraso do loop de eventos (quanto tempo o loop ficou
+impedido de atender outras sessões).
+
+Uso (a partir da pasta multi_tool_agent):
+
+    python -m benchmarks.carga_async --tamanho 100000 --sessoes 1 8 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+
+from .gerar_banco import RAIZ, gerar_banco
+
+
+async def _medir_atraso_loop(parar: asyncio.Event, intervalo: float = 0.005) -> float:
+    maior = 0.0
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        maior = max(maior, time.perf_counter() - inicio - intervalo)
+    return maior
+
+
+async def _sessao(ferramentas: dict, roteiro: list, modo: str) -> int:
+    chamadas = 0
+    for nome, args in roteiro:
+        funcao = ferramentas[nome]
+        if modo == "async":
+            await funcao(*args)
+        else:
+            funcao(*args)
+            # Um ponto de troca entre chamadas, como o ADK faz entre eventos
+            await asyncio.sleep(0)
+        chamadas += 1
+    return chamadas
+
+
+def _roteiros(caminho: str, sessoes: int, semente: int) -> list:
+    aleatorio = random.Random(semente)
+    with sqlite3.connect(caminho) as conn:
+        maior_livro = conn.execute("SELECT MAX(id) FROM livros").fetchone()[0]
+        maior_usuario = conn.execute("SELECT MAX(id) FROM usuarios").fetchone()[0]
+        roteiros = []
+        for _ in range(sessoes):
+            titulo, autor, genero = conn.execute(
+                "SELECT titulo, autor, genero FROM livros WHERE id = ?", (aleatorio.randint(1, maior_livro),)
+            ).fetchone()
+            nome = conn.execute(
+                "SELECT nome FROM usuarios WHERE id = ?", (aleatorio.randint(1, maior_usuario),)
+            ).fetchone()[0]
+            roteiros.append([
+                ("usuario_existe", (nome,)),
+                ("buscar_livro", (titulo, "")),
+                ("pesquisar_livros", (" ".join(titulo.split()[:2]),)),
+                ("sugerir_livros_por_autor", (autor,)),
+                ("sugerir_livros_por_genero", (genero,)),
+                ("realizar_emprestimo", (titulo, nome)),
+                ("consultar_emprestimos_usuario", (nome,)),
+                ("devolver_livro", (titulo, nome)),
+            ])
+    return roteiros
+
+
+async def _rodar(ferramentas: dict, roteiros: list, modo: str) -> dict:
+    parar = asyncio.Event()
+    monitor = asyncio.create_task(_medir_atraso_loop(parar))
+    await asyncio.sleep(0)
+    inicio = time.perf_counter()
+    chamadas = await asyncio.gather(*(_sessao(ferramentas, roteiro, modo) for roteiro in roteiros))
+    duracao = time.perf_counter() - inicio
+    parar.set()
+    atraso = await monitor
+    return {
+        "modo": modo,
+        "sessoes": len(roteiros),
+        "chamadas": sum(chamadas),
+        "duracao_s": duracao,
+        "vazao_chamadas_s": sum(chamadas) / duracao if duracao else 0.0,
+        "maior_atraso_loop_ms": atraso * 1000,
+    }
+
+
+def executar(tamanho: int, sessoes: list, pasta: str, semente: int = 11) -> dict:
+    sys.path.insert(0, RAIZ)
+    from multi_agents import banco
+    from multi_agents.agent import usuario_existe
+    from multi_agents.assincrono import assincrona
+    from multi_agents.busca import buscar_livro, pesquisar_livros
+    from multi_agents.emprestimo import (
+        acervo_biblioteca, consultar_emprestimos_usuario, devolver_livro, realizar_emprestimo,
+    )
+    from multi_agents.memoria import respostas_ferramentas
+    from multi_agents.sugestor import sugerir_livros_por_autor, sugerir_livros_por_genero
+
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f"biblioteca_{tamanho}.db")
+    if not os.path.exists(caminho):
+        print(f"gerando {caminho}...", file=sys.stderr)
+        gerar_banco(caminho, tamanho)
+    banco.configurar_banco(caminho)
+
+    sincronas = {
+        funcao.__name__: funcao for funcao in (
+            usuario_existe, buscar_livro, pesquisar_livros, sugerir_livros_por_autor,
+            sugerir_livros_por_genero, realizar_emprestimo, consultar_emprestimos_usuario, devolver_livro,
+        )
+    }
+    assincronas = {nome: assincrona(funcao) for nome, funcao in sincronas.items()}
+
+    resultados = []
+    for quantidade in sessoes:
+        roteiros = _roteiros(caminho, quantidade, semente)
+        for modo, ferramentas in (("sync", sincronas), ("async", assincronas)):
+            # Os dois modos começam com os caches vazios
+            acervo_biblioteca.limpar()
+            respostas_ferramentas.limpar()
+            resultado = asyncio.run(_rodar(ferramentas, roteiros, modo))
+            resultados.append(resultado)
+            print(json.dumps(resultado), file=sys.stderr)
+    banco.obter_pool().fechar()
+    return {"tamanho": tamanho, "data": time.strftime("%Y-%m-%dT%H:%M:%S"), "resultados": resultados}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga das ferramentas assíncronas")
+    parser.add_argument("--tamanho", type=int, default=100_000, help="livros no banco sintético")
+    parser.add_argument("--sessoes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--pasta", default=os.path.join(RAIZ, "benchmarks", ".bancos"))
+    parser.add_argument("--saida", default=None)
+    args = parser.parse_args(argv)
+
+    relatorio = executar(args.tamanho, args.sessoes, args.pasta)
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto)
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
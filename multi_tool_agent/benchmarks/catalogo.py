@@ -0,0 +1,167 @@
+"""
+Benchmark do catálogo em memória (catalogo.py) contra as consultas SQL.
+
+Mede a memória ocupada pelo catálogo por livro (tracemalloc), o tempo de
+carga e a latência de `buscar_livro`, `sugerir_livros_por_autor`,
+`sugerir_livros_por_genero` e `listar_acervo_disponivel` com o catálogo
+desligado (SQL) e ligado, além do tempo de atualização do estoque de um
+livro após um empréstimo. As ferramentas são chamadas sem o cache de
+respostas de memoria.py, para comparar só o acesso aos dados. Antes de
+medir, confere que os dois caminhos devolvem as mesmas respostas.
+
+Uso (a partir da pasta multi_tool_agent):
+
+    python -m benchmarks.catalogo --tamanho 100000 --consultas 2000 --saida catalogo.json
+
+O banco sintético é copiado para uma pasta temporária, então o original em
+benchmarks/.bancos não é alterado.
+"""
+import argparse
+import gc
+import inspect
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from .ferramentas import _commit_atual, _percentis, medir
+from .gerar_banco import RAIZ, gerar_banco
+
+
+def _argumentos(caminho: str, consultas: int, semente: int = 5) -> dict:
+    aleatorio = random.Random(semente)
+    with sqlite3.connect(caminho) as conn:
+        livros = conn.execute("SELECT titulo, autor, genero FROM livros ORDER BY random() LIMIT ?", (consultas,)).fetchall()
+    return {
+        "buscar_livro": [(titulo, "") for titulo, _, _ in livros],
+        "sugerir_livros_por_autor": [(autor, titulo) for titulo, autor, _ in livros],
+        "sugerir_livros_por_genero": [(genero, titulo) for titulo, _, genero in livros],
+        "listar_acervo_disponivel": [
+            aleatorio.choice([("", "", 20), (autor, "", 20), ("", genero, 20)]) for _, autor, genero in livros
+        ],
+    }
+
+
+def _memoria_catalogo(carregar) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    catalogo = carregar()
+    duracao = time.perf_counter() - inicio
+    gc.collect()
+    ocupados = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return catalogo, ocupados, duracao
+
+
+def executar(original: str, consultas: int) -> dict:
+    pasta = tempfile.mkdtemp(prefix="catalogo_biblioteca_")
+    caminho = os.path.join(pasta, "biblioteca.db")
+    shutil.copy(original, caminho)
+    sys.path.insert(0, RAIZ)
+    from multi_agents import banco, catalogo
+    from multi_agents.busca import buscar_livro
+    from multi_agents.emprestimo import listar_acervo_disponivel
+    from multi_agents.sugestor import sugerir_livros_por_autor, sugerir_livros_por_genero
+
+    banco.configurar_banco(caminho)
+    try:
+        with banco.conexao() as conn:
+            carga, ocupados, carga_s = _memoria_catalogo(lambda: catalogo.CatalogoMemoria.carregar(conn))
+            titulo = conn.execute("SELECT titulo FROM livros WHERE exemplares_disponiveis > 0 LIMIT 1").fetchone()[0]
+        livros = len(carga)
+        del carga
+
+        argumentos = _argumentos(caminho, consultas)
+        # Sem memorizar/instrumentar: compara só o acesso aos dados
+        ferramentas = {
+            nome: inspect.unwrap(funcao) for nome, funcao in (
+                ("buscar_livro", buscar_livro),
+                ("sugerir_livros_por_autor", sugerir_livros_por_autor),
+                ("sugerir_livros_por_genero", sugerir_livros_por_genero),
+                ("listar_acervo_disponivel", listar_acervo_disponivel),
+            )
+        }
+
+        respostas, medidas = {}, []
+        for modo, ativo in (("sql", False), ("memoria", True)):
+            catalogo.ativar_catalogo(ativo)
+            catalogo.obter_catalogo()
+            respostas[modo] = {
+                nome: [funcao(*args) for args in argumentos[nome][:200]] for nome, funcao in ferramentas.items()
+            }
+            for nome, funcao in ferramentas.items():
+                medidas.append({"ferramenta": nome, "modo": modo, **medir(funcao, argumentos[nome], 1)})
+        divergentes = {
+            nome: sum(a != b for a, b in zip(respostas["sql"][nome], respostas["memoria"][nome]))
+            for nome in ferramentas
+        }
+
+        # Atualização incremental do estoque de um livro, como após um empréstimo
+        atualizacoes = []
+        for _ in range(200):
+            inicio = time.perf_counter()
+            catalogo.atualizar_catalogo([titulo])
+            atualizacoes.append((time.perf_counter() - inicio) * 1000)
+        recargas = catalogo.estatisticas()["recargas"]
+    finally:
+        catalogo.ativar_catalogo(False)
+        banco.obter_pool().fechar()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    for medida in medidas:
+        print(json.dumps(medida), file=sys.stderr)
+    return {
+        "livros": livros,
+        "banco_bytes": os.path.getsize(original),
+        "catalogo_bytes": ocupados,
+        "bytes_por_livro": ocupados / livros if livros else 0.0,
+        "carga_segundos": carga_s,
+        "atualizacao_livro": _percentis(atualizacoes),
+        "recargas": recargas,
+        "respostas_divergentes": divergentes,
+        "medidas": medidas,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do catálogo em memória contra o SQL")
+    parser.add_argument("--tamanho", type=int, default=100_000, help="livros do banco sintético")
+    parser.add_argument("--consultas", type=int, default=2000, help="chamadas por ferramenta e modo")
+    parser.add_argument("--pasta", default=os.path.join(RAIZ, "benchmarks", ".bancos"))
+    parser.add_argument("--saida", default=None, help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    original = os.path.join(args.pasta, f"biblioteca_{args.tamanho}.db")
+    if not os.path.exists(original):
+        os.makedirs(args.pasta, exist_ok=True)
+        print(f"gerando {original}...", file=sys.stderr)
+        gerar_banco(original, args.tamanho)
+
+    resultado = executar(original, args.consultas)
+    relatorio = {
+        "commit": _commit_atual(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "tamanho": args.tamanho,
+        "consultas": args.consultas,
+        **resultado,
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto)
+    else:
+        print(texto)
+    return 0 if not any(resultado["respostas_divergentes"].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Teste de estresse dos empréstimos concorrentes.
+
+Dispara várias threads fazendo empréstimos e devoluções do mesmo livro, com
+poucos exemplares, e verifica ao final que o estoque nunca ficou negativo e
+que exemplares disponíveis + empréstimos em aberto = exemplares totais.
+
+Uso (a partir da pasta multi_tool_agent):
+
+    python -m benchmarks.estresse_emprestimos --threads 16 --operacoes 200
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BANCO_ORIGINAL = os.path.join(RAIZ, "multi_agents", "biblioteca.db")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--operacoes", type=int, default=200, help="operações por thread")
+    parser.add_argument("--exemplares", type=int, default=3)
+    parser.add_argument("--livro", default="1984")
+    args = parser.parse_args(argv)
+
+    pasta = tempfile.mkdtemp(prefix="estresse_biblioteca_")
+    caminho = os.path.join(pasta, "biblioteca.db")
+    shutil.copy(BANCO_ORIGINAL, caminho)
+    os.environ["BIBLIOTECA_DB"] = caminho
+    sys.path.insert(0, RAIZ)
+
+    from multi_agents import banco
+    from multi_agents.emprestimo import devolver_livro, realizar_emprestimo
+
+    banco.configurar_banco(caminho)
+    with banco.transacao() as conn:
+        conn.execute("DELETE FROM emprestimos")
+        conn.execute(
+            "UPDATE livros SET exemplares_total = ?, exemplares_disponiveis = ? WHERE titulo = ?",
+            (args.exemplares, args.exemplares, args.livro),
+        )
+        usuarios = [nome for (nome,) in conn.execute("SELECT nome FROM usuarios")]
+
+    resultados = Counter()
+    menor_estoque = [args.exemplares]
+    trava = threading.Lock()
+
+    def trabalhador(semente):
+        aleatorio = random.Random(semente)
+        for _ in range(args.operacoes):
+            usuario = aleatorio.choice(usuarios)
+            if aleatorio.random() < 0.5:
+                resposta = realizar_emprestimo(args.livro, usuario)
+                chave = "emprestimo_" + resposta["status"]
+            else:
+                resposta = devolver_livro(args.livro, usuario)
+                chave = "devolucao_" + resposta["status"]
+            if "locked" in resposta.get("error_message", ""):
+                chave = "banco_travado"
+            estoque = banco.consultar_um(
+                "SELECT exemplares_disponiveis FROM livros WHERE titulo = ?", (args.livro,)
+            )[0]
+            with trava:
+                resultados[chave] += 1
+                menor_estoque[0] = min(menor_estoque[0], estoque)
+
+    threads = [threading.Thread(target=trabalhador, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    disponiveis, total = banco.consultar_um(
+        "SELECT exemplares_disponiveis, exemplares_total FROM livros WHERE titulo = ?", (args.livro,)
+    )
+    em_aberto = banco.consultar_um(
+        "SELECT COUNT(*) FROM emprestimos e JOIN livros l ON l.id = e.id_livro WHERE l.titulo = ? AND e.devolvido = 0",
+        (args.livro,),
+    )[0]
+    banco.obter_pool().fechar()
+    shutil.rmtree(pasta, ignore_errors=True)
+
+    print(dict(resultados))
+    print(f"estoque final={disponiveis} em aberto={em_aberto} total={total} menor estoque observado={menor_estoque[0]}")
+    falhas = []
+    if menor_estoque[0] < 0 or disponiveis < 0:
+        falhas.append("estoque ficou negativo")
+    if disponiveis + em_aberto != total:
+        falhas.append("disponíveis + em aberto difere do total")
+    if resultados["banco_travado"]:
+        falhas.append("erros de banco travado")
+    for falha in falhas:
+        print("FALHA:", falha)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
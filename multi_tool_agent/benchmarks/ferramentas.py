@@ -0,0 +1,171 @@
+"""
+Benchmark das ferramentas dos agentes contra bancos sintéticos.
+
+Chama cada ferramenta diretamente (sem LLM), com uma thread e com N threads
+concorrentes, e grava latências p50/p95/p99 e vazão em JSON para comparar
+execuções entre commits.
+
+Uso (a partir da pasta multi_tool_agent):
+
+    python -m benchmarks.ferramentas --tamanhos 1000 100000 1000000 --workers 1 8 --saida resultado.json
+
+Os bancos sintéticos são gerados na primeira execução e reaproveitados nas
+seguintes (pasta benchmarks/.bancos por padrão).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .gerar_banco import RAIZ, gerar_banco
+
+
+def _percentis(latencias: list) -> dict:
+    if len(latencias) < 2:
+        valor = latencias[0] if latencias else 0.0
+        return {"p50_ms": valor, "p95_ms": valor, "p99_ms": valor}
+    cortes = statistics.quantiles(latencias, n=100, method="inclusive")
+    return {"p50_ms": cortes[49], "p95_ms": cortes[94], "p99_ms": cortes[98]}
+
+
+def medir(funcao, argumentos: list, workers: int) -> dict:
+    """Executa `funcao(*args)` para cada item de `argumentos` e mede as latências."""
+    def _chamar(args):
+        inicio = time.perf_counter()
+        try:
+            resposta = funcao(*args)
+            erro = resposta.get("status") == "error" and "Erro ao" in resposta.get("error_message", "")
+        except Exception:
+            erro = True
+        return (time.perf_counter() - inicio) * 1000, erro
+
+    inicio = time.perf_counter()
+    if workers == 1:
+        medidas = [_chamar(args) for args in argumentos]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            medidas = list(executor.map(_chamar, argumentos))
+    duracao = time.perf_counter() - inicio
+    latencias = [latencia for latencia, _ in medidas]
+    return {
+        "operacoes": len(medidas),
+        "erros": sum(1 for _, erro in medidas if erro),
+        "media_ms": statistics.fmean(latencias) if latencias else 0.0,
+        **_percentis(latencias),
+        "vazao_ops_s": len(medidas) / duracao if duracao else 0.0,
+    }
+
+
+def _amostras(caminho: str, quantidade: int, semente: int) -> dict:
+    aleatorio = random.Random(semente)
+    with sqlite3.connect(caminho) as conn:
+        total_livros = conn.execute("SELECT MAX(id) FROM livros").fetchone()[0]
+        total_usuarios = conn.execute("SELECT MAX(id) FROM usuarios").fetchone()[0]
+        ids = [aleatorio.randint(1, total_livros) for _ in range(quantidade)]
+        livros = [conn.execute("SELECT titulo, autor, genero FROM livros WHERE id = ?", (i,)).fetchone() for i in ids]
+        disponiveis = [titulo for (titulo,) in conn.execute(
+            "SELECT titulo FROM livros WHERE exemplares_disponiveis > 0 ORDER BY random() LIMIT ?", (quantidade,)
+        )]
+        usuarios = [
+            conn.execute("SELECT nome FROM usuarios WHERE id = ?", (aleatorio.randint(1, total_usuarios),)).fetchone()[0]
+            for _ in range(quantidade)
+        ]
+    return {"livros": livros, "disponiveis": disponiveis, "usuarios": usuarios}
+
+
+def executar(tamanhos: list, workers: list, operacoes: int, pasta: str, semente: int = 7) -> dict:
+    sys.path.insert(0, RAIZ)
+    from multi_agents import banco
+    from multi_agents.agent import usuario_existe
+    from multi_agents.busca import buscar_livro, pesquisar_livros
+    from multi_agents.emprestimo import acervo_biblioteca, devolver_livro, realizar_emprestimo
+    from multi_agents.memoria import respostas_ferramentas
+    from multi_agents.sugestor import sugerir_livros_por_autor, sugerir_livros_por_genero
+
+    resultados = []
+    os.makedirs(pasta, exist_ok=True)
+    for tamanho in tamanhos:
+        caminho = os.path.join(pasta, f"biblioteca_{tamanho}.db")
+        if not os.path.exists(caminho):
+            print(f"gerando {caminho}...", file=sys.stderr)
+            gerar_banco(caminho, tamanho)
+        banco.configurar_banco(caminho, max(workers))
+        amostras = _amostras(caminho, operacoes, semente)
+        livros, usuarios = amostras["livros"], amostras["usuarios"]
+        primeiros_nomes = [nome.split()[0] for nome in usuarios]
+
+        cenarios = {
+            "buscar_livro": (buscar_livro, [(titulo, "") for titulo, _, _ in livros]),
+            "pesquisar_livros": (pesquisar_livros, [(" ".join(titulo.split()[:2]),) for titulo, _, _ in livros]),
+            "usuario_existe": (usuario_existe, [(nome,) for nome in usuarios]),
+            "usuario_existe_primeiro_nome": (usuario_existe, [(nome,) for nome in primeiros_nomes]),
+            "sugerir_livros_por_autor": (sugerir_livros_por_autor, [(autor,) for _, autor, _ in livros]),
+            "sugerir_livros_por_genero": (sugerir_livros_por_genero, [(genero,) for _, _, genero in livros]),
+        }
+        for n_workers in workers:
+            for nome, (funcao, argumentos) in cenarios.items():
+                # Cada cenário começa sem os caches do cenário anterior
+                acervo_biblioteca.limpar()
+                respostas_ferramentas.limpar()
+                medida = medir(funcao, argumentos, n_workers)
+                resultados.append({"tamanho": tamanho, "ferramenta": nome, "workers": n_workers, **medida})
+                print(json.dumps(resultados[-1]), file=sys.stderr)
+
+            # Empréstimos e, em seguida, as devoluções dos mesmos pares
+            pares = list(zip(amostras["disponiveis"], usuarios))
+            medida = medir(realizar_emprestimo, pares, n_workers)
+            resultados.append({"tamanho": tamanho, "ferramenta": "realizar_emprestimo", "workers": n_workers, **medida})
+            print(json.dumps(resultados[-1]), file=sys.stderr)
+            medida = medir(devolver_livro, pares, n_workers)
+            resultados.append({"tamanho": tamanho, "ferramenta": "devolver_livro", "workers": n_workers, **medida})
+            print(json.dumps(resultados[-1]), file=sys.stderr)
+        banco.obter_pool().fechar()
+
+    return {
+        "commit": _commit_atual(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "operacoes_por_cenario": operacoes,
+        "resultados": resultados,
+    }
+
+
+def _commit_atual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark das ferramentas da biblioteca")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 100_000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--operacoes", type=int, default=200, help="chamadas por ferramenta e cenário")
+    parser.add_argument("--pasta", default=os.path.join(RAIZ, "benchmarks", ".bancos"),
+                        help="onde guardar os bancos sintéticos (reaproveitados entre execuções)")
+    parser.add_argument("--saida", default=None, help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    relatorio = executar(args.tamanhos, args.workers, args.operacoes, args.pasta)
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto)
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Gera bancos sintéticos no mesmo formato do biblioteca.db para benchmarks.
+
+O esquema base (usuarios, livros, emprestimos) é copiado do biblioteca.db
+original; os dados são inseridos em lote e as migrações de esquema.py são
+aplicadas no final, construindo índices e colunas normalizadas de uma vez.
+
+Uso (a partir da pasta multi_tool_agent):
+
+    python -m benchmarks.gerar_banco 100000 /tmp/biblioteca_100k.db
+"""
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BANCO_ORIGINAL = os.path.join(RAIZ, "multi_agents", "biblioteca.db")
+
+PALAVRAS = (
+    "Sombra Mar Cidade Noite Memórias Jardim Segredo Viagem Tempo Coração Rio Sertão "
+    "Estrela Caminho Silêncio Guerra Amor Casa Ilha Vento Fogo Pedra Lua Sol Montanha "
+    "Espelho Labirinto Herança Destino Promessa Inverno Verão Floresta Deserto Oceano"
+).split()
+CONECTORES = ["de", "da", "do", "das", "dos", "e", "no", "na"]
+NOMES = (
+    "Ana Bruno Carla Daniel Elisa Fábio Gabriel Helena Igor Júlia Leandro Marina "
+    "Nicolas Olívia Paulo Rafaela Sérgio Tânia Vinícius Yara Elizandra João Maria José"
+).split()
+SOBRENOMES = (
+    "Silva Santos Oliveira Souza Lima Pereira Costa Almeida Ferreira Rodrigues Gomes "
+    "Martins Araújo Barbosa Ribeiro Carvalho Rocha Teixeira Moreira Cardoso"
+).split()
+GENEROS = [
+    "Ficção", "Fantasia", "Aventura", "Romance", "Brasileiro", "Suspense", "Terror",
+    "Biografia", "História", "Poesia", "Infantil", "Ciência", "Filosofia", "Drama",
+    "Policial", "Clássico", "Autoajuda", "Tecnologia", "Humor", "Distopia",
+]
+TAMANHO_LOTE = 10_000
+
+
+def _esquema_base() -> list:
+    with sqlite3.connect(BANCO_ORIGINAL) as conn:
+        return [
+            sql for (sql,) in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name IN ('usuarios', 'livros', 'emprestimos') ORDER BY rootpage"
+            )
+        ]
+
+
+def _lotes(linhas, tamanho: int = TAMANHO_LOTE):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def gerar_banco(caminho: str, livros: int, usuarios: int = None, emprestimos_por_usuario: float = 3.0,
+                semente: int = 42) -> str:
+    """
+    Cria um banco sintético com `livros` livros, `usuarios` usuários (padrão:
+    um para cada dez livros) e um histórico de empréstimos em que cerca de
+    10% ainda estão em aberto.
+    """
+    aleatorio = random.Random(semente)
+    usuarios = usuarios or max(10, livros // 10)
+    autores = [f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {i}" for i in range(max(1, livros // 8))]
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+    sys.path.insert(0, RAIZ)
+    from multi_agents.esquema import preparar_conexao
+
+    conn = sqlite3.connect(caminho, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    for sql in _esquema_base():
+        conn.execute(sql)
+
+    def _livros():
+        for i in range(1, livros + 1):
+            titulo = " ".join([
+                aleatorio.choice(PALAVRAS), aleatorio.choice(CONECTORES), aleatorio.choice(PALAVRAS), str(i)
+            ])
+            total = aleatorio.randint(1, 6)
+            yield (i, titulo, aleatorio.choice(autores), aleatorio.randint(1850, 2024),
+                   f"978-{i:010d}", 1, total, total, aleatorio.choice(GENEROS))
+
+    def _usuarios():
+        for i in range(1, usuarios + 1):
+            nome = f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {i}"
+            yield (i, nome, f"usuario{i}@exemplo.com", f"(66) 9{i:08d}")
+
+    def _emprestimos():
+        agora = datetime.datetime.now()
+        for _ in range(int(usuarios * emprestimos_por_usuario)):
+            inicio = agora - datetime.timedelta(days=aleatorio.randint(0, 3 * 365), seconds=aleatorio.randint(0, 86400))
+            fim = inicio + datetime.timedelta(days=14)
+            devolvido = 0 if inicio > agora - datetime.timedelta(days=30) and aleatorio.random() < 0.8 else 1
+            yield (aleatorio.randint(1, usuarios), aleatorio.randint(1, livros),
+                   inicio.strftime("%Y-%m-%d %H:%M:%S"), fim.strftime("%Y-%m-%d %H:%M:%S"), devolvido)
+
+    conn.execute("BEGIN")
+    for lote in _lotes(_livros()):
+        conn.executemany(
+            "INSERT INTO livros (id, titulo, autor, ano_publicacao, isbn, disponibilidade, exemplares_total, exemplares_disponiveis, genero) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            lote,
+        )
+    for lote in _lotes(_usuarios()):
+        conn.executemany("INSERT INTO usuarios (id, nome, email, telefone) VALUES (?, ?, ?, ?)", lote)
+    for lote in _lotes(_emprestimos()):
+        conn.executemany(
+            "INSERT INTO emprestimos (id_usuario, id_livro, data_emprestimo, data_devolucao, devolvido) VALUES (?, ?, ?, ?, ?)",
+            lote,
+        )
+    # Empréstimos em aberto ocupam exemplares
+    conn.execute(
+        """
+        UPDATE livros SET exemplares_disponiveis = MAX(0, exemplares_total - (
+            SELECT COUNT(*) FROM emprestimos e WHERE e.id_livro = livros.id AND e.devolvido = 0
+        ))
+        WHERE id IN (SELECT id_livro FROM emprestimos WHERE devolvido = 0)
+        """
+    )
+    conn.execute("UPDATE livros SET disponibilidade = (exemplares_disponiveis > 0)")
+    conn.execute("COMMIT")
+
+    preparar_conexao(conn)
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return caminho
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Gera um biblioteca.db sintético")
+    parser.add_argument("livros", type=int)
+    parser.add_argument("caminho")
+    parser.add_argument("--usuarios", type=int, default=None)
+    parser.add_argument("--emprestimos-por-usuario", type=float, default=3.0)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args(argv)
+    inicio = time.perf_counter()
+    gerar_banco(args.caminho, args.livros, args.usuarios, args.emprestimos_por_usuario, args.semente)
+    print(f"{args.caminho}: {args.livros} livros gerados em {time.perf_counter() - inicio:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Benchmark e verificação da importação em massa (importacao.py).
+
+Exporta o acervo de um banco sintético para CSV, com os ISBNs como estão
+gravados ("978-..."), acrescenta livros novos e importa o arquivo duas
+vezes, com os índices de texto atualizados linha a linha e com eles
+sincronizados só ao final (`adiar_indices`). A primeira importação deve
+atualizar os livros existentes e inserir só os novos; a segunda, não inserir
+nada; e, ao final, livros_fts e livros_trigramas devem corresponder aos
+livros. Mede as linhas por segundo de cada passada.
+
+Uso (a partir da pasta multi_tool_agent):
+
+    python -m benchmarks.importacao --tamanho 100000 --novos 100000
+
+O banco sintético é copiado para uma pasta temporária, então o original em
+benchmarks/.bancos não é alterado.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from .ferramentas import _commit_atual
+from .gerar_banco import GENEROS, NOMES, PALAVRAS, RAIZ, SOBRENOMES, gerar_banco
+
+
+def _exportar(caminho_banco: str, caminho_csv: str, novos: int, semente: int = 3) -> None:
+    aleatorio = random.Random(semente)
+    with sqlite3.connect(caminho_banco) as conn, open(caminho_csv, "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(["titulo", "autor", "ano_publicacao", "isbn", "genero", "exemplares"])
+        escritor.writerows(conn.execute(
+            "SELECT titulo, autor, ano_publicacao, isbn, genero, exemplares_total FROM livros ORDER BY id"
+        ))
+        for i in range(novos):
+            escritor.writerow([
+                f"{aleatorio.choice(PALAVRAS)} {aleatorio.choice(PALAVRAS)} importado {i}",
+                f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)}",
+                aleatorio.randint(1850, 2024), f"979-{i:010d}", aleatorio.choice(GENEROS), aleatorio.randint(1, 5),
+            ])
+
+
+def _importar_duas_vezes(original: str, pasta: str, arquivo: str, adiar_indices: bool, lote: int) -> tuple:
+    from multi_agents import banco
+    from multi_agents.esquema import sincronizar_texto
+    from multi_agents.importacao import importar, ler_registros
+
+    caminho = os.path.join(pasta, "biblioteca.db")
+    shutil.copy(original, caminho)
+    banco.configurar_banco(caminho)
+
+    def _contar():
+        with banco.conexao() as conn:
+            return conn.execute("SELECT COUNT(*) FROM livros").fetchone()[0]
+
+    try:
+        antes = _contar()
+        passadas = []
+        for _ in range(2):
+            resultado = importar("livros", ler_registros(arquivo), lote, adiar_indices)
+            passadas.append({**resultado, "livros_no_banco": _contar()})
+            print(json.dumps({"adiar_indices": adiar_indices, **passadas[-1]}), file=sys.stderr)
+        # Linhas que ainda faltariam corrigir nos índices de texto (deve ser 0)
+        with banco.conexao() as conn:
+            conn.execute("BEGIN")
+            try:
+                divergentes = sincronizar_texto(conn)
+            finally:
+                conn.rollback()
+    finally:
+        banco.obter_pool().fechar()
+        os.remove(caminho)
+    return antes, passadas, divergentes
+
+
+def executar(original: str, novos: int, lote: int) -> dict:
+    pasta = tempfile.mkdtemp(prefix="importacao_biblioteca_")
+    arquivo = os.path.join(pasta, "acervo.csv")
+    sys.path.insert(0, RAIZ)
+    modos = []
+    try:
+        _exportar(original, arquivo, novos)
+        for adiar_indices in (False, True):
+            antes, passadas, divergentes = _importar_duas_vezes(original, pasta, arquivo, adiar_indices, lote)
+            modos.append({
+                "adiar_indices": adiar_indices,
+                # Livros que as importações inseriram de novo em vez de atualizar
+                "duplicados": passadas[-1]["livros_no_banco"] - antes - novos,
+                "texto_divergente": divergentes,
+                "passadas": passadas,
+            })
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return {"livros_antes": antes, "novos": novos, "modos": modos}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark e verificação da importação em massa")
+    parser.add_argument("--tamanho", type=int, default=100_000, help="livros do banco sintético")
+    parser.add_argument("--novos", type=int, default=100_000, help="livros novos no arquivo importado")
+    parser.add_argument("--lote", type=int, default=5000)
+    parser.add_argument("--pasta", default=os.path.join(RAIZ, "benchmarks", ".bancos"))
+    parser.add_argument("--saida", default=None, help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    original = os.path.join(args.pasta, f"biblioteca_{args.tamanho}.db")
+    if not os.path.exists(original):
+        os.makedirs(args.pasta, exist_ok=True)
+        print(f"gerando {original}...", file=sys.stderr)
+        gerar_banco(original, args.tamanho)
+
+    resultado = executar(original, args.novos, args.lote)
+    relatorio = {
+        "commit": _commit_atual(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "tamanho": args.tamanho,
+        "lote": args.lote,
+        **resultado,
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto)
+    else:
+        print(texto)
+    falhas = [m for m in resultado["modos"] if m["duplicados"] or m["texto_divergente"]]
+    return 0 if not falhas else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
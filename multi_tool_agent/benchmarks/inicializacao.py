@@ -0,0 +1,117 @@
+"""
+Benchmark do tempo de inicialização do pacote multi_agents.
+
+Cada repetição roda em um processo Python novo (importação a frio), a partir
+de uma pasta temporária, e mede em sequência:
+
+- importar o pacote `multi_agents`;
+- importar `multi_agents.agent` (ferramentas, sem o ADK);
+- montar o `root_agent` com os subagentes (importa o ADK);
+- a primeira chamada de ferramenta (abre o pool e verifica as migrações).
+
+Uso (a partir da pasta multi_tool_agent):
+
+    python -m benchmarks.inicializacao --repeticoes 10 --saida inicio.json
+
+O resultado traz a mediana e o p95 de cada etapa em milissegundos, com o
+commit atual, para acompanhar a latência de inicialização entre commits.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from .ferramentas import _commit_atual
+from .gerar_banco import RAIZ, gerar_banco
+
+ETAPAS = ("importar_pacote", "importar_agent", "root_agent", "primeira_ferramenta")
+
+# Executado em cada processo filho; imprime os tempos acumulados em JSON
+_SCRIPT = """
+import json, time
+inicio = time.perf_counter()
+marcas = {}
+import multi_agents
+marcas["importar_pacote"] = time.perf_counter()
+import multi_agents.agent
+marcas["importar_agent"] = time.perf_counter()
+multi_agents.root_agent
+marcas["root_agent"] = time.perf_counter()
+from multi_agents.busca import buscar_livro
+buscar_livro("Dom Casmurro")
+marcas["primeira_ferramenta"] = time.perf_counter()
+print(json.dumps({etapa: (marca - inicio) * 1000 for etapa, marca in marcas.items()}))
+"""
+
+
+def medir_inicializacao(banco: str) -> dict:
+    """Roda uma importação a frio em um processo novo e devolve o tempo acumulado de cada etapa (ms)."""
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ, BIBLIOTECA_DB=banco)
+    # Uma pasta de trabalho qualquer: o pacote não pode depender do diretório atual
+    with tempfile.TemporaryDirectory() as pasta:
+        processo = subprocess.run(
+            [sys.executable, "-c", _SCRIPT], cwd=pasta, env=ambiente,
+            capture_output=True, text=True, check=True,
+        )
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+def executar(repeticoes: int, banco: str) -> dict:
+    medir_inicializacao(banco)  # aquece o cache de bytecode e o do sistema de arquivos
+    medidas = {etapa: [] for etapa in ETAPAS}
+    for _ in range(repeticoes):
+        tempos = medir_inicializacao(banco)
+        for etapa in ETAPAS:
+            medidas[etapa].append(tempos[etapa])
+        print(json.dumps(tempos), file=sys.stderr)
+
+    resultados = []
+    for etapa, tempos in medidas.items():
+        tempos.sort()
+        resultados.append({
+            "etapa": etapa,
+            "mediana_ms": statistics.median(tempos),
+            "p95_ms": tempos[min(len(tempos) - 1, round(0.95 * (len(tempos) - 1)))],
+            "minimo_ms": tempos[0],
+        })
+    return {
+        "commit": _commit_atual(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "repeticoes": repeticoes,
+        "resultados": resultados,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do tempo de inicialização do agente")
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--banco", default=None,
+                        help="banco usado na primeira ferramenta (padrão: sintético de 1000 livros em benchmarks/.bancos)")
+    parser.add_argument("--saida", default=None, help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    banco = args.banco
+    if banco is None:
+        banco = os.path.join(RAIZ, "benchmarks", ".bancos", "biblioteca_1000.db")
+        if not os.path.exists(banco):
+            os.makedirs(os.path.dirname(banco), exist_ok=True)
+            print(f"gerando {banco}...", file=sys.stderr)
+            gerar_banco(banco, 1000)
+    relatorio = executar(args.repeticoes, os.path.abspath(banco))
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto)
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Benchmark de escalabilidade com vários processos (workers) no mesmo banco.
+
+Cada worker é um processo Python separado, como os workers de um servidor,
+com o seu pool de conexões e os seus caches. Durante `--segundos`, todos
+chamam as ferramentas diretamente (sem LLM): consultas ao acervo e, em uma
+fração das chamadas, empréstimos e devoluções. Ao final, cada worker espera
+um intervalo de sincronização e confere se o que os seus caches respondem
+bate com o banco (leituras desatualizadas devem ser zero), e o estoque é
+verificado contra os empréstimos em aberto.
+
+Uso (a partir da pasta multi_tool_agent):
+
+    python -m benchmarks.workers --workers 1 2 4 8 --segundos 5 --saida workers.json
+
+O banco sintético é copiado para uma pasta temporária a cada rodada, então o
+original em benchmarks/.bancos não é alterado.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from .ferramentas import _commit_atual, _percentis
+from .gerar_banco import RAIZ, gerar_banco
+
+
+def _amostras(caminho: str, quantidade: int) -> dict:
+    with sqlite3.connect(caminho) as conn:
+        titulos = [titulo for (titulo,) in conn.execute(
+            "SELECT titulo FROM livros WHERE exemplares_disponiveis > 0 ORDER BY random() LIMIT ?", (quantidade,)
+        )]
+        usuarios = [nome for (nome,) in conn.execute(
+            "SELECT nome FROM usuarios ORDER BY random() LIMIT ?", (quantidade,)
+        )]
+    return {"titulos": titulos, "usuarios": usuarios}
+
+
+def _trabalhador(indice: int, segundos: float, escritas: float, amostras: dict, barreira, resultados) -> None:
+    sys.path.insert(0, RAIZ)
+    from multi_agents import banco, sincronizacao
+    from multi_agents.busca import buscar_livro as pesquisar_titulo
+    from multi_agents.emprestimo import buscar_livro, devolver_livro, realizar_emprestimo
+
+    aleatorio = random.Random(indice)
+    titulos, usuarios = amostras["titulos"], amostras["usuarios"]
+    latencias = {"leitura": [], "escrita": []}
+    erros = 0
+    abertos = []
+
+    barreira.wait()
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        inicio = time.perf_counter()
+        if aleatorio.random() < escritas:
+            tipo = "escrita"
+            if abertos and aleatorio.random() < 0.5:
+                titulo, usuario = abertos.pop(aleatorio.randrange(len(abertos)))
+                resposta = devolver_livro(titulo, usuario)
+            else:
+                titulo, usuario = aleatorio.choice(titulos), aleatorio.choice(usuarios)
+                resposta = realizar_emprestimo(titulo, usuario)
+                if resposta["status"] == "success":
+                    abertos.append((titulo, usuario))
+        else:
+            tipo = "leitura"
+            titulo = aleatorio.choice(titulos)
+            resposta = buscar_livro(titulo, "") if aleatorio.random() < 0.5 else pesquisar_titulo(titulo)
+        latencias[tipo].append((time.perf_counter() - inicio) * 1000)
+        if "Erro ao" in resposta.get("error_message", ""):
+            erros += 1
+
+    # Todos pararam de escrever: depois de um intervalo de sincronização, os
+    # caches de cada worker devem refletir as escritas de todos os outros
+    barreira.wait()
+    time.sleep(sincronizacao.INTERVALO_SINCRONIZACAO * 2)
+    desatualizadas = 0
+    for titulo in titulos:
+        em_cache = buscar_livro(titulo, "")["exemplares_disponiveis"]
+        no_banco = banco.consultar_um("SELECT exemplares_disponiveis FROM livros WHERE titulo = ?", (titulo,))[0]
+        desatualizadas += em_cache != no_banco
+    resultados.put({
+        "leituras": latencias["leitura"],
+        "escritas": latencias["escrita"],
+        "erros": erros,
+        "leituras_desatualizadas": desatualizadas,
+    })
+
+
+def _verificar_estoque(caminho: str) -> int:
+    """Conta os livros em que disponíveis + empréstimos em aberto difere do total."""
+    with sqlite3.connect(caminho) as conn:
+        return conn.execute(
+            """
+            SELECT COUNT(*)
+            FROM livros l
+            LEFT JOIN (
+                SELECT id_livro, COUNT(*) AS abertos FROM emprestimos WHERE devolvido = 0 GROUP BY id_livro
+            ) e ON e.id_livro = l.id
+            WHERE l.exemplares_disponiveis < 0
+               OR l.exemplares_disponiveis + COALESCE(e.abertos, 0) <> l.exemplares_total
+            """
+        ).fetchone()[0]
+
+
+def medir_workers(original: str, workers: int, segundos: float, escritas: float, amostras: dict) -> dict:
+    pasta = tempfile.mkdtemp(prefix="workers_biblioteca_")
+    caminho = os.path.join(pasta, "biblioteca.db")
+    shutil.copy(original, caminho)
+    divergentes_antes = _verificar_estoque(caminho)
+    contexto = multiprocessing.get_context("spawn")
+    barreira = contexto.Barrier(workers)
+    resultados = contexto.Queue()
+    os.environ["BIBLIOTECA_DB"] = caminho
+    try:
+        processos = [
+            contexto.Process(target=_trabalhador, args=(i, segundos, escritas, amostras, barreira, resultados))
+            for i in range(workers)
+        ]
+        for processo in processos:
+            processo.start()
+        parciais = [resultados.get() for _ in processos]
+        for processo in processos:
+            processo.join()
+        tamanho_wal = os.path.getsize(caminho + "-wal") if os.path.exists(caminho + "-wal") else 0
+        divergentes = _verificar_estoque(caminho) - divergentes_antes
+    finally:
+        os.environ.pop("BIBLIOTECA_DB", None)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    leituras = [latencia for parcial in parciais for latencia in parcial["leituras"]]
+    escritas_ms = [latencia for parcial in parciais for latencia in parcial["escritas"]]
+    return {
+        "workers": workers,
+        "operacoes": len(leituras) + len(escritas_ms),
+        "vazao_ops_s": (len(leituras) + len(escritas_ms)) / segundos,
+        "leitura": {"operacoes": len(leituras), **_percentis(leituras)},
+        "escrita": {"operacoes": len(escritas_ms), **_percentis(escritas_ms)},
+        "erros": sum(parcial["erros"] for parcial in parciais),
+        "leituras_desatualizadas": sum(parcial["leituras_desatualizadas"] for parcial in parciais),
+        "estoque_divergente": divergentes,
+        "wal_bytes_final": tamanho_wal,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de vários workers no mesmo banco")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--segundos", type=float, default=5.0, help="duração de cada rodada")
+    parser.add_argument("--escritas", type=float, default=0.2, help="fração das chamadas que são empréstimos/devoluções")
+    parser.add_argument("--tamanho", type=int, default=100_000, help="livros do banco sintético")
+    parser.add_argument("--amostra", type=int, default=500, help="títulos e usuários sorteados")
+    parser.add_argument("--pasta", default=os.path.join(RAIZ, "benchmarks", ".bancos"))
+    parser.add_argument("--saida", default=None, help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    original = os.path.join(args.pasta, f"biblioteca_{args.tamanho}.db")
+    if not os.path.exists(original):
+        os.makedirs(args.pasta, exist_ok=True)
+        print(f"gerando {original}...", file=sys.stderr)
+        gerar_banco(original, args.tamanho)
+    # Migra o banco uma vez antes das rodadas, para os workers não disputarem a migração
+    sys.path.insert(0, RAIZ)
+    from multi_agents import banco
+    banco.configurar_banco(original)
+    with banco.conexao():
+        pass
+    banco.obter_pool().fechar()
+    amostras = _amostras(original, args.amostra)
+
+    resultados = []
+    for workers in args.workers:
+        resultados.append(medir_workers(original, workers, args.segundos, args.escritas, amostras))
+        print(json.dumps(resultados[-1]), file=sys.stderr)
+
+    relatorio = {
+        "commit": _commit_atual(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "cpus": os.cpu_count(),
+        "tamanho": args.tamanho,
+        "segundos": args.segundos,
+        "fracao_escritas": args.escritas,
+        "resultados": resultados,
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto)
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,11 @@
-from . import agent
\ No newline at end of file
+import importlib
+
+
+def __getattr__(nome):
+    # Importar o pacote não carrega o ADK: scripts de manutenção e benchmarks
+    # usam só os módulos de banco. O agente é importado no primeiro acesso.
+    if nome == "agent":
+        return importlib.import_module(".agent", __name__)
+    if nome == "root_agent":
+        return importlib.import_module(".agent", __name__).root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
@@ -1,47 +1,46 @@
 import datetime
+import functools
+from typing import TYPE_CHECKING
 from zoneinfo import ZoneInfo
-from google.adk.agents import Agent
-from google.adk.agents import LlmAgent, BaseAgent
 
 ##from multi_tool_agent.multi_agents.emprestimo import obter_acervo_do_banco
-from .busca import buscar_livro
+from .assincrono import assincrona
+from .banco import conexao
+from .busca import buscar_livro, pesquisar_livros
 from .emprestimo import (realizar_emprestimo,devolver_livro,consultar_emprestimos_usuario, listar_acervo_disponivel)
-from .emprestimo import agente_emprestimo
-from .sugestor import agente_sugestor
+from .emprestimo import criar_agente_emprestimo
+from .estatisticas import estatisticas_acervo
+from .sugestor import criar_agente_sugestor
+from .metricas import instrumentar
+from .sessao import resolver_usuario
+
+if TYPE_CHECKING:
+    from google.adk.tools import ToolContext
 #CRIAR AMBIENTE VIRTUAL .VENV
 
-def usuario_existe(nome_usuario: str) -> dict:
+@instrumentar
+def usuario_existe(nome_usuario: str, tool_context: "ToolContext" = None) -> dict:
     """
     Verifica se o usuário existe na tabela usuarios do banco de dados,
     aceitando tanto o nome completo quanto apenas o primeiro nome.
+    O usuário encontrado fica guardado na sessão para as demais ferramentas.
 
     Args:
         nome_usuario (str): Nome informado pelo usuário.
 
     Returns:
-        dict: {"existe": True/False, "nome_completo": str ou None, "mensagem": ...}
+        dict: {"existe": True/False, "id_usuario": int ou None, "nome_completo": str ou None, "mensagem": ...}
     """
     try:
-        import sqlite3
-        conn = sqlite3.connect("./multi_agents/biblioteca.db")
-        cursor = conn.cursor()
-        # Busca por nome completo ou nomes que começam com o primeiro nome informado
-        cursor.execute(
-            """
-            SELECT nome FROM usuarios
-            WHERE LOWER(nome) = LOWER(?)
-               OR LOWER(nome) LIKE LOWER(?) || ' %'
-            LIMIT 1
-            """,
-            (nome_usuario, nome_usuario)
-        )
-        resultado = cursor.fetchone()
-        conn.close()
+        with conexao() as conn:
+            # Busca por nome completo ou nomes que começam com o primeiro nome informado
+            resultado = resolver_usuario(conn, nome_usuario, tool_context)
         if resultado:
             return {
                 "existe": True,
-                "nome_completo": resultado[0],
-                "mensagem": f"Usuário reconhecido: {resultado[0]}"
+                "id_usuario": resultado[0],
+                "nome_completo": resultado[1],
+                "mensagem": f"Usuário reconhecido: {resultado[1]}"
             }
         else:
             return {
@@ -57,24 +56,43 @@ def usuario_existe(nome_usuario: str) -> dict:
         }
 
 
-root_agent = Agent(
-    name="Bibliotecário",
-    model="gemini-2.0-flash",
-    description=(
-        "Agente responsável por consultar livros de uma biblioteca"
-    ),
-    instruction=(
-        "Você é um agente especializado em fornecer informações de todo o acervo de livros da biblioteca"+
-        "Primeiramente voce irá questionar o nome do usuário e questionar o livro que ele busca"+
-        "Voce irá verificar se o nome do usuário já existe no banco de dados na tabela usuarios, se não existir, você pedirá para o usuario entrar em contato com o administrador"+
-        "Sempre que realizar um empréstimo, informar ao usuario a data de devolução do livro, o máximo de dias de emprestimo tambem (por padrão 14 dias mas pode ser mais se necessário)"+
-        "O Usuário poderá te informar o titulo do livro e ou o autor, e voce poderá buscar por um ou outro, ou ambos"+
-        "Você irá buscar o livro no banco de dados SQLite, e retornar as informações do livro"+
-        "Em seguida você irá buscar o livro no acervo e retornar a informação se o livro está disponível ou não"+
-        "Em caso de erro, você irá retornar uma mensagem de erro informando o que aconteceu de forma detalhada e concisa, como uma estrutura de try catch faria, qual foi o motivo do erro e etc."
-    ),
-    sub_agents=[agente_emprestimo,agente_sugestor],
-    tools=[buscar_livro,usuario_existe],
-)
+@functools.cache
+def criar_agente_raiz():
+    """
+    Cria (uma única vez) o agente principal com os subagentes de empréstimos
+    e de sugestões. O ADK e os subagentes só são carregados nesta chamada, e
+    não ao importar o pacote.
+    """
+    from google.adk.agents import Agent
+
+    return Agent(
+        name="Bibliotecário",
+        model="gemini-2.0-flash",
+        description=(
+            "Agente responsável por consultar livros de uma biblioteca"
+        ),
+        instruction=(
+            "Você é um agente especializado em fornecer informações de todo o acervo de livros da biblioteca"+
+            "Primeiramente voce irá questionar o nome do usuário e questionar o livro que ele busca"+
+            "Voce irá verificar se o nome do usuário já existe no banco de dados na tabela usuarios, se não existir, você pedirá para o usuario entrar em contato com o administrador"+
+            "Sempre que realizar um empréstimo, informar ao usuario a data de devolução do livro, o máximo de dias de emprestimo tambem (por padrão 14 dias mas pode ser mais se necessário)"+
+            "O Usuário poderá te informar o titulo do livro e ou o autor, e voce poderá buscar por um ou outro, ou ambos"+
+            "Você irá buscar o livro no banco de dados SQLite, e retornar as informações do livro"+
+            "Se o título ou autor não for encontrado exatamente, use a função pesquisar_livros (ou os livros_semelhantes retornados por buscar_livro) para sugerir os títulos mais próximos, sem tentar várias grafias"+
+            "Para perguntas de contagem, como quantos livros de um autor ou gênero estão disponíveis ou quantos empréstimos estão atrasados, use estatisticas_acervo"+
+            "Em seguida você irá buscar o livro no acervo e retornar a informação se o livro está disponível ou não"+
+            "Em caso de erro, você irá retornar uma mensagem de erro informando o que aconteceu de forma detalhada e concisa, como uma estrutura de try catch faria, qual foi o motivo do erro e etc."
+        ),
+        sub_agents=[criar_agente_emprestimo(),criar_agente_sugestor()],
+        tools=[assincrona(buscar_livro),assincrona(pesquisar_livros),assincrona(usuario_existe),assincrona(estatisticas_acervo)],
+    )
+
+
+def __getattr__(nome):
+    # O carregador do ADK lê multi_agents.root_agent (ou multi_agents.agent.root_agent);
+    # o agente é montado no primeiro acesso
+    if nome == "root_agent":
+        return criar_agente_raiz()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
 ##realizar_emprestimo,devolver_livro,consultar_emprestimos_usuario,listar_acervo_disponivel,
\ No newline at end of file
@@ -0,0 +1,377 @@
+"""
+Interface de armazenamento de livros, usuários e empréstimos.
+
+`Armazenamento` reúne as operações básicas do acervo (consultar e cadastrar
+livros e usuários, emprestar e devolver) sem amarrá-las a um banco. As
+ferramentas `buscar_livro`, `realizar_emprestimo` e `devolver_livro` passam
+por ela, pela implementação retornada por `obter_armazenamento()`.
+
+As duas implementações compartilham o SQL de `ArmazenamentoSQL` e o pool e
+as novas tentativas de banco.py:
+
+- `ArmazenamentoSQLite`: o arquivo SQLite local das ferramentas, com o
+  esquema, os gatilhos e as contagens de esquema.py;
+- `ArmazenamentoServidor` (armazenamento_servidor.py): um banco servidor
+  compatível com PostgreSQL, ou um substituto local com a mesma interface
+  de conexão do psycopg, para testes sem servidor.
+
+`obter_armazenamento()` escolhe a implementação pela variável de ambiente
+BIBLIOTECA_ARMAZENAMENTO: vazia ou "sqlite" para o banco local, uma URL
+"postgresql://..." para o servidor ou "substituto:///caminho.db" para o
+substituto local.
+"""
+import datetime
+import os
+import threading
+from abc import ABC, abstractmethod
+
+from .banco import conexao, executar_transacao
+from .esquema import normalizar
+
+_FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+_COLUNAS_LIVRO = "id, titulo, autor, genero, isbn, exemplares_total, exemplares_disponiveis"
+
+
+class Armazenamento(ABC):
+    """
+    Operações de livros, usuários e empréstimos comuns a todos os bancos.
+
+    Títulos e nomes são comparados sem acentos e sem diferença de
+    maiúsculas. Operações que podem falhar por regra do acervo (livro
+    esgotado, empréstimo inexistente) retornam {"status": "error",
+    "error_message": ...}, como as ferramentas.
+    """
+
+    @abstractmethod
+    def adicionar_livro(self, titulo: str, autor: str, genero: str = None, isbn: str = None,
+                        exemplares: int = 1) -> int:
+        """Cadastra um livro com todos os exemplares disponíveis e retorna o id."""
+
+    @abstractmethod
+    def adicionar_usuario(self, nome: str, email: str = None) -> int:
+        """Cadastra um usuário e retorna o id."""
+
+    @abstractmethod
+    def obter_livro(self, titulo: str) -> dict:
+        """
+        Returns:
+            dict | None: {"id", "titulo", "autor", "genero", "isbn", "exemplares_total",
+            "exemplares_disponiveis", "disponibilidade"}
+        """
+
+    @abstractmethod
+    def pesquisar_livros(self, termo: str, limite: int = 10) -> list:
+        """Livros cujo título contém todas as palavras do termo, em ordem de título."""
+
+    @abstractmethod
+    def localizar_usuario(self, nome: str):
+        """
+        Returns:
+            tuple | None: (id, nome) pelo nome completo ou pelo primeiro nome.
+        """
+
+    @abstractmethod
+    def obter_usuario(self, id_usuario: int):
+        """
+        Returns:
+            tuple | None: (id, nome) do usuário com esse id.
+        """
+
+    @abstractmethod
+    def emprestar(self, id_usuario: int, titulo: str, dias: int = 14) -> dict:
+        """
+        Reserva um exemplar e registra o empréstimo, se houver estoque.
+
+        Returns:
+            dict: {"status": "success", "id_emprestimo", "data_emprestimo", "data_devolucao"} ou erro.
+        """
+
+    @abstractmethod
+    def devolver(self, id_usuario: int, titulo: str) -> dict:
+        """
+        Encerra o empréstimo em aberto mais recente do usuário para o livro.
+
+        Returns:
+            dict: {"status": "success", "id_emprestimo", "data_emprestimo", "data_devolucao_prevista",
+            "devolvido_em", "atraso_dias"} ou erro.
+        """
+
+    @abstractmethod
+    def emprestimos_ativos(self, id_usuario: int) -> list:
+        """Empréstimos em aberto do usuário: [{"id_emprestimo", "titulo", "data_emprestimo", "data_devolucao"}]."""
+
+    def fechar(self) -> None:
+        pass
+
+
+def _datas_emprestimo(dias: int) -> tuple:
+    data_emprestimo = datetime.datetime.now().replace(microsecond=0)
+    return data_emprestimo, data_emprestimo + datetime.timedelta(days=dias)
+
+
+def _atraso(data_devolucao, agora: datetime.datetime) -> int:
+    if isinstance(data_devolucao, str):
+        data_devolucao = datetime.datetime.strptime(data_devolucao[:19], _FORMATO_DATA)
+    return max(0, (agora - data_devolucao).days)
+
+
+def _texto_data(valor) -> str:
+    # O SQLite devolve texto; outros bancos podem devolver datetime
+    return valor.strftime(_FORMATO_DATA) if isinstance(valor, datetime.datetime) else valor
+
+
+class ArmazenamentoSQL(Armazenamento):
+    """
+    Operações do acervo em SQL comum ao SQLite e ao PostgreSQL (RETURNING,
+    UPDATE condicional, LIMIT), escritas uma vez para as duas implementações.
+
+    Os comandos usam "?" e são adaptados ao `marcador` do driver. As
+    subclasses fornecem `_conexao()` (uma conexão emprestada para leituras)
+    e `_transacao(funcao)` (executa `funcao(conn)` numa transação, repetindo-a
+    se o banco estiver ocupado). Títulos e nomes normalizados são calculados
+    em Python na gravação, então o banco não precisa de funções registradas.
+    """
+
+    marcador = "?"
+
+    @abstractmethod
+    def _conexao(self):
+        """Context manager que empresta uma conexão para leituras."""
+
+    @abstractmethod
+    def _transacao(self, funcao):
+        """Executa `funcao(conn)` numa transação e retorna o resultado."""
+
+    def _executar(self, conn, sql: str, parametros=()):
+        if self.marcador != "?":
+            sql = sql.replace("?", self.marcador)
+        return conn.execute(sql, parametros)
+
+    def _consultar(self, sql: str, parametros=()) -> list:
+        with self._conexao() as conn:
+            return self._executar(conn, sql, parametros).fetchall()
+
+    def adicionar_livro(self, titulo, autor, genero=None, isbn=None, exemplares=1):
+        return self._transacao(lambda conn: self._executar(
+            conn,
+            """
+            INSERT INTO livros (titulo, autor, genero, isbn, exemplares_total, exemplares_disponiveis,
+                                titulo_norm, autor_norm, genero_norm)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING id
+            """,
+            (titulo, autor, genero, isbn, exemplares, exemplares,
+             normalizar(titulo), normalizar(autor), normalizar(genero)),
+        ).fetchone()[0])
+
+    def adicionar_usuario(self, nome, email=None):
+        return self._transacao(lambda conn: self._executar(
+            conn,
+            "INSERT INTO usuarios (nome, email, nome_norm) VALUES (?, ?, ?) RETURNING id",
+            (nome, email, normalizar(nome)),
+        ).fetchone()[0])
+
+    def obter_livro(self, titulo):
+        rows = self._consultar(
+            f"SELECT {_COLUNAS_LIVRO} FROM livros WHERE titulo_norm = ? ORDER BY id LIMIT 1",
+            (normalizar(titulo),),
+        )
+        return _livro(rows[0]) if rows else None
+
+    def pesquisar_livros(self, termo, limite=10):
+        palavras = normalizar(termo).split()
+        if not palavras:
+            return []
+        filtro = " AND ".join("titulo_norm LIKE ?" for _ in palavras)
+        rows = self._consultar(
+            f"SELECT {_COLUNAS_LIVRO} FROM livros WHERE {filtro} ORDER BY titulo_norm, id LIMIT ?",
+            [f"%{palavra}%" for palavra in palavras] + [limite],
+        )
+        return [_livro(row) for row in rows]
+
+    def localizar_usuario(self, nome):
+        # Nome completo ou primeiro nome, pela faixa [nome, nome + "!") do índice em nome_norm
+        nome = normalizar(nome)
+        rows = self._consultar(
+            """
+            SELECT id, nome FROM usuarios
+            WHERE nome_norm >= ? AND nome_norm < ?
+              AND (nome_norm = ? OR substr(nome_norm, length(CAST(? AS TEXT)) + 1, 1) = ' ')
+            ORDER BY nome_norm, id
+            LIMIT 1
+            """,
+            (nome, nome + "!", nome, nome),
+        )
+        return tuple(rows[0]) if rows else None
+
+    def obter_usuario(self, id_usuario):
+        rows = self._consultar("SELECT id, nome FROM usuarios WHERE id = ?", (id_usuario,))
+        return tuple(rows[0]) if rows else None
+
+    def _id_livro(self, conn, titulo: str):
+        row = self._executar(
+            conn, "SELECT id FROM livros WHERE titulo_norm = ? ORDER BY id LIMIT 1", (normalizar(titulo),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def emprestar(self, id_usuario, titulo, dias=14):
+        data_emprestimo, data_devolucao = _datas_emprestimo(dias)
+
+        def _registrar(conn):
+            id_livro = self._id_livro(conn, titulo)
+            if id_livro is None:
+                return {"status": "error", "error_message": f"Livro '{titulo}' não encontrado."}
+            # Só decrementa se ainda houver estoque; no PostgreSQL, trava a linha até o commit
+            cursor = self._executar(
+                conn,
+                "UPDATE livros SET exemplares_disponiveis = exemplares_disponiveis - 1 "
+                "WHERE id = ? AND exemplares_disponiveis > 0",
+                (id_livro,),
+            )
+            if cursor.rowcount != 1:
+                return {"status": "error", "error_message": "Livro não disponível para empréstimo."}
+            id_emprestimo = self._executar(
+                conn,
+                """
+                INSERT INTO emprestimos (id_usuario, id_livro, data_emprestimo, data_devolucao, devolvido)
+                VALUES (?, ?, ?, ?, 0)
+                RETURNING id
+                """,
+                (id_usuario, id_livro, data_emprestimo.strftime(_FORMATO_DATA), data_devolucao.strftime(_FORMATO_DATA)),
+            ).fetchone()[0]
+            return {
+                "status": "success",
+                "id_emprestimo": id_emprestimo,
+                "data_emprestimo": data_emprestimo.strftime(_FORMATO_DATA),
+                "data_devolucao": data_devolucao.strftime(_FORMATO_DATA),
+            }
+
+        return self._transacao(_registrar)
+
+    def devolver(self, id_usuario, titulo):
+        def _registrar(conn):
+            id_livro = self._id_livro(conn, titulo)
+            if id_livro is None:
+                return {"status": "error", "error_message": f"Livro '{titulo}' não encontrado."}
+            row = self._executar(
+                conn,
+                """
+                SELECT id, data_emprestimo, data_devolucao FROM emprestimos
+                WHERE id_usuario = ? AND id_livro = ? AND devolvido = 0
+                ORDER BY data_emprestimo DESC, id DESC LIMIT 1
+                """,
+                (id_usuario, id_livro),
+            ).fetchone()
+            sem_emprestimo = {"status": "error", "error_message": "Nenhum empréstimo ativo encontrado para este usuário e livro."}
+            if not row:
+                return sem_emprestimo
+            id_emprestimo, data_emprestimo, data_devolucao = row
+            agora = datetime.datetime.now().replace(microsecond=0)
+            # O WHERE devolvido = 0 impede que duas devoluções simultâneas encerrem o mesmo empréstimo
+            cursor = self._executar(
+                conn,
+                "UPDATE emprestimos SET devolvido = 1, devolvido_em = ? WHERE id = ? AND devolvido = 0",
+                (agora.strftime(_FORMATO_DATA), id_emprestimo),
+            )
+            if cursor.rowcount != 1:
+                return sem_emprestimo
+            # Devolve o exemplar ao estoque, sem ultrapassar o total
+            self._executar(
+                conn,
+                """
+                UPDATE livros SET exemplares_disponiveis = exemplares_disponiveis + 1
+                WHERE id = ? AND (exemplares_total IS NULL OR exemplares_disponiveis < exemplares_total)
+                """,
+                (id_livro,),
+            )
+            return {
+                "status": "success",
+                "id_emprestimo": id_emprestimo,
+                "data_emprestimo": _texto_data(data_emprestimo),
+                "data_devolucao_prevista": _texto_data(data_devolucao),
+                "devolvido_em": agora.strftime(_FORMATO_DATA),
+                "atraso_dias": _atraso(data_devolucao, agora),
+            }
+
+        return self._transacao(_registrar)
+
+    def emprestimos_ativos(self, id_usuario):
+        rows = self._consultar(
+            """
+            SELECT e.id, l.titulo, e.data_emprestimo, e.data_devolucao
+            FROM emprestimos e JOIN livros l ON l.id = e.id_livro
+            WHERE e.id_usuario = ? AND e.devolvido = 0
+            ORDER BY e.data_devolucao, e.id
+            """,
+            (id_usuario,),
+        )
+        return [_emprestimo(row) for row in rows]
+
+
+class ArmazenamentoSQLite(ArmazenamentoSQL):
+    """
+    Implementação sobre o banco SQLite das ferramentas (banco.py).
+
+    Usa o pool global e `executar_transacao`, então segue `configurar_banco`
+    e BIBLIOTECA_DB. A disponibilidade e as contagens são mantidas pelos
+    gatilhos de esquema.py.
+    """
+
+    def _conexao(self):
+        return conexao()
+
+    def _transacao(self, funcao):
+        return executar_transacao(funcao)
+
+
+def _livro(row) -> dict:
+    id_livro, titulo, autor, genero, isbn, total, disponiveis = row
+    return {
+        "id": id_livro,
+        "titulo": titulo,
+        "autor": autor,
+        "genero": genero,
+        "isbn": isbn,
+        "exemplares_total": total,
+        "exemplares_disponiveis": disponiveis,
+        "disponibilidade": bool(disponiveis and disponiveis > 0),
+    }
+
+
+def _emprestimo(row) -> dict:
+    id_emprestimo, titulo, data_emprestimo, data_devolucao = row
+    return {
+        "id_emprestimo": id_emprestimo,
+        "titulo": titulo,
+        "data_emprestimo": _texto_data(data_emprestimo),
+        "data_devolucao": _texto_data(data_devolucao),
+    }
+
+
+_armazenamento = None
+_trava = threading.Lock()
+
+
+def criar_armazenamento(url: str = None) -> Armazenamento:
+    """
+    Cria a implementação indicada pela URL (ver o início deste módulo).
+
+    Args:
+        url (str): "sqlite" (padrão), "postgresql://..." ou "substituto:///caminho.db".
+    """
+    url = url or "sqlite"
+    if url == "sqlite":
+        return ArmazenamentoSQLite()
+    from .armazenamento_servidor import ArmazenamentoServidor
+
+    return ArmazenamentoServidor.da_url(url)
+
+
+def obter_armazenamento() -> Armazenamento:
+    """Retorna a implementação configurada em BIBLIOTECA_ARMAZENAMENTO, criada no primeiro uso."""
+    global _armazenamento
+    if _armazenamento is None:
+        with _trava:
+            if _armazenamento is None:
+                _armazenamento = criar_armazenamento(os.environ.get("BIBLIOTECA_ARMAZENAMENTO"))
+    return _armazenamento
@@ -0,0 +1,98 @@
+"""
+Arquivamento do histórico de empréstimos.
+
+Empréstimos devolvidos há mais de N dias saem de `emprestimos` e vão para
+`emprestimos_arquivo`, no mesmo banco, em lotes transacionais. A tabela ativa
+fica pequena para as ferramentas de empréstimo e devolução; consultas de
+histórico leem a visão `emprestimos_historico`, que junta as duas tabelas.
+
+Execute a partir da pasta `multi_tool_agent` (por exemplo, via cron):
+
+    python -m multi_agents.arquivamento --dias 365
+"""
+import argparse
+import datetime
+import logging
+import sys
+import time
+
+from .banco import conexao, executar_transacao
+
+logger = logging.getLogger(__name__)
+
+DIAS_PADRAO = 365
+LOTE_PADRAO = 5000
+
+_COLUNAS = "id, id_usuario, id_livro, data_emprestimo, data_devolucao, devolvido, devolvido_em"
+# Empréstimos antigos não têm devolvido_em; para eles vale o vencimento
+_FILTRO = "devolvido = 1 AND COALESCE(devolvido_em, data_devolucao) < ?"
+
+
+def arquivar_emprestimos(dias: int = DIAS_PADRAO, lote: int = LOTE_PADRAO, agora: datetime.datetime = None) -> dict:
+    """
+    Move para o arquivo os empréstimos devolvidos antes do corte.
+
+    Percorre `emprestimos` pelo id em faixas de até `lote` empréstimos
+    arquivados; cada faixa é copiada e removida na mesma transação.
+
+    Args:
+        dias (int): Idade mínima da devolução, em dias.
+        lote (int): Quantidade máxima de empréstimos por transação.
+        agora (datetime): Momento de referência (padrão: agora).
+
+    Returns:
+        dict: {"arquivados": int, "lotes": int, "segundos": float}
+    """
+    corte = ((agora or datetime.datetime.now()) - datetime.timedelta(days=dias)).strftime("%Y-%m-%d %H:%M:%S")
+    inicio = time.perf_counter()
+    arquivados = lotes = 0
+    ultimo_id = 0
+
+    def _mover(conn):
+        ids = conn.execute(
+            f"SELECT id FROM emprestimos WHERE id > ? AND {_FILTRO} ORDER BY id LIMIT ?",
+            (ultimo_id, corte, lote),
+        ).fetchall()
+        if not ids:
+            return None
+        faixa = (ultimo_id, ids[-1][0], corte)
+        conn.execute(
+            f"INSERT INTO emprestimos_arquivo ({_COLUNAS}) "
+            f"SELECT {_COLUNAS} FROM emprestimos WHERE id > ? AND id <= ? AND {_FILTRO}",
+            faixa,
+        )
+        conn.execute(f"DELETE FROM emprestimos WHERE id > ? AND id <= ? AND {_FILTRO}", faixa)
+        return ids[-1][0], len(ids)
+
+    while True:
+        resultado = executar_transacao(_mover)
+        if resultado is None:
+            break
+        ultimo_id, quantidade = resultado
+        arquivados += quantidade
+        lotes += 1
+        logger.info("Arquivamento: %d empréstimos movidos", arquivados)
+
+    if arquivados:
+        # O tamanho de emprestimos mudou bastante: atualiza as estatísticas do planejador
+        with conexao() as conn:
+            conn.execute("ANALYZE emprestimos")
+    return {"arquivados": arquivados, "lotes": lotes, "segundos": time.perf_counter() - inicio}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Move empréstimos devolvidos antigos para o arquivo")
+    parser.add_argument("--dias", type=int, default=DIAS_PADRAO,
+                        help="arquiva devoluções com mais de N dias (padrão: 365)")
+    parser.add_argument("--lote", type=int, default=LOTE_PADRAO)
+    args = parser.parse_args(argv)
+    resultado = arquivar_emprestimos(args.dias, args.lote)
+    print(
+        f"{resultado['arquivados']} empréstimos arquivados em {resultado['lotes']} lotes "
+        f"({resultado['segundos']:.1f}s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
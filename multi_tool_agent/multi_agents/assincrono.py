@@ -0,0 +1,29 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .banco import TAMANHO_POOL
+
+# Threads que executam as ferramentas fora do loop de eventos. Mais threads
+# que conexões no pool só ficariam esperando por uma conexão livre.
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("BIBLIOTECA_THREADS", TAMANHO_POOL)),
+    thread_name_prefix="biblioteca",
+)
+
+
+def assincrona(funcao):
+    """
+    Cria a versão assíncrona de uma ferramenta síncrona.
+
+    A chamada ao SQLite roda em um executor limitado, liberando o loop de
+    eventos do ADK para atender outras sessões enquanto a consulta executa.
+    Nome, docstring e assinatura são preservados, então o LLM vê a mesma ferramenta.
+    """
+    @functools.wraps(funcao)
+    async def _assincrona(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(funcao, *args, **kwargs))
+
+    return _assincrona
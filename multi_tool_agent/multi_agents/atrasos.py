@@ -0,0 +1,174 @@
+"""
+Varredura de empréstimos em atraso e envio de avisos em lote.
+
+Execute a partir da pasta `multi_tool_agent`:
+
+    python -m multi_agents.atrasos                      # avisos na saída padrão
+    python -m multi_agents.atrasos --saida avisos.jsonl # avisos em arquivo JSONL
+
+Os empréstimos são lidos pelo índice parcial `idx_emprestimos_vencimento`
+(só empréstimos em aberto, ordenados pelo vencimento) em páginas de tamanho
+fixo, então a memória usada não depende do tamanho do histórico.
+"""
+import argparse
+import datetime
+import json
+import sys
+import time
+from abc import ABC, abstractmethod
+
+from .banco import conexao
+
+LOTE_PADRAO = 1000
+_FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+
+
+def _pagina_atrasados(conn, agora: str, apos: tuple, lote: int) -> list:
+    # Keyset em (data_devolucao, id): cada página continua de onde a anterior parou
+    return conn.execute(
+        """
+        SELECT e.id, e.data_devolucao, e.data_emprestimo,
+               CAST(julianday(?) - julianday(e.data_devolucao) AS INTEGER),
+               u.id, u.nome, u.email, l.titulo
+        FROM emprestimos e
+        JOIN usuarios u ON u.id = e.id_usuario
+        JOIN livros l ON l.id = e.id_livro
+        WHERE e.devolvido = 0 AND e.data_devolucao < ?
+          AND (e.data_devolucao, e.id) > (?, ?)
+        ORDER BY e.data_devolucao, e.id
+        LIMIT ?
+        """,
+        (agora, agora, apos[0], apos[1], lote),
+    ).fetchall()
+
+
+def _formatar_atraso(linha) -> dict:
+    id_emprestimo, data_devolucao, data_emprestimo, dias, id_usuario, nome, email, titulo = linha
+    return {
+        "id_emprestimo": id_emprestimo,
+        "id_usuario": id_usuario,
+        "usuario": nome,
+        "email": email,
+        "livro": titulo,
+        "data_emprestimo": data_emprestimo,
+        "data_devolucao_prevista": data_devolucao,
+        "atraso_dias": max(0, dias),
+    }
+
+
+def iterar_atrasados(agora: datetime.datetime = None, lote: int = LOTE_PADRAO):
+    """
+    Percorre os empréstimos em aberto com vencimento anterior a `agora`,
+    do mais antigo para o mais recente, em lotes.
+
+    Cada lote usa uma conexão do pool só durante a leitura da página, sem
+    manter uma leitura aberta enquanto o chamador processa os avisos.
+
+    Args:
+        agora (datetime): Momento de referência (padrão: agora).
+        lote (int): Quantidade de empréstimos por lote.
+
+    Returns:
+        Iterador de listas de dicionários (ver `_formatar_atraso`).
+    """
+    agora = (agora or datetime.datetime.now()).strftime(_FORMATO_DATA)
+    apos = ("", 0)
+    while True:
+        with conexao() as conn:
+            linhas = _pagina_atrasados(conn, agora, apos, lote)
+        if not linhas:
+            return
+        yield [_formatar_atraso(linha) for linha in linhas]
+        apos = (linhas[-1][1], linhas[-1][0])
+        if len(linhas) < lote:
+            return
+
+
+class Notificador(ABC):
+    """
+    Destino dos avisos de atraso. Implementações recebem um lote de
+    empréstimos por vez em `enviar` e liberam recursos em `fechar`.
+    """
+
+    @abstractmethod
+    def enviar(self, atrasos: list) -> None:
+        """Envia os avisos de um lote de empréstimos em atraso."""
+
+    def fechar(self) -> None:
+        pass
+
+
+class NotificadorSaida(Notificador):
+    """Escreve um aviso legível por linha na saída padrão (ou outro arquivo aberto)."""
+
+    def __init__(self, destino=None):
+        self.destino = destino or sys.stdout
+
+    def enviar(self, atrasos: list) -> None:
+        for atraso in atrasos:
+            print(
+                f"{atraso['usuario']} <{atraso['email'] or 'sem e-mail'}>: '{atraso['livro']}' "
+                f"venceu em {atraso['data_devolucao_prevista']} ({atraso['atraso_dias']} dia(s) de atraso)",
+                file=self.destino,
+            )
+
+
+class NotificadorArquivo(Notificador):
+    """Acrescenta um objeto JSON por empréstimo em atraso a um arquivo JSONL."""
+
+    def __init__(self, caminho: str):
+        self._arquivo = open(caminho, "a", encoding="utf-8")
+
+    def enviar(self, atrasos: list) -> None:
+        for atraso in atrasos:
+            self._arquivo.write(json.dumps(atraso, ensure_ascii=False) + "\n")
+        self._arquivo.flush()
+
+    def fechar(self) -> None:
+        self._arquivo.close()
+
+
+def notificar_atrasados(notificador: Notificador, agora: datetime.datetime = None, lote: int = LOTE_PADRAO) -> dict:
+    """
+    Envia ao notificador todos os empréstimos em atraso, lote a lote.
+
+    Args:
+        notificador (Notificador): Destino dos avisos.
+        agora (datetime): Momento de referência (padrão: agora).
+        lote (int): Quantidade de empréstimos por lote.
+
+    Returns:
+        dict: {"notificados": int, "lotes": int, "segundos": float}
+    """
+    inicio = time.perf_counter()
+    notificados = lotes = 0
+    for atrasos in iterar_atrasados(agora, lote):
+        notificador.enviar(atrasos)
+        notificados += len(atrasos)
+        lotes += 1
+    return {"notificados": notificados, "lotes": lotes, "segundos": time.perf_counter() - inicio}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Envia avisos dos empréstimos em atraso")
+    parser.add_argument("--saida", help="arquivo JSONL para os avisos (padrão: saída padrão)")
+    parser.add_argument("--lote", type=int, default=LOTE_PADRAO)
+    parser.add_argument("--data", help="data de referência AAAA-MM-DD (padrão: agora)")
+    args = parser.parse_args(argv)
+
+    agora = datetime.datetime.strptime(args.data, "%Y-%m-%d") if args.data else None
+    notificador = NotificadorArquivo(args.saida) if args.saida else NotificadorSaida()
+    try:
+        resultado = notificar_atrasados(notificador, agora, args.lote)
+    finally:
+        notificador.fechar()
+    print(
+        f"{resultado['notificados']} empréstimos em atraso notificados "
+        f"em {resultado['lotes']} lotes ({resultado['segundos']:.1f}s)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from .esquema import normalizar, preparar_conexao
+from .metricas import ConexaoInstrumentada, registrar_fonte
+
+# Caminho padrão do banco: ao lado deste arquivo, independente do diretório atual.
+# Pode ser sobrescrito pela variável de ambiente BIBLIOTECA_DB ou por configurar_banco().
+CAMINHO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "biblioteca.db")
+
+TAMANHO_POOL = int(os.environ.get("BIBLIOTECA_POOL", "8"))
+TIMEOUT_OCUPADO_MS = 5000
+# Espera máxima por uma conexão livre quando o pool está cheio, em segundos
+ESPERA_POOL = float(os.environ.get("BIBLIOTECA_ESPERA_POOL", "30"))
+# Novas tentativas quando o banco continua travado após o busy_timeout
+TENTATIVAS_TRANSACAO = 5
+ESPERA_INICIAL = 0.05
+
+# Checkpoints do WAL: o SQLite faz checkpoints passivos a cada 1000 páginas,
+# mas com vários processos lendo o tempo todo eles podem não alcançar o fim
+# do WAL, que cresce sem limite. Acima de LIMITE_WAL_BYTES, a próxima escrita
+# (no máximo uma vez a cada INTERVALO_CHECKPOINT segundos por processo) força
+# um checkpoint TRUNCATE, esperando os leitores por até ESPERA_CHECKPOINT_MS.
+PAGINAS_AUTOCHECKPOINT = 1000
+LIMITE_WAL_BYTES = int(os.environ.get("BIBLIOTECA_LIMITE_WAL", str(64 * 1024 * 1024)))
+INTERVALO_CHECKPOINT = 10.0
+ESPERA_CHECKPOINT_MS = 200
+
+# Pragmas aplicados a cada conexão nova do pool
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {TIMEOUT_OCUPADO_MS}",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 134217728",
+    f"PRAGMA wal_autocheckpoint = {PAGINAS_AUTOCHECKPOINT}",
+    f"PRAGMA journal_size_limit = {LIMITE_WAL_BYTES}",
+)
+
+
+class PoolConexoes:
+    """
+    Pool de conexões SQLite seguro para múltiplas threads.
+
+    As conexões são criadas sob demanda até o limite do pool e reutilizadas
+    entre chamadas, mantendo o cache de statements compilados de cada uma.
+    Cada conexão guarda a geração do pool em que foi criada: `fechar` fecha
+    as livres e passa para a próxima geração, e as que estavam emprestadas
+    são fechadas quando voltam.
+
+    Args:
+        caminho (str): Arquivo SQLite (ou, com `conectar`, a descrição do banco).
+        tamanho (int): Número máximo de conexões abertas.
+        conectar: Função sem argumentos que abre uma conexão DB-API no lugar
+            das conexões SQLite das ferramentas (ver armazenamento_servidor.py).
+    """
+
+    def __init__(self, caminho: str, tamanho: int = TAMANHO_POOL, conectar=None):
+        self.caminho = caminho
+        self.tamanho = tamanho
+        self._conectar = conectar
+        self._livres = queue.LifoQueue()
+        self._criadas = 0
+        self._geracao = 0
+        # Todas as conexões abertas (livres ou emprestadas), com a geração de cada uma
+        self._conexoes = {}
+        self._trava = threading.Lock()
+
+    def _nova_conexao(self) -> sqlite3.Connection:
+        if self._conectar is not None:
+            return self._conectar()
+        conn = sqlite3.connect(
+            self.caminho,
+            timeout=TIMEOUT_OCUPADO_MS / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256,
+            factory=ConexaoInstrumentada,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        preparar_conexao(conn)
+        return conn
+
+    def obter(self, espera: float = ESPERA_POOL) -> sqlite3.Connection:
+        """
+        Empresta uma conexão, criando uma nova se o pool ainda não estiver cheio.
+
+        Args:
+            espera (float): Segundos de espera por uma conexão livre com o pool cheio.
+
+        Raises:
+            RuntimeError: Nenhuma conexão foi devolvida dentro da espera.
+        """
+        prazo = time.monotonic() + espera
+        while True:
+            try:
+                return self._livres.get_nowait()
+            except queue.Empty:
+                pass
+            with self._trava:
+                criar = self._criadas < self.tamanho
+                if criar:
+                    self._criadas += 1
+                    geracao = self._geracao
+            if criar:
+                try:
+                    conn = self._nova_conexao()
+                except Exception:
+                    with self._trava:
+                        self._criadas -= 1
+                    raise
+                with self._trava:
+                    self._conexoes[conn] = geracao
+                return conn
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                raise RuntimeError(
+                    f"Nenhuma conexão livre no pool após {espera:g}s "
+                    f"({self.tamanho} em uso): conexões não devolvidas ou pool pequeno (BIBLIOTECA_POOL)."
+                )
+            # Espera curta: uma conexão de geração anterior pode ser fechada
+            # na devolução, liberando espaço para criar outra
+            try:
+                return self._livres.get(timeout=min(restante, 0.1))
+            except queue.Empty:
+                pass
+
+    def devolver(self, conn: sqlite3.Connection) -> None:
+        # Conexões DB-API sem in_transaction sempre encerram a transação implícita
+        if getattr(conn, "in_transaction", True):
+            conn.rollback()
+        with self._trava:
+            if self._conexoes.get(conn) == self._geracao:
+                self._livres.put(conn)
+                return
+            # Emprestada antes de `fechar`: não volta para o pool
+            self._conexoes.pop(conn, None)
+            self._criadas -= 1
+        conn.close()
+
+    def fechar(self) -> None:
+        """Fecha as conexões livres; as emprestadas são fechadas ao serem devolvidas."""
+        livres = []
+        with self._trava:
+            self._geracao += 1
+            while True:
+                try:
+                    livres.append(self._livres.get_nowait())
+                except queue.Empty:
+                    break
+            for conn in livres:
+                self._conexoes.pop(conn, None)
+            self._criadas -= len(livres)
+        for conn in livres:
+            conn.close()
+
+
+_pool = None
+_trava_pool = threading.Lock()
+_wal = {"checkpoints": 0, "checkpoints_incompletos": 0, "wal_bytes": 0}
+_proximo_checkpoint = 0.0
+
+
+def caminho_banco() -> str:
+    return os.environ.get("BIBLIOTECA_DB", CAMINHO_PADRAO)
+
+
+def configurar_banco(caminho: str = None, tamanho_pool: int = TAMANHO_POOL) -> None:
+    """
+    Troca o banco usado pelas ferramentas, fechando o pool atual.
+
+    Args:
+        caminho (str): Caminho do arquivo SQLite. Se omitido, usa o padrão.
+        tamanho_pool (int): Número máximo de conexões abertas.
+    """
+    global _pool
+    with _trava_pool:
+        if _pool is not None:
+            _pool.fechar()
+        _pool = PoolConexoes(caminho or caminho_banco(), tamanho_pool)
+
+
+def obter_pool() -> PoolConexoes:
+    global _pool
+    if _pool is None:
+        with _trava_pool:
+            if _pool is None:
+                _pool = PoolConexoes(caminho_banco())
+    return _pool
+
+
+@contextmanager
+def conexao():
+    """Empresta uma conexão do pool durante o bloco `with`."""
+    pool = obter_pool()
+    conn = pool.obter()
+    try:
+        yield conn
+    finally:
+        pool.devolver(conn)
+
+
+@contextmanager
+def transacao(imediata: bool = False):
+    """
+    Abre uma transação em uma conexão do pool.
+
+    Faz commit ao final do bloco ou rollback em caso de exceção.
+
+    Args:
+        imediata (bool): Usa BEGIN IMMEDIATE, reservando a escrita desde o início.
+    """
+    with conexao() as conn:
+        conn.execute("BEGIN IMMEDIATE" if imediata else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def _banco_ocupado(erro: Exception) -> bool:
+    mensagem = str(erro).lower()
+    return isinstance(erro, sqlite3.OperationalError) and ("locked" in mensagem or "busy" in mensagem)
+
+
+def repetir_transacao(tentativa, transitorio=_banco_ocupado, tentativas: int = TENTATIVAS_TRANSACAO):
+    """
+    Chama `tentativa()`, que executa uma transação inteira, repetindo-a com
+    espera exponencial (com variação aleatória) enquanto `transitorio(erro)`
+    indicar uma falha passageira, como banco ocupado.
+
+    Returns:
+        O valor retornado pela última chamada de `tentativa`.
+    """
+    for numero in range(tentativas):
+        try:
+            return tentativa()
+        except Exception as erro:
+            if not transitorio(erro) or numero == tentativas - 1:
+                raise
+        time.sleep(ESPERA_INICIAL * (2 ** numero) * (0.5 + random.random()))
+
+
+def executar_transacao(funcao, tentativas: int = TENTATIVAS_TRANSACAO):
+    """
+    Executa `funcao(conn)` dentro de uma transação BEGIN IMMEDIATE.
+
+    A trava de escrita é obtida antes de qualquer leitura, então as
+    verificações feitas pela função continuam válidas até o commit. Se o
+    banco estiver ocupado, a transação inteira é repetida (ver
+    `repetir_transacao`). Após o commit, confere o tamanho do WAL (ver
+    `manter_wal`).
+
+    Returns:
+        O valor retornado por `funcao`.
+    """
+    def _tentar():
+        with transacao(imediata=True) as conn:
+            return funcao(conn)
+
+    resultado = repetir_transacao(_tentar, tentativas=tentativas)
+    manter_wal()
+    return resultado
+
+
+def checkpoint_wal(modo: str = "TRUNCATE", espera_ms: int = ESPERA_CHECKPOINT_MS) -> tuple:
+    """
+    Copia o WAL para o banco e, no modo TRUNCATE, zera o arquivo -wal.
+
+    Args:
+        modo (str): PASSIVE, FULL, RESTART ou TRUNCATE.
+        espera_ms (int): Quanto esperar por leitores e escritores de outros processos.
+
+    Returns:
+        tuple: (ocupado, paginas_no_wal, paginas_copiadas), como em PRAGMA wal_checkpoint.
+    """
+    if modo not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+        raise ValueError(f"Modo de checkpoint inválido: {modo!r}")
+    with conexao() as conn:
+        conn.execute(f"PRAGMA busy_timeout = {espera_ms}")
+        try:
+            resultado = conn.execute(f"PRAGMA wal_checkpoint({modo})").fetchone()
+        finally:
+            conn.execute(f"PRAGMA busy_timeout = {TIMEOUT_OCUPADO_MS}")
+    _wal["checkpoints"] += 1
+    if resultado[0]:
+        _wal["checkpoints_incompletos"] += 1
+    return resultado
+
+
+def manter_wal() -> None:
+    """Força um checkpoint se o WAL passou de LIMITE_WAL_BYTES (verificado no máximo a cada INTERVALO_CHECKPOINT)."""
+    global _proximo_checkpoint
+    agora = time.monotonic()
+    if agora < _proximo_checkpoint:
+        return
+    _proximo_checkpoint = agora + INTERVALO_CHECKPOINT
+    try:
+        _wal["wal_bytes"] = os.path.getsize(obter_pool().caminho + "-wal")
+    except OSError:
+        return
+    if _wal["wal_bytes"] > LIMITE_WAL_BYTES:
+        try:
+            checkpoint_wal("TRUNCATE")
+        except sqlite3.OperationalError:
+            _wal["checkpoints_incompletos"] += 1
+
+
+def estatisticas_wal() -> dict:
+    return dict(_wal, limite_wal_bytes=LIMITE_WAL_BYTES)
+
+
+registrar_fonte("wal", estatisticas_wal)
+
+
+def consultar(sql: str, parametros: tuple = ()) -> list:
+    with conexao() as conn:
+        return conn.execute(sql, parametros).fetchall()
+
+
+def consultar_um(sql: str, parametros: tuple = ()):
+    with conexao() as conn:
+        return conn.execute(sql, parametros).fetchone()
+
+
+def localizar_usuario(conn, nome_usuario: str):
+    """
+    Busca um usuário pelo nome completo ou apenas pelo primeiro nome.
+
+    Usa o índice em `nome_norm`: o nome completo é um seek exato e o primeiro
+    nome vira uma faixa [nome, nome + "!") filtrada para o separador " ".
+    O nome completo, quando existe, vem primeiro pela ordem do índice.
+
+    Returns:
+        tuple | None: (id, nome) do usuário encontrado.
+    """
+    nome = normalizar(nome_usuario)
+    return conn.execute(
+        """
+        SELECT id, nome FROM usuarios
+        WHERE nome_norm >= ? AND nome_norm < ? || '!'
+          AND (nome_norm = ? OR substr(nome_norm, length(?) + 1, 1) = ' ')
+        ORDER BY nome_norm
+        LIMIT 1
+        """,
+        (nome, nome, nome, nome),
+    ).fetchone()
+
+
+def localizar_livro(conn, titulo: str):
+    """
+    Busca um livro pelo título normalizado.
+
+    Returns:
+        tuple | None: (id, titulo) do livro encontrado.
+    """
+    return conn.execute(
+        "SELECT id, titulo FROM livros WHERE titulo_norm = ? LIMIT 1",
+        (normalizar(titulo),),
+    ).fetchone()
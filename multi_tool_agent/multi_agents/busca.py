@@ -1,3 +1,118 @@
+import difflib
+import logging
+import re
+
+from .banco import conexao
+from .catalogo import obter_catalogo
+from .esquema import normalizar
+from .memoria import memorizar
+from .metricas import instrumentar
+
+logger = logging.getLogger(__name__)
+
+# Quantos candidatos do índice de trigramas são reavaliados em Python
+LIMITE_CANDIDATOS = 50
+# Similaridade mínima (0 a 1) para um candidato aproximado ser retornado
+SIMILARIDADE_MINIMA = 0.5
+LIMITE_MAXIMO_RESULTADOS = 20
+
+
+def _trigramas(texto: str) -> list:
+    vistos = {}
+    for i in range(len(texto) - 2):
+        vistos.setdefault(texto[i:i + 3], None)
+    return list(vistos)
+
+
+def _consulta_palavras(texto: str) -> str:
+    # Todas as palavras precisam aparecer (em qualquer coluna), e cada uma vale
+    # como prefixo: "mem post" encontra "memorias postumas". Pontuação é ignorada.
+    return " ".join(f'"{palavra}"*' for palavra in re.findall(r"\w+", texto))
+
+
+def _consulta_trigramas(texto: str) -> str:
+    trigramas = _trigramas(texto)[:64]
+    return " OR ".join('"' + t.replace('"', '""') + '"' for t in trigramas)
+
+
+def _similaridade(termo: str, titulo_norm: str, autor_norm: str) -> float:
+    # Maior entre a cobertura de trigramas do termo e a semelhança de sequência
+    # com título, autor ou ambos.
+    melhor = 0.0
+    trigramas = _trigramas(termo)
+    for alvo in (titulo_norm or "", autor_norm or "", f"{titulo_norm} {autor_norm}"):
+        if trigramas:
+            cobertura = sum(1 for t in trigramas if t in alvo) / len(trigramas)
+            melhor = max(melhor, cobertura)
+        melhor = max(melhor, difflib.SequenceMatcher(None, termo, alvo).ratio())
+    return melhor
+
+
+_SQL_RANQUEADO = """
+    SELECT l.id, l.titulo, l.autor, l.genero, l.disponibilidade,
+           l.exemplares_disponiveis, l.titulo_norm, l.autor_norm
+    FROM (
+        SELECT rowid, bm25({tabela}{pesos}) AS ordem
+        FROM {tabela}
+        WHERE {tabela} MATCH ?
+        ORDER BY ordem
+        LIMIT ?
+    ) AS f
+    JOIN livros l ON l.id = f.rowid
+    ORDER BY f.ordem
+"""
+
+
+def pesquisar_acervo(conn, termo: str, limite: int = 5) -> list:
+    """
+    Pesquisa ranqueada no acervo por título, autor ou gênero.
+
+    Primeiro consulta o índice de palavras (BM25, título com mais peso que
+    autor e gênero). Se faltarem resultados, completa com o índice de
+    trigramas, que tolera erros de digitação, reavaliando os candidatos pela
+    similaridade com o termo.
+
+    Returns:
+        list: Tuplas (id, titulo, autor, genero, disponibilidade, exemplares_disponiveis).
+    """
+    termo_norm = normalizar(termo) or ""
+    encontrados = {}
+
+    consulta = _consulta_palavras(termo_norm)
+    if consulta:
+        sql = _SQL_RANQUEADO.format(tabela="livros_fts", pesos=", 10.0, 5.0, 1.0")
+        for linha in conn.execute(sql, (consulta, limite)):
+            encontrados.setdefault(linha[0], linha[:6])
+
+    if len(encontrados) < limite and len(termo_norm) >= 3:
+        sql = _SQL_RANQUEADO.format(tabela="livros_trigramas", pesos=", 2.0, 1.0")
+        candidatos = []
+        for linha in conn.execute(sql, (_consulta_trigramas(termo_norm), LIMITE_CANDIDATOS)):
+            if linha[0] in encontrados:
+                continue
+            nota = _similaridade(termo_norm, linha[6], linha[7])
+            if nota >= SIMILARIDADE_MINIMA:
+                candidatos.append((nota, linha[:6]))
+        candidatos.sort(key=lambda item: item[0], reverse=True)
+        for _, linha in candidatos[:limite - len(encontrados)]:
+            encontrados[linha[0]] = linha
+
+    return list(encontrados.values())
+
+
+def _formatar_resultado(linha) -> dict:
+    _, titulo, autor, genero, disponibilidade, exemplares_disponiveis = linha
+    return {
+        "titulo": titulo,
+        "autor": autor,
+        "genero": genero,
+        "disponibilidade": bool(disponibilidade),
+        "exemplares_disponiveis": exemplares_disponiveis
+    }
+
+
+@instrumentar
+@memorizar()
 def buscar_livro(titulo: str = "", autor: str = "") -> dict:
     """
     Busca os dados de um livro na biblioteca a partir do banco SQLite.
@@ -10,36 +125,36 @@ def buscar_livro(titulo: str = "", autor: str = "") -> dict:
         dict: Dados do livro ou mensagem de erro.
     """
     try:
-        import sqlite3
-        print("Buscando livro")
-        conn = sqlite3.connect("./multi_agents/biblioteca.db")
-        cursor = conn.cursor()
-
+        logger.debug("Buscando livro: titulo=%r autor=%r", titulo, autor)
         if titulo and autor:
-            cursor.execute("""
+            sql, parametros = ("""
                 SELECT titulo, autor, disponibilidade, exemplares_disponiveis
                 FROM livros
-                WHERE LOWER(titulo) = LOWER(?) AND LOWER(autor) = LOWER(?)
-            """, (titulo, autor))
+                WHERE titulo_norm = ? AND autor_norm = ?
+            """, (normalizar(titulo), normalizar(autor)))
         elif titulo:
-            cursor.execute("""
+            sql, parametros = ("""
                 SELECT titulo, autor, disponibilidade, exemplares_disponiveis
                 FROM livros
-                WHERE LOWER(titulo) = LOWER(?)
-            """, (titulo,))
+                WHERE titulo_norm = ?
+            """, (normalizar(titulo),))
         elif autor:
-            cursor.execute("""
+            sql, parametros = ("""
                 SELECT titulo, autor, disponibilidade, exemplares_disponiveis
                 FROM livros
-                WHERE LOWER(autor) = LOWER(?)
-            """, (autor,))
+                WHERE autor_norm = ?
+            """, (normalizar(autor),))
         else:
             return {
                 "error_message": "É necessário informar pelo menos o título ou o autor do livro."
             }
 
-        resultado = cursor.fetchone()
-        conn.close()
+        catalogo = obter_catalogo()
+        if catalogo is not None:
+            resultado = catalogo.buscar(normalizar(titulo) if titulo else None, normalizar(autor) if autor else None)
+        else:
+            with conexao() as conn:
+                resultado = conn.execute(sql, parametros).fetchone()
 
         if resultado:
             titulo, autor, disponibilidade, exemplares_disponiveis = resultado
@@ -50,12 +165,52 @@ def buscar_livro(titulo: str = "", autor: str = "") -> dict:
                 "exemplares_disponiveis": exemplares_disponiveis
             }
         else:
-            return {
+            # Sem correspondência exata: devolve os títulos mais próximos na mesma chamada
+            with conexao() as conn:
+                semelhantes = pesquisar_acervo(conn, f"{titulo} {autor}".strip())
+            resposta = {
                 "error_message": "Livro não encontrado no acervo."
             }
+            if semelhantes:
+                resposta["livros_semelhantes"] = [_formatar_resultado(l) for l in semelhantes]
+            return resposta
 
     except Exception as e:
-        print(e)
+        logger.exception("Erro ao buscar livro")
         return {
             "error_message": f"Erro ao acessar o banco: {str(e)}"
-        }
\ No newline at end of file
+        }
+
+
+@instrumentar
+@memorizar()
+def pesquisar_livros(termo: str, limite: int = 5) -> dict:
+    """
+    Pesquisa livros por parte do título, autor ou gênero, tolerando erros de
+    digitação, e retorna os resultados mais relevantes.
+
+    Args:
+        termo (str): Texto livre, por exemplo "dom casmuro" ou "tolkien".
+        limite (int): Quantidade máxima de resultados (padrão 5, máximo 20).
+
+    Returns:
+        dict: {
+            "status": "success"|"error",
+            "total": int,
+            "livros": [{"titulo": str, "autor": str, "genero": str, "disponibilidade": bool, "exemplares_disponiveis": int}],
+            "error_message": str | None
+        }
+    """
+    if not termo or not termo.strip():
+        return {"status": "error", "error_message": "Informe um termo para a pesquisa."}
+    limite = max(1, min(int(limite), LIMITE_MAXIMO_RESULTADOS))
+    try:
+        with conexao() as conn:
+            linhas = pesquisar_acervo(conn, termo, limite)
+        return {
+            "status": "success",
+            "total": len(linhas),
+            "livros": [_formatar_resultado(linha) for linha in linhas]
+        }
+    except Exception as e:
+        return {"status": "error", "error_message": f"Erro ao pesquisar no acervo: {str(e)}"}
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+_AUSENTE = object()
+
+
+class CacheLRU:
+    """
+    Cache em memória com limite de tamanho (LRU) e expiração por tempo (TTL).
+
+    Seguro para múltiplas threads. Mantém contadores de acertos, falhas,
+    expirações e remoções para acompanhar a eficiência do cache.
+    """
+
+    def __init__(self, capacidade: int = 1024, ttl: float = 300.0, relogio=time.monotonic):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self._relogio = relogio
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.removidos = 0
+
+    def obter(self, chave, carregar=None, padrao=None):
+        """
+        Retorna o valor da chave. Em caso de falha, usa `carregar(chave)` para
+        buscar o valor e o guarda no cache (valores None não são guardados).
+        """
+        agora = self._relogio()
+        with self._trava:
+            item = self._itens.get(chave, _AUSENTE)
+            if item is not _AUSENTE:
+                valor, expira_em = item
+                if expira_em > agora:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return valor
+                del self._itens[chave]
+                self.expirados += 1
+            self.falhas += 1
+        if carregar is None:
+            return padrao
+        valor = carregar(chave)
+        if valor is None:
+            return padrao
+        self.definir(chave, valor)
+        return valor
+
+    def definir(self, chave, valor, ttl: float = None) -> None:
+        expira_em = self._relogio() + (self.ttl if ttl is None else ttl)
+        with self._trava:
+            self._itens[chave] = (valor, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+                self.removidos += 1
+
+    def invalidar(self, chave) -> bool:
+        with self._trava:
+            return self._itens.pop(chave, _AUSENTE) is not _AUSENTE
+
+    def invalidar_se(self, condicao) -> int:
+        """Remove todas as entradas para as quais `condicao(chave, valor)` é verdadeira."""
+        with self._trava:
+            chaves = [chave for chave, (valor, _) in self._itens.items() if condicao(chave, valor)]
+            for chave in chaves:
+                del self._itens[chave]
+        return len(chaves)
+
+    def limpar(self) -> None:
+        with self._trava:
+            self._itens.clear()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                "tamanho": len(self._itens),
+                "capacidade": self.capacidade,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "expirados": self.expirados,
+                "removidos": self.removidos,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            }
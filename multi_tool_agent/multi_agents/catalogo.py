@@ -0,0 +1,336 @@
+"""
+Catálogo do acervo em memória, opcional, para instalações que quase só
+consultam (terminais de autoatendimento, por exemplo).
+
+Ativado com BIBLIOTECA_CATALOGO_MEMORIA=1 (ou `ativar_catalogo()`), o
+catálogo é carregado do banco no primeiro uso e passa a responder
+`buscar_livro`, `sugerir_livros_por_autor`, `sugerir_livros_por_genero` e
+`listar_acervo_disponivel` sem consultas SQL. Os livros ficam em colunas
+(arrays e listas) ordenadas por (titulo_norm, id), a mesma ordem das
+páginas do acervo, com índices por autor e gênero normalizados.
+
+Empréstimos e devoluções deste processo e as alterações anotadas pelos
+outros processos (ver sincronizacao.py) recarregam só o estoque dos livros
+alterados. Livros novos, removidos ou com título, autor ou gênero mudados
+fazem o catálogo inteiro ser recarregado no próximo uso.
+"""
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+from .banco import conexao
+from .esquema import normalizar
+from .metricas import registrar_fonte
+from .sincronizacao import registrar_invalidador
+
+logger = logging.getLogger(__name__)
+
+CATALOGO_EM_MEMORIA = os.environ.get("BIBLIOTECA_CATALOGO_MEMORIA", "") not in ("", "0")
+
+
+class CatalogoMemoria:
+    """
+    Livros do acervo em colunas, na ordem (titulo_norm, id).
+
+    Cada livro é uma posição nas colunas. Autores e gêneros repetidos são
+    guardados uma vez só e referenciados por código; `por_autor` e
+    `por_genero` guardam as posições de cada um na ordem do catálogo, e
+    `por_genero_titulo`, na ordem do título original (a das sugestões).
+    """
+
+    __slots__ = (
+        "ids", "titulos_norm", "titulos", "isbns", "autor_de", "autores", "autores_norm",
+        "genero_de", "generos_norm", "disponiveis", "totais",
+        "por_autor", "por_genero", "por_genero_titulo", "disponiveis_por_genero", "total_disponiveis",
+    )
+
+    def __init__(self):
+        self.ids = array("q")
+        self.titulos_norm = []
+        self.titulos = []
+        self.isbns = []
+        self.autor_de = array("I")
+        self.autores = []
+        self.autores_norm = []
+        self.genero_de = array("I")
+        self.generos_norm = []
+        self.disponiveis = array("i")
+        self.totais = array("i")
+        self.por_autor = {}
+        self.por_genero = {}
+        self.por_genero_titulo = {}
+        self.disponiveis_por_genero = {}
+        self.total_disponiveis = 0
+
+    @classmethod
+    def carregar(cls, conn) -> "CatalogoMemoria":
+        """Lê todos os livros do banco (os sem título ficam de fora)."""
+        catalogo = cls()
+        codigos_autor, codigos_genero = {}, {}
+        por_autor, por_genero = {}, {}
+        linhas = conn.execute(
+            """
+            SELECT id, titulo_norm, titulo, autor, genero_norm, isbn, exemplares_disponiveis, exemplares_total
+            FROM livros
+            WHERE titulo_norm IS NOT NULL
+            ORDER BY titulo_norm, id
+            """
+        )
+        for posicao, (id_livro, titulo_norm, titulo, autor, genero_norm, isbn, disponiveis, total) in enumerate(linhas):
+            codigo_autor = codigos_autor.get(autor)
+            if codigo_autor is None:
+                codigo_autor = codigos_autor[autor] = len(catalogo.autores)
+                catalogo.autores.append(autor)
+                catalogo.autores_norm.append(normalizar(autor) if autor is not None else None)
+            codigo_genero = codigos_genero.get(genero_norm)
+            if codigo_genero is None:
+                codigo_genero = codigos_genero[genero_norm] = len(catalogo.generos_norm)
+                catalogo.generos_norm.append(genero_norm)
+            disponiveis = disponiveis or 0
+
+            catalogo.ids.append(id_livro)
+            catalogo.titulos_norm.append(titulo_norm)
+            catalogo.titulos.append(titulo)
+            catalogo.isbns.append(isbn)
+            catalogo.autor_de.append(codigo_autor)
+            catalogo.genero_de.append(codigo_genero)
+            catalogo.disponiveis.append(disponiveis)
+            catalogo.totais.append(total or 0)
+
+            autor_norm = catalogo.autores_norm[codigo_autor]
+            if autor_norm is not None:
+                por_autor.setdefault(autor_norm, []).append(posicao)
+            if genero_norm is not None:
+                por_genero.setdefault(genero_norm, []).append(posicao)
+            if disponiveis > 0:
+                catalogo._contar_disponivel(posicao, 1)
+
+        catalogo.por_autor = {chave: array("I", posicoes) for chave, posicoes in por_autor.items()}
+        catalogo.por_genero = {chave: array("I", posicoes) for chave, posicoes in por_genero.items()}
+        catalogo.por_genero_titulo = {
+            chave: array("I", sorted(posicoes, key=catalogo._ordem_titulo)) for chave, posicoes in por_genero.items()
+        }
+        return catalogo
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _ordem_titulo(self, posicao: int) -> tuple:
+        return self.titulos[posicao], self.ids[posicao]
+
+    def _chave(self, posicao: int) -> tuple:
+        return self.titulos_norm[posicao], self.ids[posicao]
+
+    def _faixa_titulo(self, titulo_norm: str) -> range:
+        inicio = bisect_left(self.titulos_norm, titulo_norm)
+        return range(inicio, bisect_right(self.titulos_norm, titulo_norm, inicio))
+
+    def _contar_disponivel(self, posicao: int, delta: int) -> None:
+        self.total_disponiveis += delta
+        genero_norm = self.generos_norm[self.genero_de[posicao]]
+        if genero_norm is not None:
+            self.disponiveis_por_genero[genero_norm] = self.disponiveis_por_genero.get(genero_norm, 0) + delta
+
+    def buscar(self, titulo_norm: str = None, autor_norm: str = None):
+        """
+        Livro com o título e/ou o autor normalizados, o mesmo que o SELECT de
+        busca.py encontra: pelo título, o de menor id; só pelo autor, o
+        primeiro em ordem de título.
+
+        Returns:
+            tuple | None: (titulo, autor, disponibilidade, exemplares_disponiveis).
+        """
+        if titulo_norm is not None:
+            posicao = next(
+                (p for p in self._faixa_titulo(titulo_norm)
+                 if autor_norm is None or self.autores_norm[self.autor_de[p]] == autor_norm),
+                None,
+            )
+        else:
+            posicoes = self.por_autor.get(autor_norm)
+            posicao = min(posicoes, key=self._ordem_titulo) if posicoes else None
+        if posicao is None:
+            return None
+        disponiveis = self.disponiveis[posicao]
+        return self.titulos[posicao], self.autores[self.autor_de[posicao]], disponiveis > 0, disponiveis
+
+    def _sugestoes(self, posicoes, titulo_excluido: str, limite: int) -> list:
+        linhas = []
+        for posicao in posicoes:
+            if self.titulos_norm[posicao] == titulo_excluido:
+                continue
+            disponiveis = self.disponiveis[posicao]
+            linhas.append((self.titulos[posicao], disponiveis > 0, disponiveis))
+            if len(linhas) >= limite:
+                break
+        return linhas
+
+    def sugerir_por_autor(self, autor_norm: str, titulo_excluido: str, limite: int) -> list:
+        """Livros do autor, exceto o título excluído, em ordem de título: [(titulo, disponibilidade, exemplares)]."""
+        # Poucos livros por autor: ordenar na consulta sai mais barato que guardar outra ordem
+        posicoes = sorted(self.por_autor.get(autor_norm, ()), key=self._ordem_titulo)
+        return self._sugestoes(posicoes, titulo_excluido, limite)
+
+    def sugerir_por_genero(self, genero_norm: str, titulo_excluido: str, limite: int) -> list:
+        """Livros do gênero, exceto o título excluído, em ordem de título: [(titulo, disponibilidade, exemplares)]."""
+        return self._sugestoes(self.por_genero_titulo.get(genero_norm, ()), titulo_excluido, limite)
+
+    def pagina_disponiveis(self, autor_norm: str = None, genero_norm: str = None, apos: tuple = None,
+                           limite: int = 20) -> tuple:
+        """
+        Página dos livros disponíveis depois da chave `apos`, como `_pagina_acervo` em emprestimo.py.
+
+        Returns:
+            tuple: (total de livros disponíveis com o filtro, linhas
+            (titulo_norm, id, titulo, autor, isbn, exemplares_disponiveis, exemplares_total)).
+        """
+        if autor_norm is not None:
+            posicoes = self.por_autor.get(autor_norm, ())
+            if genero_norm is not None:
+                posicoes = [p for p in posicoes if self.generos_norm[self.genero_de[p]] == genero_norm]
+            total = sum(1 for p in posicoes if self.disponiveis[p] > 0)
+        elif genero_norm is not None:
+            posicoes = self.por_genero.get(genero_norm, ())
+            total = self.disponiveis_por_genero.get(genero_norm, 0)
+        else:
+            posicoes = range(len(self.ids))
+            total = self.total_disponiveis
+        inicio = bisect_right(posicoes, tuple(apos), key=self._chave) if apos else 0
+
+        linhas = []
+        for posicao in islice(posicoes, inicio, None):
+            disponiveis = self.disponiveis[posicao]
+            if disponiveis <= 0:
+                continue
+            linhas.append((
+                self.titulos_norm[posicao], self.ids[posicao], self.titulos[posicao],
+                self.autores[self.autor_de[posicao]], self.isbns[posicao], disponiveis, self.totais[posicao],
+            ))
+            if len(linhas) >= limite:
+                break
+        return total, linhas
+
+    def atualizar(self, conn, titulos_norm) -> bool:
+        """
+        Relê do banco o estoque dos livros com os títulos normalizados informados.
+
+        Returns:
+            bool: False se algum livro foi incluído, removido ou teve título,
+            autor, gênero ou ISBN alterado; nesse caso o catálogo precisa ser
+            recarregado inteiro.
+        """
+        for titulo_norm in titulos_norm:
+            faixa = self._faixa_titulo(titulo_norm)
+            linhas = conn.execute(
+                """
+                SELECT id, titulo, autor, genero_norm, isbn, exemplares_disponiveis, exemplares_total
+                FROM livros WHERE titulo_norm = ? ORDER BY id
+                """,
+                (titulo_norm,),
+            ).fetchall()
+            if len(linhas) != len(faixa):
+                return False
+            for posicao, (id_livro, titulo, autor, genero_norm, isbn, disponiveis, total) in zip(faixa, linhas):
+                if (id_livro != self.ids[posicao] or titulo != self.titulos[posicao]
+                        or autor != self.autores[self.autor_de[posicao]]
+                        or genero_norm != self.generos_norm[self.genero_de[posicao]]
+                        or isbn != self.isbns[posicao]):
+                    return False
+                disponiveis = disponiveis or 0
+                if (disponiveis > 0) != (self.disponiveis[posicao] > 0):
+                    self._contar_disponivel(posicao, 1 if disponiveis > 0 else -1)
+                self.disponiveis[posicao] = disponiveis
+                self.totais[posicao] = total or 0
+        return True
+
+
+_ativo = CATALOGO_EM_MEMORIA
+_catalogo = None
+# Incrementada quando o catálogo precisa ser recarregado inteiro; o catálogo
+# atual vale enquanto _versao_carregada for igual a ela
+_versao = 0
+_versao_carregada = -1
+_trava = threading.Lock()
+_contadores = {"recargas": 0, "atualizacoes": 0}
+
+
+def ativar_catalogo(ativo: bool = True) -> None:
+    """Liga ou desliga o catálogo em memória; ligado, ele é carregado no próximo uso."""
+    global _ativo, _catalogo
+    with _trava:
+        _ativo = ativo
+        _catalogo = None
+
+
+def catalogo_ativo() -> bool:
+    return _ativo
+
+
+def obter_catalogo():
+    """
+    Retorna o catálogo em memória, carregando-o se preciso, ou None se ele
+    estiver desligado (as ferramentas então consultam o banco).
+    """
+    global _catalogo, _versao_carregada
+    if not _ativo:
+        return None
+    if _catalogo is None or _versao_carregada != _versao:
+        with _trava:
+            if _ativo and (_catalogo is None or _versao_carregada != _versao):
+                versao = _versao
+                with conexao() as conn:
+                    _catalogo = CatalogoMemoria.carregar(conn)
+                _versao_carregada = versao
+                _contadores["recargas"] += 1
+                logger.info("Catálogo em memória carregado com %d livros", len(_catalogo))
+    return _catalogo
+
+
+def invalidar_catalogo() -> None:
+    """Faz o catálogo ser recarregado inteiro no próximo uso."""
+    global _versao
+    _versao += 1
+
+
+def atualizar_catalogo(titulos) -> None:
+    """Relê o estoque dos livros com esses títulos, se o catálogo estiver carregado."""
+    catalogo = _catalogo
+    if catalogo is None or not _ativo:
+        return
+    with _trava:
+        try:
+            with conexao() as conn:
+                atualizado = catalogo.atualizar(conn, {normalizar(titulo) for titulo in titulos})
+        except sqlite3.Error as erro:
+            logger.warning("Falha ao atualizar o catálogo em memória: %s", erro)
+            atualizado = False
+        _contadores["atualizacoes"] += 1
+    if not atualizado:
+        invalidar_catalogo()
+
+
+def _alteracoes_externas(titulos) -> None:
+    # Livros alterados por outros processos (ver sincronizacao.py)
+    if titulos is None:
+        invalidar_catalogo()
+    else:
+        atualizar_catalogo(titulos)
+
+
+registrar_invalidador(_alteracoes_externas)
+
+
+def estatisticas() -> dict:
+    catalogo = _catalogo
+    return {
+        "ativo": int(_ativo),
+        "livros": len(catalogo) if catalogo is not None else 0,
+        **_contadores,
+    }
+
+
+registrar_fonte("catalogo", estatisticas)
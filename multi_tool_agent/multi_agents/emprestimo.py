@@ -1,43 +1,74 @@
+import base64
 import datetime
-import sqlite3
+import functools
+import json
+from typing import TYPE_CHECKING
 from zoneinfo import ZoneInfo
-from google.adk.agents import Agent
-
-
-# Função para obter dados do banco no mesmo formato do dicionário
-db_path = "./multi_agents/biblioteca.db"
-def obter_acervo_do_banco(db_path: str = db_path) -> dict:
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT titulo, autor, isbn, exemplares_total, exemplares_disponiveis,
-                   (exemplares_disponiveis > 0) as disponibilidade
-            FROM livros
-        ''')
-        acervo = {}
-        for row in cursor.fetchall():
-            titulo, autor, isbn, total, disponiveis, disponibilidade = row
-            acervo[titulo] = {
-                "autor": autor,
-                "disponibilidade": bool(disponibilidade),
-                "exemplares_total": total,
-                "exemplares_disponiveis": disponiveis,
-                "isbn": isbn
-            }
-        return acervo
 
-# Acesso os livros do banco:
-acervo_biblioteca = obter_acervo_do_banco()
+from .armazenamento import obter_armazenamento
+from .assincrono import assincrona
+from .banco import conexao, executar_transacao, transacao
+from .cache import CacheLRU
+from .catalogo import atualizar_catalogo, obter_catalogo
+from .esquema import normalizar
+from .estatisticas import contar_acervo
+from .memoria import invalidar_livros, memorizar
+from .metricas import instrumentar, registrar_fonte
+from .sessao import resolver_usuario
+from .sincronizacao import registrar_invalidador, sincronizar
+
+if TYPE_CHECKING:
+    # Só para as anotações: o ADK é importado quando o agente é criado
+    from google.adk.tools import ToolContext
+
+
+def _carregar_livro(titulo_norm: str) -> dict:
+    return obter_armazenamento().obter_livro(titulo_norm)
+
+
+def _data_br(texto: str) -> str:
+    # "AAAA-MM-DD HH:MM:SS" do banco para "DD/MM/AAAA" das respostas
+    return datetime.datetime.strptime(texto[:19], "%Y-%m-%d %H:%M:%S").strftime("%d/%m/%Y")
+
+
+# Cache dos livros do acervo, indexado pelo título normalizado. Carrega cada
+# livro sob demanda e é invalidado pelos empréstimos e devoluções.
+acervo_biblioteca = CacheLRU(capacidade=4096, ttl=60.0)
+registrar_fonte("cache_acervo", acervo_biblioteca.estatisticas)
+
 
-# Registro de empréstimos
-emprestimos_ativos = {}
+def obter_livro_do_acervo(nome_livro: str) -> dict:
+    sincronizar()
+    return acervo_biblioteca.obter(normalizar(nome_livro), _carregar_livro)
 
+
+def _alteracoes_externas(titulos) -> None:
+    # Livros alterados por outros processos (ver sincronizacao.py)
+    if titulos is None:
+        acervo_biblioteca.limpar()
+    else:
+        for titulo in titulos:
+            acervo_biblioteca.invalidar(titulo)
+
+
+registrar_invalidador(_alteracoes_externas)
+
+
+def _livros_alterados(titulos) -> None:
+    # Estoque mudou: descarta o livro do cache do acervo e as respostas que o mostram
+    # e relê o estoque no catálogo em memória, se ativo
+    for titulo in titulos:
+        acervo_biblioteca.invalidar(normalizar(titulo))
+    atualizar_catalogo(titulos)
+    invalidar_livros(titulos)
+
+@instrumentar
 def buscar_livro(nome_livro: str, nome_usuario: str) -> dict:
-    livro = acervo_biblioteca.get(nome_livro)
+    livro = obter_livro_do_acervo(nome_livro)
     if livro:
         return {
             "status": "success",
-            "nome_livro": nome_livro,
+            "nome_livro": livro["titulo"],
             "autor": livro["autor"],
             "isbn": livro["isbn"],
             "disponibilidade": livro["disponibilidade"],
@@ -50,218 +81,569 @@ def buscar_livro(nome_livro: str, nome_usuario: str) -> dict:
             "error_message": f"Livro '{nome_livro}' não encontrado no acervo da biblioteca."
         }
 
-def realizar_emprestimo(nome_livro: str, nome_usuario: str, dias_emprestimo: int = 14) -> dict:
+@instrumentar
+def realizar_emprestimo(nome_livro: str, nome_usuario: str, dias_emprestimo: int = 14,
+                        id_usuario: int = 0, tool_context: "ToolContext" = None) -> dict:
+    """
+    Realiza o empréstimo de um livro para o usuário.
+
+    Args:
+        nome_livro (str): Título do livro.
+        nome_usuario (str): Nome completo ou primeiro nome do usuário.
+        dias_emprestimo (int): Prazo do empréstimo em dias (padrão 14).
+        id_usuario (int): Id retornado por usuario_existe, se já conhecido (evita nova busca pelo nome).
+
+    Returns:
+        dict: Detalhes do empréstimo ou mensagem de erro.
+    """
+    armazenamento = obter_armazenamento()
     try:
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.cursor()
-            # Busca o id_usuario
-            cursor.execute(
-                "SELECT id FROM usuarios WHERE LOWER(nome) = LOWER(?) OR LOWER(nome) LIKE LOWER(?) || ' %' LIMIT 1",
-                (nome_usuario, nome_usuario)
-            )
-            usuario_row = cursor.fetchone()
-            if not usuario_row:
-                return {"status": "error", "error_message": f"Usuário '{nome_usuario}' não encontrado."}
-            id_usuario = usuario_row[0]
+        # Identifica o usuário (reaproveitando a sessão, se possível)
+        usuario_row = resolver_usuario(armazenamento, nome_usuario, tool_context, id_usuario)
+        if not usuario_row:
+            return {"status": "error", "error_message": f"Usuário '{nome_usuario}' não encontrado."}
+        # Reserva um exemplar, se ainda houver estoque, e registra o empréstimo
+        emprestimo = armazenamento.emprestar(usuario_row[0], nome_livro, dias_emprestimo)
+    except Exception as e:
+        return {"status": "error", "error_message": f"Erro ao registrar empréstimo: {str(e)}"}
+    if emprestimo["status"] != "success":
+        return emprestimo
+    _livros_alterados([nome_livro])
+    return {
+        "status": "success",
+        "message": "Empréstimo realizado com sucesso!",
+        "detalhes": {
+            "livro": nome_livro,
+            "usuario": nome_usuario,
+            "data_emprestimo": _data_br(emprestimo["data_emprestimo"]),
+            "data_devolucao": _data_br(emprestimo["data_devolucao"]),
+            "dias_emprestimo": dias_emprestimo
+        }
+    }
 
-            # Busca o id_livro
-            cursor.execute(
-                "SELECT id FROM livros WHERE LOWER(titulo) = LOWER(?) LIMIT 1",
-                (nome_livro,)
-            )
-            livro_row = cursor.fetchone()
-            if not livro_row:
-                return {"status": "error", "error_message": f"Livro '{nome_livro}' não encontrado."}
-            id_livro = livro_row[0]
-
-            # Verifica disponibilidade
-            cursor.execute("SELECT exemplares_disponiveis FROM livros WHERE id = ?", (id_livro,))
-            row = cursor.fetchone()
-            if not row or row[0] <= 0:
-                return {"status": "error", "error_message": "Livro não disponível para empréstimo."}
-
-            # Atualiza exemplares disponíveis
-            cursor.execute(
-                "UPDATE livros SET exemplares_disponiveis = exemplares_disponiveis - 1, disponibilidade = CASE WHEN exemplares_disponiveis - 1 > 0 THEN 1 ELSE 0 END WHERE id = ?",
-                (id_livro,)
-            )
+@instrumentar
+def devolver_livro(nome_livro: str, nome_usuario: str, id_usuario: int = 0,
+                   tool_context: "ToolContext" = None) -> dict:
+    """
+    Processa a devolução de um livro emprestado ao usuário.
+
+    Args:
+        nome_livro (str): Título do livro.
+        nome_usuario (str): Nome completo ou primeiro nome do usuário.
+        id_usuario (int): Id retornado por usuario_existe, se já conhecido (evita nova busca pelo nome).
+
+    Returns:
+        dict: Detalhes da devolução, com atraso quando houver, ou mensagem de erro.
+    """
+    armazenamento = obter_armazenamento()
+    try:
+        # Identifica o usuário (reaproveitando a sessão, se possível)
+        usuario_row = resolver_usuario(armazenamento, nome_usuario, tool_context, id_usuario)
+        if not usuario_row:
+            return {"status": "error", "error_message": f"Usuário '{nome_usuario}' não encontrado."}
+        # Encerra o empréstimo ativo mais recente e devolve o exemplar ao estoque
+        devolucao = armazenamento.devolver(usuario_row[0], nome_livro)
+    except Exception as e:
+        return {"status": "error", "error_message": f"Erro ao processar devolução: {str(e)}"}
+    if devolucao["status"] != "success":
+        return devolucao
+    _livros_alterados([nome_livro])
+    atraso = devolucao["atraso_dias"]
+    resultado = {
+        "status": "success",
+        "message": "Devolução realizada com sucesso!",
+        "detalhes": {
+            "livro": nome_livro,
+            "usuario": nome_usuario,
+            "data_emprestimo": devolucao["data_emprestimo"],
+            "data_devolucao_prevista": devolucao["data_devolucao_prevista"],
+            "data_devolucao_real": _data_br(devolucao["devolvido_em"]),
+            "atraso_dias": atraso
+        }
+    }
+    if atraso > 0:
+        resultado["aviso"] = f"Livro devolvido com {atraso} dia(s) de atraso."
+    return resultado
+
+
+# Quantidade máxima de livros processados em um único lote
+LIMITE_LOTE = 100
+
+
+def _livros_por_titulo(conn, titulos: list) -> dict:
+    # Resolve todos os títulos em uma única consulta pelo índice de titulo_norm
+    normalizados = sorted({normalizar(titulo) for titulo in titulos})
+    marcadores = ", ".join("?" for _ in normalizados)
+    rows = conn.execute(
+        f"""
+        SELECT titulo_norm, id, titulo, exemplares_disponiveis
+        FROM livros
+        WHERE titulo_norm IN ({marcadores})
+        """,
+        normalizados
+    ).fetchall()
+    livros = {}
+    for titulo_norm, id_livro, titulo, disponiveis in rows:
+        livros.setdefault(titulo_norm, (id_livro, titulo, disponiveis))
+    return livros
+
+
+def _validar_lote(titulos: list):
+    if not titulos:
+        return {"status": "error", "error_message": "Informe pelo menos um livro."}
+    if len(titulos) > LIMITE_LOTE:
+        return {"status": "error", "error_message": f"Máximo de {LIMITE_LOTE} livros por lote."}
+    return None
+
+
+def _resumo_lote(nome_usuario: str, resultados: list) -> dict:
+    sucessos = sum(1 for item in resultados if item["status"] == "success")
+    return {
+        "status": "success" if sucessos else "error",
+        "usuario": nome_usuario,
+        "total_sucesso": sucessos,
+        "total_falha": len(resultados) - sucessos,
+        "resultados": resultados
+    }
+
+
+@instrumentar
+def realizar_emprestimos_lote(titulos: list[str], nome_usuario: str, dias_emprestimo: int = 14,
+                              id_usuario: int = 0, tool_context: "ToolContext" = None) -> dict:
+    """
+    Realiza o empréstimo de vários livros para o mesmo usuário em uma única transação.
+
+    Args:
+        titulos (list[str]): Títulos dos livros a emprestar.
+        nome_usuario (str): Nome completo ou primeiro nome do usuário.
+        dias_emprestimo (int): Prazo do empréstimo em dias (padrão 14).
+        id_usuario (int): Id retornado por usuario_existe, se já conhecido (evita nova busca pelo nome).
+
+    Returns:
+        dict: Resumo do lote e o resultado individual de cada livro.
+    """
+    erro = _validar_lote(titulos)
+    if erro:
+        return erro
 
-            # Cria o lançamento na tabela emprestimos
-            data_emprestimo = datetime.datetime.now()
-            data_devolucao = data_emprestimo + datetime.timedelta(days=dias_emprestimo)
-            cursor.execute(
+    def _registrar(conn):
+        usuario_row = resolver_usuario(conn, nome_usuario, tool_context, id_usuario)
+        if not usuario_row:
+            return {"status": "error", "error_message": f"Usuário '{nome_usuario}' não encontrado."}
+        usuario_id, nome_completo = usuario_row
+        livros = _livros_por_titulo(conn, titulos)
+
+        data_emprestimo = datetime.datetime.now()
+        data_devolucao = data_emprestimo + datetime.timedelta(days=dias_emprestimo)
+        # A trava de escrita já está com esta transação, então o estoque lido
+        # não muda até o commit; reservamos os exemplares em memória.
+        estoque = {id_livro: disponiveis or 0 for id_livro, _, disponiveis in livros.values()}
+        retirados = {}
+        resultados = []
+        for titulo in titulos:
+            livro = livros.get(normalizar(titulo))
+            if not livro:
+                resultados.append({"livro": titulo, "status": "error", "error_message": f"Livro '{titulo}' não encontrado."})
+                continue
+            id_livro = livro[0]
+            if estoque[id_livro] <= 0:
+                resultados.append({"livro": livro[1], "status": "error", "error_message": "Livro não disponível para empréstimo."})
+                continue
+            estoque[id_livro] -= 1
+            retirados[id_livro] = retirados.get(id_livro, 0) + 1
+            resultados.append({
+                "livro": livro[1],
+                "status": "success",
+                "data_emprestimo": data_emprestimo.strftime("%d/%m/%Y"),
+                "data_devolucao": data_devolucao.strftime("%d/%m/%Y")
+            })
+
+        if retirados:
+            cursor = conn.executemany(
+                """
+                UPDATE livros
+                SET exemplares_disponiveis = exemplares_disponiveis - ?
+                WHERE id = ? AND exemplares_disponiveis >= ?
+                """,
+                [(qtd, id_livro, qtd) for id_livro, qtd in retirados.items()]
+            )
+            if cursor.rowcount != len(retirados):
+                raise RuntimeError("Estoque alterado durante o lote.")
+            conn.executemany(
                 """
                 INSERT INTO emprestimos (id_usuario, id_livro, data_emprestimo, data_devolucao, devolvido)
                 VALUES (?, ?, ?, ?, 0)
                 """,
-                (
-                    id_usuario,
-                    id_livro,
-                    data_emprestimo.strftime("%Y-%m-%d %H:%M:%S"),
-                    data_devolucao.strftime("%Y-%m-%d %H:%M:%S"),
-                ),
+                [
+                    (
+                        usuario_id,
+                        id_livro,
+                        data_emprestimo.strftime("%Y-%m-%d %H:%M:%S"),
+                        data_devolucao.strftime("%Y-%m-%d %H:%M:%S"),
+                    )
+                    for id_livro, qtd in retirados.items()
+                    for _ in range(qtd)
+                ]
             )
-            conn.commit()
-        return {
-            "status": "success",
-            "message": "Empréstimo realizado com sucesso!",
-            "detalhes": {
-                "livro": nome_livro,
-                "usuario": nome_usuario,
-                "data_emprestimo": data_emprestimo.strftime("%d/%m/%Y"),
-                "data_devolucao": data_devolucao.strftime("%d/%m/%Y"),
-                "dias_emprestimo": dias_emprestimo
-            }
-        }
-    except Exception as e:
-        return {"status": "error", "error_message": f"Erro ao registrar empréstimo: {str(e)}"}
+        resumo = _resumo_lote(nome_completo, resultados)
+        resumo["dias_emprestimo"] = dias_emprestimo
+        return resumo
 
-def devolver_livro(nome_livro: str, nome_usuario: str) -> dict:
     try:
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.cursor()
-            # Busca o id_usuario
-            cursor.execute(
-                "SELECT id FROM usuarios WHERE LOWER(nome) = LOWER(?) OR LOWER(nome) LIKE LOWER(?) || ' %' LIMIT 1",
-                (nome_usuario, nome_usuario)
-            )
-            usuario_row = cursor.fetchone()
-            if not usuario_row:
-                return {"status": "error", "error_message": f"Usuário '{nome_usuario}' não encontrado."}
-            id_usuario = usuario_row[0]
+        resultado = executar_transacao(_registrar)
+    except Exception as e:
+        return {"status": "error", "error_message": f"Erro ao registrar empréstimos: {str(e)}"}
+    alterados = [item["livro"] for item in resultado.get("resultados", []) if item["status"] == "success"]
+    if alterados:
+        _livros_alterados(alterados)
+    return resultado
 
-            # Busca o id_livro
-            cursor.execute(
-                "SELECT id FROM livros WHERE LOWER(titulo) = LOWER(?) LIMIT 1",
-                (nome_livro,)
-            )
-            livro_row = cursor.fetchone()
-            if not livro_row:
-                return {"status": "error", "error_message": f"Livro '{nome_livro}' não encontrado."}
-            id_livro = livro_row[0]
-
-            # Busca o empréstimo ativo
-            cursor.execute(
-                "SELECT data_emprestimo, data_devolucao FROM emprestimos WHERE id_usuario = ? AND id_livro = ? AND devolvido = 0 ORDER BY data_emprestimo DESC LIMIT 1",
-                (id_usuario, id_livro)
-            )
-            row = cursor.fetchone()
-            if not row:
-                return {"status": "error", "error_message": "Nenhum empréstimo ativo encontrado para este usuário e livro."}
-            data_emprestimo, data_devolucao_prevista = row
-            data_devolucao_real = datetime.datetime.now()
-            atraso = (data_devolucao_real - datetime.datetime.strptime(data_devolucao_prevista, "%Y-%m-%d %H:%M:%S")).days
-
-            # Atualiza o livro
-            cursor.execute(
-                "UPDATE livros SET exemplares_disponiveis = exemplares_disponiveis + 1, disponibilidade = 1 WHERE id = ?",
-                (id_livro,)
-            )
-            # Marca o empréstimo como devolvido
-            cursor.execute(
-                """
-                UPDATE emprestimos
-                SET devolvido = 1
-                WHERE id_usuario = ? AND id_livro = ? AND devolvido = 0
+
+@instrumentar
+def devolver_livros_lote(titulos: list[str], nome_usuario: str, id_usuario: int = 0,
+                         tool_context: "ToolContext" = None) -> dict:
+    """
+    Processa a devolução de vários livros do mesmo usuário em uma única transação.
+
+    Args:
+        titulos (list[str]): Títulos dos livros devolvidos.
+        nome_usuario (str): Nome completo ou primeiro nome do usuário.
+        id_usuario (int): Id retornado por usuario_existe, se já conhecido (evita nova busca pelo nome).
+
+    Returns:
+        dict: Resumo do lote e o resultado individual de cada livro, com atraso quando houver.
+    """
+    erro = _validar_lote(titulos)
+    if erro:
+        return erro
+
+    def _registrar(conn):
+        usuario_row = resolver_usuario(conn, nome_usuario, tool_context, id_usuario)
+        if not usuario_row:
+            return {"status": "error", "error_message": f"Usuário '{nome_usuario}' não encontrado."}
+        usuario_id, nome_completo = usuario_row
+        livros = _livros_por_titulo(conn, titulos)
+
+        # Empréstimos ativos do usuário para os livros do lote, mais recentes primeiro
+        ids_livros = sorted({livro[0] for livro in livros.values()})
+        ativos = {}
+        if ids_livros:
+            marcadores = ", ".join("?" for _ in ids_livros)
+            for id_emprestimo, id_livro, data_emprestimo, data_devolucao in conn.execute(
+                f"""
+                SELECT id, id_livro, data_emprestimo, data_devolucao
+                FROM emprestimos
+                WHERE id_usuario = ? AND devolvido = 0 AND id_livro IN ({marcadores})
+                ORDER BY data_emprestimo DESC
                 """,
-                (id_usuario, id_livro)
-            )
-            conn.commit()
-        resultado = {
-            "status": "success",
-            "message": "Devolução realizada com sucesso!",
-            "detalhes": {
-                "livro": nome_livro,
-                "usuario": nome_usuario,
+                [usuario_id, *ids_livros]
+            ):
+                ativos.setdefault(id_livro, []).append((id_emprestimo, data_emprestimo, data_devolucao))
+
+        agora = datetime.datetime.now()
+        devolvidos = []
+        por_livro = {}
+        resultados = []
+        for titulo in titulos:
+            livro = livros.get(normalizar(titulo))
+            if not livro:
+                resultados.append({"livro": titulo, "status": "error", "error_message": f"Livro '{titulo}' não encontrado."})
+                continue
+            id_livro = livro[0]
+            if not ativos.get(id_livro):
+                resultados.append({"livro": livro[1], "status": "error", "error_message": "Nenhum empréstimo ativo encontrado para este usuário e livro."})
+                continue
+            id_emprestimo, data_emprestimo, data_devolucao_prevista = ativos[id_livro].pop(0)
+            atraso = (agora - datetime.datetime.strptime(data_devolucao_prevista, "%Y-%m-%d %H:%M:%S")).days
+            devolvidos.append((agora.strftime("%Y-%m-%d %H:%M:%S"), id_emprestimo))
+            por_livro[id_livro] = por_livro.get(id_livro, 0) + 1
+            item = {
+                "livro": livro[1],
+                "status": "success",
                 "data_emprestimo": data_emprestimo,
                 "data_devolucao_prevista": data_devolucao_prevista,
-                "data_devolucao_real": data_devolucao_real.strftime("%d/%m/%Y"),
                 "atraso_dias": max(0, atraso)
             }
-        }
-        if atraso > 0:
-            resultado["aviso"] = f"Livro devolvido com {atraso} dia(s) de atraso."
-        return resultado
+            if atraso > 0:
+                item["aviso"] = f"Livro devolvido com {atraso} dia(s) de atraso."
+            resultados.append(item)
+
+        if devolvidos:
+            conn.executemany("UPDATE emprestimos SET devolvido = 1, devolvido_em = ? WHERE id = ?", devolvidos)
+            conn.executemany(
+                """
+                UPDATE livros
+                SET exemplares_disponiveis = MIN(exemplares_disponiveis + ?, COALESCE(exemplares_total, exemplares_disponiveis + ?))
+                WHERE id = ?
+                """,
+                [(qtd, qtd, id_livro) for id_livro, qtd in por_livro.items()]
+            )
+        resumo = _resumo_lote(nome_completo, resultados)
+        resumo["data_devolucao_real"] = agora.strftime("%d/%m/%Y")
+        return resumo
+
+    try:
+        resultado = executar_transacao(_registrar)
     except Exception as e:
-        return {"status": "error", "error_message": f"Erro ao processar devolução: {str(e)}"}
+        return {"status": "error", "error_message": f"Erro ao processar devoluções: {str(e)}"}
+    alterados = [item["livro"] for item in resultado.get("resultados", []) if item["status"] == "success"]
+    if alterados:
+        _livros_alterados(alterados)
+    return resultado
 
 
-def consultar_emprestimos_usuario(nome_usuario: str) -> dict:
-    emprestimos_usuario = []
-    for chave, emprestimo in emprestimos_ativos.items():
-        if emprestimo["nome_usuario"] == nome_usuario:
-            data_atual = datetime.datetime.now()
-            dias_restantes = (emprestimo["data_devolucao"] - data_atual).days
-            emprestimos_usuario.append({
-                "livro": emprestimo["nome_livro"],
-                "data_emprestimo": emprestimo["data_emprestimo"].strftime("%d/%m/%Y"),
-                "data_devolucao": emprestimo["data_devolucao"].strftime("%d/%m/%Y"),
-                "dias_restantes": dias_restantes,
-                "status": "Em atraso" if dias_restantes < 0 else "No prazo"
-            })
-    if emprestimos_usuario:
-        return {
-            "status": "success",
-            "usuario": nome_usuario,
-            "total_emprestimos": len(emprestimos_usuario),
-            "emprestimos": emprestimos_usuario
-        }
-    else:
+@instrumentar
+def consultar_emprestimos_usuario(nome_usuario: str, pagina: int = 1, por_pagina: int = 20,
+                                  id_usuario: int = 0, tool_context: "ToolContext" = None) -> dict:
+    """
+    Consulta os empréstimos ativos de um usuário, do prazo mais próximo ao mais distante.
+
+    Args:
+        nome_usuario (str): Nome completo ou primeiro nome do usuário.
+        pagina (int): Página de resultados, começando em 1.
+        por_pagina (int): Quantidade de empréstimos por página (máximo 100).
+        id_usuario (int): Id retornado por usuario_existe, se já conhecido (evita nova busca pelo nome).
+
+    Returns:
+        dict: Empréstimos da página com dias restantes e situação (no prazo/em atraso).
+    """
+    try:
+        pagina = max(1, int(pagina))
+        por_pagina = max(1, min(int(por_pagina), 100))
+        # Contagem e página na mesma transação de leitura, para total_paginas
+        # corresponder às linhas mesmo com empréstimos simultâneos
+        with transacao() as conn:
+            usuario_row = resolver_usuario(conn, nome_usuario, tool_context, id_usuario)
+            if not usuario_row:
+                return {"status": "error", "error_message": f"Usuário '{nome_usuario}' não encontrado."}
+            usuario_id = usuario_row[0]
+            total = conn.execute(
+                "SELECT COUNT(*) FROM emprestimos WHERE id_usuario = ? AND devolvido = 0",
+                (usuario_id,)
+            ).fetchone()[0]
+            # Dias restantes arredondados para baixo, como timedelta.days
+            rows = conn.execute(
+                """
+                SELECT titulo,
+                       strftime('%d/%m/%Y', data_emprestimo),
+                       strftime('%d/%m/%Y', data_devolucao),
+                       CAST(dias AS INTEGER) - (dias < CAST(dias AS INTEGER)) AS dias_restantes,
+                       CASE WHEN dias < 0 THEN 'Em atraso' ELSE 'No prazo' END
+                FROM (
+                    SELECT e.id, l.titulo, e.data_emprestimo, e.data_devolucao,
+                           julianday(e.data_devolucao) - julianday('now', 'localtime') AS dias
+                    FROM emprestimos e
+                    JOIN livros l ON l.id = e.id_livro
+                    WHERE e.id_usuario = ? AND e.devolvido = 0
+                    ORDER BY e.data_devolucao, e.id
+                    LIMIT ? OFFSET ?
+                )
+                ORDER BY data_devolucao, id
+                """,
+                (usuario_id, por_pagina, (pagina - 1) * por_pagina)
+            ).fetchall()
+    except Exception as e:
+        return {"status": "error", "error_message": f"Erro ao consultar empréstimos: {str(e)}"}
+
+    if total == 0:
         return {
             "status": "success",
             "message": f"Usuário '{nome_usuario}' não possui empréstimos ativos."
         }
+    emprestimos_usuario = []
+    for titulo, data_emprestimo, data_devolucao, dias_restantes, situacao in rows:
+        emprestimos_usuario.append({
+            "livro": titulo,
+            "data_emprestimo": data_emprestimo,
+            "data_devolucao": data_devolucao,
+            "dias_restantes": dias_restantes,
+            "status": situacao
+        })
+    return {
+        "status": "success",
+        "usuario": usuario_row[1],
+        "total_emprestimos": total,
+        "pagina": pagina,
+        "total_paginas": (total + por_pagina - 1) // por_pagina,
+        "emprestimos": emprestimos_usuario
+    }
 
-def listar_acervo_disponivel() -> dict:
-    livros_disponiveis = []
-    for nome_livro, dados in acervo_biblioteca.items():
-        if dados["disponibilidade"] and dados["exemplares_disponiveis"] > 0:
-            livros_disponiveis.append({
-                "titulo": nome_livro,
-                "autor": dados["autor"],
-                "isbn": dados["isbn"],
-                "exemplares_disponiveis": dados["exemplares_disponiveis"],
-                "exemplares_total": dados["exemplares_total"]
-            })
+def _filtro_acervo(autor: str = "", genero: str = "") -> tuple:
+    condicoes, parametros = ["exemplares_disponiveis > 0"], []
+    if autor:
+        condicoes.append("autor_norm = ?")
+        parametros.append(normalizar(autor))
+    if genero:
+        condicoes.append("genero_norm = ?")
+        parametros.append(normalizar(genero))
+    return " AND ".join(condicoes), parametros
+
+
+def _pagina_acervo(conn, autor: str, genero: str, apos: tuple, limite: int) -> list:
+    filtro, parametros = _filtro_acervo(autor, genero)
+    if apos:
+        filtro += " AND (titulo_norm, id) > (?, ?)"
+        parametros += list(apos)
+    return conn.execute(
+        f"""
+        SELECT titulo_norm, id, titulo, autor, isbn, exemplares_disponiveis, exemplares_total
+        FROM livros
+        WHERE {filtro}
+        ORDER BY titulo_norm, id
+        LIMIT ?
+        """,
+        parametros + [limite]
+    ).fetchall()
+
+
+def _total_acervo(conn, autor: str, genero: str, primeira_pagina: bool):
+    # Com um filtro só, o total vem das contagens mantidas pelos gatilhos
+    # (ver estatisticas.py). Autor e gênero juntos não têm contagem própria:
+    # o COUNT roda só na primeira página, para não repetir a cada cursor.
+    if not (autor and genero):
+        dimensao, valor = ("autor", autor) if autor else ("genero", genero) if genero else ("acervo", "")
+        return contar_acervo(conn, dimensao, valor)["livros_disponiveis"]
+    if not primeira_pagina:
+        return None
+    filtro, parametros = _filtro_acervo(autor, genero)
+    return conn.execute(f"SELECT COUNT(*) FROM livros WHERE {filtro}", parametros).fetchone()[0]
+
+
+def _formatar_livro_disponivel(row) -> dict:
+    _, _, titulo, autor, isbn, disponiveis, total = row
+    return {
+        "titulo": titulo,
+        "autor": autor,
+        "isbn": isbn,
+        "exemplares_disponiveis": disponiveis,
+        "exemplares_total": total
+    }
+
+
+def iterar_acervo_disponivel(autor: str = "", genero: str = "", tamanho_lote: int = 500):
+    """
+    Percorre todos os livros disponíveis em ordem de título, buscando do banco
+    em lotes de `tamanho_lote` linhas, sem carregar o acervo inteiro na memória.
+    """
+    apos = None
+    while True:
+        with conexao() as conn:
+            rows = _pagina_acervo(conn, autor, genero, apos, tamanho_lote)
+        for row in rows:
+            yield _formatar_livro_disponivel(row)
+        if len(rows) < tamanho_lote:
+            return
+        apos = rows[-1][:2]
+
+
+def _codificar_cursor(chave: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(chave)).encode()).decode()
+
+
+def _decodificar_cursor(cursor: str) -> tuple:
+    titulo_norm, id_livro = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return str(titulo_norm), int(id_livro)
+
+
+@instrumentar
+@memorizar(qualquer_emprestimo=True)
+def listar_acervo_disponivel(autor: str = "", genero: str = "", por_pagina: int = 20, cursor: str = "") -> dict:
+    """
+    Lista os livros disponíveis para empréstimo, uma página por vez, em ordem de título.
+
+    Args:
+        autor (str): Filtra pelo autor (opcional).
+        genero (str): Filtra pelo gênero (opcional).
+        por_pagina (int): Quantidade de livros por página (padrão 20, máximo 100).
+        cursor (str): Valor de "proximo_cursor" da página anterior; vazio para a primeira página.
+
+    Returns:
+        dict: Livros da página, total de livros disponíveis e o cursor da próxima página (None na última).
+        Filtrando por autor e gênero ao mesmo tempo, o total só vem na primeira página (None nas demais).
+    """
+    try:
+        apos = _decodificar_cursor(cursor) if cursor else None
+    except Exception:
+        return {"status": "error", "error_message": "Cursor de paginação inválido."}
+    try:
+        por_pagina = max(1, min(int(por_pagina), 100))
+        catalogo = obter_catalogo()
+        # Uma linha a mais indica se existe próxima página
+        if catalogo is not None:
+            total, rows = catalogo.pagina_disponiveis(
+                normalizar(autor) if autor else None, normalizar(genero) if genero else None, apos, por_pagina + 1
+            )
+            if autor and genero and apos is not None:
+                total = None
+        else:
+            with transacao() as conn:
+                total = _total_acervo(conn, autor, genero, primeira_pagina=apos is None)
+                rows = _pagina_acervo(conn, autor, genero, apos, por_pagina + 1)
+    except Exception as e:
+        return {"status": "error", "error_message": f"Erro ao listar o acervo: {str(e)}"}
+    proximo = _codificar_cursor(rows[por_pagina - 1][:2]) if len(rows) > por_pagina else None
     return {
         "status": "success",
-        "total_livros_disponiveis": len(livros_disponiveis),
-        "livros_disponiveis": livros_disponiveis
+        "total_livros_disponiveis": total,
+        "livros_disponiveis": [_formatar_livro_disponivel(row) for row in rows[:por_pagina]],
+        "proximo_cursor": proximo
     }
 
-# Criação do agente especializado em empréstimos
-agente_emprestimo = Agent(
-    name="bibliotecario_emprestimos",
-    model="gemini-2.0-flash",
-    description=(
-        "Agente especializado em gerenciar empréstimos e devoluções de livros da biblioteca"
-    ),
-    instruction=(
-        "Você é um bibliotecário atencioso e cordial, especializado no atendimento ao público e na gestão de empréstimos de livros.\n"
-        "Voce é um subagente do root_agent, que é o agente principal da biblioteca. voce irá auxiliar na consulta e realização de empréstimos\n"
-        "Seu papel é ajudar os usuários como se estivesse em uma biblioteca real. Suas principais funções são:\n"
-        "Sempre comece a conversa fazendo uma saudação ao usuário, como Bom dia!, Boa tarde, Boa Noite! \n"
-        "Em seguida diga: Como posso ajudar nas suas leituras hoje? \n"
-        "1. Consultar a disponibilidade de livros no acervo.\n"
-        "2. Realizar empréstimos de livros para os usuários, explicando prazos e procedimentos.\n"
-        "3. Processar devoluções de livros e atualizar o sistema.\n"
-        "4. Consultar os empréstimos ativos de um usuário e informar os prazos de devolução.\n"
-        "5. Listar os livros disponíveis para empréstimo.\n"
-        "Durante o atendimento, sempre seja prestativo e claro.\n" 
-        "Para realizar um empréstimo, colete as seguintes informações:\n"
-        "- Título exato do livro desejado \n"
-        "- Período desejado para o empréstimo (o padrão é 14 dias, mas pode ser ajustado se necessário) \n"
-        "Forneça informações objetivas sobre disponibilidade, prazos e instruções de devolução. \n"
-        "Atue de forma humana, como um funcionário real de biblioteca, prezando por um atendimento educado e eficiente."
-    ),
-    tools=[
-        buscar_livro,
-        realizar_emprestimo,
-        devolver_livro,
-        consultar_emprestimos_usuario,
-        listar_acervo_disponivel
-    ],
-)
+
+@functools.cache
+def criar_agente_emprestimo():
+    """
+    Cria (uma única vez) o agente especializado em empréstimos.
+
+    O ADK só é importado aqui, então as ferramentas deste módulo podem ser
+    usadas por scripts e benchmarks sem o custo de carregá-lo.
+    """
+    from google.adk.agents import Agent
+
+    return Agent(
+        name="bibliotecario_emprestimos",
+        model="gemini-2.0-flash",
+        description=(
+            "Agente especializado em gerenciar empréstimos e devoluções de livros da biblioteca"
+        ),
+        instruction=(
+            "Você é um bibliotecário atencioso e cordial, especializado no atendimento ao público e na gestão de empréstimos de livros.\n"
+            "Voce é um subagente do root_agent, que é o agente principal da biblioteca. voce irá auxiliar na consulta e realização de empréstimos\n"
+            "Seu papel é ajudar os usuários como se estivesse em uma biblioteca real. Suas principais funções são:\n"
+            "Sempre comece a conversa fazendo uma saudação ao usuário, como Bom dia!, Boa tarde, Boa Noite! \n"
+            "Em seguida diga: Como posso ajudar nas suas leituras hoje? \n"
+            "1. Consultar a disponibilidade de livros no acervo.\n"
+            "2. Realizar empréstimos de livros para os usuários, explicando prazos e procedimentos.\n"
+            "3. Processar devoluções de livros e atualizar o sistema.\n"
+            "4. Consultar os empréstimos ativos de um usuário e informar os prazos de devolução.\n"
+            "5. Listar os livros disponíveis para empréstimo (por autor ou gênero, se o usuário pedir), uma página por vez; use o proximo_cursor para mostrar mais.\n"
+            "Quando o usuário quiser emprestar ou devolver vários livros de uma vez, use realizar_emprestimos_lote ou devolver_livros_lote com todos os títulos em uma única chamada.\n"
+            "Durante o atendimento, sempre seja prestativo e claro.\n" 
+            "Se o usuário já foi identificado por usuario_existe, repasse o id_usuario retornado para as funções de empréstimo e devolução.\n"
+            "Para realizar um empréstimo, colete as seguintes informações:\n"
+            "- Título exato do livro desejado \n"
+            "- Período desejado para o empréstimo (o padrão é 14 dias, mas pode ser ajustado se necessário) \n"
+            "Forneça informações objetivas sobre disponibilidade, prazos e instruções de devolução. \n"
+            "Atue de forma humana, como um funcionário real de biblioteca, prezando por um atendimento educado e eficiente."
+        ),
+        tools=[
+            assincrona(buscar_livro),
+            assincrona(realizar_emprestimo),
+            assincrona(devolver_livro),
+            assincrona(realizar_emprestimos_lote),
+            assincrona(devolver_livros_lote),
+            assincrona(consultar_emprestimos_usuario),
+            assincrona(listar_acervo_disponivel)
+        ],
+    )
+
+
+def __getattr__(nome):
+    # Compatibilidade com o antigo atributo do módulo, criado sob demanda
+    if nome == "agente_emprestimo":
+        return criar_agente_emprestimo()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
 
 if __name__ == "__main__":
     print("=== Sistema de Empréstimos da Biblioteca ===")
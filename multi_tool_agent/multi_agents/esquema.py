@@ -0,0 +1,674 @@
+import os
+import sqlite3
+import unicodedata
+
+
+def normalizar(texto: str) -> str:
+    """
+    Normaliza um texto para comparação: remove acentos, converte para
+    minúsculas e colapsa espaços. Ex.: "Memórias  Póstumas" -> "memorias postumas".
+    """
+    if texto is None:
+        return None
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
+
+
+# Cada migração leva o banco da versão i para i + 1 (PRAGMA user_version).
+MIGRACOES = [
+    # 1: colunas normalizadas, índices e gatilhos que as mantêm atualizadas
+    """
+    ALTER TABLE livros ADD COLUMN titulo_norm TEXT;
+    ALTER TABLE livros ADD COLUMN autor_norm TEXT;
+    ALTER TABLE livros ADD COLUMN genero_norm TEXT;
+    ALTER TABLE usuarios ADD COLUMN nome_norm TEXT;
+
+    UPDATE livros SET titulo_norm = normalizar(titulo),
+                      autor_norm = normalizar(autor),
+                      genero_norm = normalizar(genero);
+    UPDATE usuarios SET nome_norm = normalizar(nome);
+
+    CREATE INDEX IF NOT EXISTS idx_livros_titulo_norm ON livros (titulo_norm);
+    CREATE INDEX IF NOT EXISTS idx_livros_autor_norm ON livros (autor_norm, titulo);
+    CREATE INDEX IF NOT EXISTS idx_livros_genero_norm ON livros (genero_norm, titulo);
+    CREATE INDEX IF NOT EXISTS idx_usuarios_nome_norm ON usuarios (nome_norm);
+
+    CREATE TRIGGER IF NOT EXISTS trg_livros_norm_insert AFTER INSERT ON livros
+    BEGIN
+        UPDATE livros SET titulo_norm = normalizar(NEW.titulo),
+                          autor_norm = normalizar(NEW.autor),
+                          genero_norm = normalizar(NEW.genero)
+        WHERE id = NEW.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_livros_norm_update AFTER UPDATE OF titulo, autor, genero ON livros
+    BEGIN
+        UPDATE livros SET titulo_norm = normalizar(NEW.titulo),
+                          autor_norm = normalizar(NEW.autor),
+                          genero_norm = normalizar(NEW.genero)
+        WHERE id = NEW.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_usuarios_norm_insert AFTER INSERT ON usuarios
+    BEGIN
+        UPDATE usuarios SET nome_norm = normalizar(NEW.nome) WHERE id = NEW.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_usuarios_norm_update AFTER UPDATE OF nome ON usuarios
+    BEGIN
+        UPDATE usuarios SET nome_norm = normalizar(NEW.nome) WHERE id = NEW.id;
+    END;
+    """,
+    # 2: índices de texto completo (palavras e trigramas) sobre as colunas normalizadas
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS livros_fts USING fts5(
+        titulo, autor, genero, tokenize = 'unicode61 remove_diacritics 2'
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS livros_trigramas USING fts5(
+        titulo, autor, tokenize = 'trigram'
+    );
+
+    INSERT INTO livros_fts (rowid, titulo, autor, genero)
+        SELECT id, titulo_norm, autor_norm, genero_norm FROM livros;
+    INSERT INTO livros_trigramas (rowid, titulo, autor)
+        SELECT id, titulo_norm, autor_norm FROM livros;
+
+    CREATE TRIGGER IF NOT EXISTS trg_livros_fts_update AFTER UPDATE OF titulo_norm, autor_norm, genero_norm ON livros
+    BEGIN
+        DELETE FROM livros_fts WHERE rowid = OLD.id;
+        DELETE FROM livros_trigramas WHERE rowid = OLD.id;
+        INSERT INTO livros_fts (rowid, titulo, autor, genero)
+            VALUES (NEW.id, NEW.titulo_norm, NEW.autor_norm, NEW.genero_norm);
+        INSERT INTO livros_trigramas (rowid, titulo, autor)
+            VALUES (NEW.id, NEW.titulo_norm, NEW.autor_norm);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_livros_fts_delete AFTER DELETE ON livros
+    BEGIN
+        DELETE FROM livros_fts WHERE rowid = OLD.id;
+        DELETE FROM livros_trigramas WHERE rowid = OLD.id;
+    END;
+    """,
+    # 3: empréstimos por usuário, em aberto primeiro, ordenados pelo prazo
+    """
+    CREATE INDEX IF NOT EXISTS idx_emprestimos_usuario
+        ON emprestimos (id_usuario, devolvido, data_devolucao);
+    """,
+    # 4: paginação por chave (titulo_norm, id) dos livros com exemplares disponíveis
+    """
+    CREATE INDEX IF NOT EXISTS idx_livros_disponiveis
+        ON livros (titulo_norm, id) WHERE exemplares_disponiveis > 0;
+    """,
+    # 5: recomendações pré-calculadas (ver recomendador.py)
+    """
+    CREATE TABLE IF NOT EXISTS coemprestimos (
+        id_livro INTEGER NOT NULL,
+        id_outro INTEGER NOT NULL,
+        leitores INTEGER NOT NULL,
+        PRIMARY KEY (id_livro, id_outro)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS recomendacoes (
+        id_livro INTEGER NOT NULL,
+        posicao INTEGER NOT NULL,
+        id_vizinho INTEGER NOT NULL,
+        pontuacao REAL NOT NULL,
+        PRIMARY KEY (id_livro, posicao)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS recomendador_estado (
+        chave TEXT PRIMARY KEY,
+        valor INTEGER NOT NULL
+    );
+    """,
+    # 6: disponibilidade e contagens agregadas mantidas por gatilhos (ver estatisticas.py)
+    """
+    UPDATE livros SET disponibilidade = (COALESCE(exemplares_disponiveis, 0) > 0)
+    WHERE disponibilidade IS NOT (COALESCE(exemplares_disponiveis, 0) > 0);
+    CREATE TRIGGER IF NOT EXISTS trg_livros_disponibilidade_insert AFTER INSERT ON livros
+    WHEN NEW.disponibilidade IS NOT (COALESCE(NEW.exemplares_disponiveis, 0) > 0)
+    BEGIN
+        UPDATE livros SET disponibilidade = (COALESCE(NEW.exemplares_disponiveis, 0) > 0) WHERE id = NEW.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_livros_disponibilidade_update AFTER UPDATE OF exemplares_disponiveis ON livros
+    WHEN NEW.disponibilidade IS NOT (COALESCE(NEW.exemplares_disponiveis, 0) > 0)
+    BEGIN
+        UPDATE livros SET disponibilidade = (COALESCE(NEW.exemplares_disponiveis, 0) > 0) WHERE id = NEW.id;
+    END;
+
+    -- Uma linha para o acervo inteiro e uma por autor e por gênero normalizados
+    CREATE TABLE IF NOT EXISTS contagens_acervo (
+        dimensao TEXT NOT NULL,
+        valor TEXT NOT NULL,
+        livros INTEGER NOT NULL DEFAULT 0,
+        livros_disponiveis INTEGER NOT NULL DEFAULT 0,
+        exemplares INTEGER NOT NULL DEFAULT 0,
+        exemplares_disponiveis INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dimensao, valor)
+    ) WITHOUT ROWID;
+    INSERT INTO contagens_acervo (dimensao, valor, livros, livros_disponiveis, exemplares, exemplares_disponiveis)
+    SELECT dimensao, valor, COUNT(*), SUM(disponiveis > 0), SUM(total), SUM(disponiveis)
+    FROM (
+        SELECT 'autor' AS dimensao, COALESCE(autor_norm, '') AS valor,
+               COALESCE(exemplares_total, 0) AS total, COALESCE(exemplares_disponiveis, 0) AS disponiveis
+        FROM livros
+        UNION ALL
+        SELECT 'genero', COALESCE(genero_norm, ''),
+               COALESCE(exemplares_total, 0), COALESCE(exemplares_disponiveis, 0)
+        FROM livros
+        UNION ALL
+        SELECT 'acervo', '', COALESCE(exemplares_total, 0), COALESCE(exemplares_disponiveis, 0)
+        FROM livros
+    )
+    GROUP BY dimensao, valor;
+    INSERT OR IGNORE INTO contagens_acervo (dimensao, valor) VALUES ('acervo', '');
+    CREATE TRIGGER IF NOT EXISTS trg_livros_contagens_insert AFTER INSERT ON livros
+    BEGIN
+        INSERT INTO contagens_acervo (dimensao, valor, livros, livros_disponiveis, exemplares, exemplares_disponiveis)
+        SELECT dimensao, valor, 1, (COALESCE(NEW.exemplares_disponiveis, 0) > 0),
+               COALESCE(NEW.exemplares_total, 0), COALESCE(NEW.exemplares_disponiveis, 0)
+        FROM (
+            SELECT 'acervo' AS dimensao, '' AS valor
+            UNION ALL SELECT 'autor', COALESCE(normalizar(NEW.autor), '')
+            UNION ALL SELECT 'genero', COALESCE(normalizar(NEW.genero), '')
+        )
+        WHERE true
+        ON CONFLICT (dimensao, valor) DO UPDATE SET
+            livros = livros + excluded.livros,
+            livros_disponiveis = livros_disponiveis + excluded.livros_disponiveis,
+            exemplares = exemplares + excluded.exemplares,
+            exemplares_disponiveis = exemplares_disponiveis + excluded.exemplares_disponiveis;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_livros_contagens_delete AFTER DELETE ON livros
+    BEGIN
+        INSERT INTO contagens_acervo (dimensao, valor, livros, livros_disponiveis, exemplares, exemplares_disponiveis)
+        SELECT dimensao, valor, -1, -(COALESCE(OLD.exemplares_disponiveis, 0) > 0),
+               -COALESCE(OLD.exemplares_total, 0), -COALESCE(OLD.exemplares_disponiveis, 0)
+        FROM (
+            SELECT 'acervo' AS dimensao, '' AS valor
+            UNION ALL SELECT 'autor', COALESCE(normalizar(OLD.autor), '')
+            UNION ALL SELECT 'genero', COALESCE(normalizar(OLD.genero), '')
+        )
+        WHERE true
+        ON CONFLICT (dimensao, valor) DO UPDATE SET
+            livros = livros + excluded.livros,
+            livros_disponiveis = livros_disponiveis + excluded.livros_disponiveis,
+            exemplares = exemplares + excluded.exemplares,
+            exemplares_disponiveis = exemplares_disponiveis + excluded.exemplares_disponiveis;
+        DELETE FROM contagens_acervo
+        WHERE livros = 0 AND ((dimensao = 'autor' AND valor = COALESCE(normalizar(OLD.autor), ''))
+                           OR (dimensao = 'genero' AND valor = COALESCE(normalizar(OLD.genero), '')));
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_livros_contagens_update
+    AFTER UPDATE OF autor, genero, exemplares_total, exemplares_disponiveis ON livros
+    BEGIN
+        INSERT INTO contagens_acervo (dimensao, valor, livros, livros_disponiveis, exemplares, exemplares_disponiveis)
+        SELECT dimensao, valor, -1, -(COALESCE(OLD.exemplares_disponiveis, 0) > 0),
+               -COALESCE(OLD.exemplares_total, 0), -COALESCE(OLD.exemplares_disponiveis, 0)
+        FROM (
+            SELECT 'acervo' AS dimensao, '' AS valor
+            UNION ALL SELECT 'autor', COALESCE(normalizar(OLD.autor), '')
+            UNION ALL SELECT 'genero', COALESCE(normalizar(OLD.genero), '')
+        )
+        UNION ALL
+        SELECT dimensao, valor, 1, (COALESCE(NEW.exemplares_disponiveis, 0) > 0),
+               COALESCE(NEW.exemplares_total, 0), COALESCE(NEW.exemplares_disponiveis, 0)
+        FROM (
+            SELECT 'acervo' AS dimensao, '' AS valor
+            UNION ALL SELECT 'autor', COALESCE(normalizar(NEW.autor), '')
+            UNION ALL SELECT 'genero', COALESCE(normalizar(NEW.genero), '')
+        )
+        WHERE true
+        ON CONFLICT (dimensao, valor) DO UPDATE SET
+            livros = livros + excluded.livros,
+            livros_disponiveis = livros_disponiveis + excluded.livros_disponiveis,
+            exemplares = exemplares + excluded.exemplares,
+            exemplares_disponiveis = exemplares_disponiveis + excluded.exemplares_disponiveis;
+        DELETE FROM contagens_acervo
+        WHERE livros = 0 AND ((dimensao = 'autor' AND valor = COALESCE(normalizar(OLD.autor), ''))
+                           OR (dimensao = 'genero' AND valor = COALESCE(normalizar(OLD.genero), '')));
+    END;
+
+    -- Empréstimos em aberto agrupados pelo dia do vencimento
+    CREATE TABLE IF NOT EXISTS emprestimos_ativos (
+        vencimento TEXT PRIMARY KEY,
+        quantidade INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    INSERT INTO emprestimos_ativos (vencimento, quantidade)
+    SELECT COALESCE(date(data_devolucao), ''), COUNT(*)
+    FROM emprestimos
+    WHERE COALESCE(devolvido, 0) = 0
+    GROUP BY 1;
+    CREATE TRIGGER IF NOT EXISTS trg_emprestimos_ativos_insert AFTER INSERT ON emprestimos
+    WHEN COALESCE(NEW.devolvido, 0) = 0
+    BEGIN
+        INSERT INTO emprestimos_ativos (vencimento, quantidade)
+        VALUES (COALESCE(date(NEW.data_devolucao), ''), 1)
+        ON CONFLICT (vencimento) DO UPDATE SET quantidade = quantidade + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_emprestimos_ativos_update AFTER UPDATE OF devolvido, data_devolucao ON emprestimos
+    WHEN COALESCE(OLD.devolvido, 0) IS NOT COALESCE(NEW.devolvido, 0)
+      OR OLD.data_devolucao IS NOT NEW.data_devolucao
+    BEGIN
+        INSERT INTO emprestimos_ativos (vencimento, quantidade)
+        SELECT COALESCE(date(OLD.data_devolucao), ''), -1 WHERE COALESCE(OLD.devolvido, 0) = 0
+        ON CONFLICT (vencimento) DO UPDATE SET quantidade = quantidade - 1;
+        INSERT INTO emprestimos_ativos (vencimento, quantidade)
+        SELECT COALESCE(date(NEW.data_devolucao), ''), 1 WHERE COALESCE(NEW.devolvido, 0) = 0
+        ON CONFLICT (vencimento) DO UPDATE SET quantidade = quantidade + 1;
+        DELETE FROM emprestimos_ativos
+        WHERE vencimento = COALESCE(date(OLD.data_devolucao), '') AND quantidade = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_emprestimos_ativos_delete AFTER DELETE ON emprestimos
+    WHEN COALESCE(OLD.devolvido, 0) = 0
+    BEGIN
+        UPDATE emprestimos_ativos SET quantidade = quantidade - 1
+        WHERE vencimento = COALESCE(date(OLD.data_devolucao), '');
+        DELETE FROM emprestimos_ativos
+        WHERE vencimento = COALESCE(date(OLD.data_devolucao), '') AND quantidade = 0;
+    END;
+    """,
+    # 7: empréstimos em aberto pela data de vencimento (ver atrasos.py)
+    """
+    CREATE INDEX IF NOT EXISTS idx_emprestimos_vencimento
+        ON emprestimos (data_devolucao, id) WHERE devolvido = 0;
+    """,
+    # 8: data real da devolução, arquivo de empréstimos antigos (ver arquivamento.py)
+    # e índice parcial para localizar empréstimos em aberto de um usuário
+    """
+    ALTER TABLE emprestimos ADD COLUMN devolvido_em TEXT;
+    CREATE INDEX IF NOT EXISTS idx_emprestimos_abertos
+        ON emprestimos (id_usuario, id_livro, data_emprestimo) WHERE devolvido = 0;
+    CREATE TABLE IF NOT EXISTS emprestimos_arquivo (
+        id INTEGER PRIMARY KEY,
+        id_usuario INTEGER NOT NULL,
+        id_livro INTEGER NOT NULL,
+        data_emprestimo DATE,
+        data_devolucao DATE,
+        devolvido BOOLEAN,
+        devolvido_em TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_emprestimos_arquivo_usuario
+        ON emprestimos_arquivo (id_usuario, id_livro);
+    CREATE VIEW IF NOT EXISTS emprestimos_historico AS
+        SELECT id, id_usuario, id_livro, data_emprestimo, data_devolucao, devolvido, devolvido_em
+        FROM emprestimos
+        UNION ALL
+        SELECT id, id_usuario, id_livro, data_emprestimo, data_devolucao, devolvido, devolvido_em
+        FROM emprestimos_arquivo;
+    -- Sem estatísticas, o planejador prefere idx_emprestimos_usuario ao índice parcial
+    ANALYZE emprestimos;
+    """,
+    # 9: registro dos livros alterados, lido pelos outros processos para
+    # invalidar seus caches (ver sincronizacao.py). Guarda as últimas 10000
+    # alterações; AUTOINCREMENT não reaproveita seq, então um processo que
+    # ficou para trás percebe o buraco e descarta o cache inteiro.
+    """
+    CREATE TABLE IF NOT EXISTS alteracoes_livros (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        titulo_norm TEXT
+    );
+    CREATE TRIGGER IF NOT EXISTS trg_alteracoes_livros_limite AFTER INSERT ON alteracoes_livros
+    BEGIN
+        DELETE FROM alteracoes_livros WHERE seq <= NEW.seq - 10000;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_livros_alteracoes_update
+    AFTER UPDATE OF titulo, autor, genero, isbn, ano_publicacao, exemplares_total, exemplares_disponiveis ON livros
+    BEGIN
+        INSERT INTO alteracoes_livros (titulo_norm) VALUES (normalizar(OLD.titulo));
+        INSERT INTO alteracoes_livros (titulo_norm)
+        SELECT normalizar(NEW.titulo) WHERE normalizar(NEW.titulo) IS NOT normalizar(OLD.titulo);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_livros_alteracoes_delete AFTER DELETE ON livros
+    BEGIN
+        INSERT INTO alteracoes_livros (titulo_norm) VALUES (normalizar(OLD.titulo));
+    END;
+    """,
+    # 10: livros novos também são anotados, para o catálogo em memória
+    # (ver catalogo.py) e as listagens em cache dos outros processos os verem
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_livros_alteracoes_insert AFTER INSERT ON livros
+    BEGIN
+        INSERT INTO alteracoes_livros (titulo_norm) VALUES (normalizar(NEW.titulo));
+    END;
+    """,
+    # 11: índices removidos por uma importação em andamento (substituída pela 14)
+    """
+    CREATE TABLE IF NOT EXISTS indices_suspensos (
+        nome TEXT PRIMARY KEY,
+        sql TEXT NOT NULL,
+        pid INTEGER
+    );
+    """,
+    # 12: gatilhos só com SQL. Os anteriores chamavam normalizar(), que só
+    # existe nas conexões do pool, e qualquer outro programa (o sqlite3, um
+    # script de manutenção) falhava ao gravar livros ou usuários. Agora quem
+    # grava pelas ferramentas preenche as colunas *_norm; o que é gravado sem
+    # elas fica com titulo_norm/nome_norm NULL, marcado como pendente, e é
+    # normalizado pela próxima conexão do pool (ver corrigir_normalizacao).
+    """
+    DROP TRIGGER IF EXISTS trg_livros_norm_insert;
+    DROP TRIGGER IF EXISTS trg_livros_norm_update;
+    DROP TRIGGER IF EXISTS trg_usuarios_norm_insert;
+    DROP TRIGGER IF EXISTS trg_usuarios_norm_update;
+    -- Texto alterado sem a coluna normalizada correspondente: marca como pendente.
+    -- lower() do SQLite só trata ASCII, então mudar só maiúsculas ASCII não marca
+    CREATE TRIGGER IF NOT EXISTS trg_livros_norm_pendente AFTER UPDATE OF titulo, autor, genero ON livros
+    WHEN NEW.titulo_norm IS NOT NULL AND (
+           (lower(NEW.titulo) IS NOT lower(OLD.titulo) AND NEW.titulo_norm IS OLD.titulo_norm)
+        OR (lower(NEW.autor) IS NOT lower(OLD.autor) AND NEW.autor_norm IS OLD.autor_norm)
+        OR (lower(NEW.genero) IS NOT lower(OLD.genero) AND NEW.genero_norm IS OLD.genero_norm))
+    BEGIN
+        UPDATE livros SET titulo_norm = NULL WHERE id = NEW.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_usuarios_norm_pendente AFTER UPDATE OF nome ON usuarios
+    WHEN NEW.nome_norm IS NOT NULL AND lower(NEW.nome) IS NOT lower(OLD.nome) AND NEW.nome_norm IS OLD.nome_norm
+    BEGIN
+        UPDATE usuarios SET nome_norm = NULL WHERE id = NEW.id;
+    END;
+    -- Antes, os índices de texto recebiam os livros novos pelo UPDATE do gatilho de inserção
+    CREATE TRIGGER IF NOT EXISTS trg_livros_fts_insert AFTER INSERT ON livros
+    BEGIN
+        INSERT INTO livros_fts (rowid, titulo, autor, genero)
+            VALUES (NEW.id, NEW.titulo_norm, NEW.autor_norm, NEW.genero_norm);
+        INSERT INTO livros_trigramas (rowid, titulo, autor)
+            VALUES (NEW.id, NEW.titulo_norm, NEW.autor_norm);
+    END;
+
+    DROP TRIGGER IF EXISTS trg_livros_contagens_insert;
+    DROP TRIGGER IF EXISTS trg_livros_contagens_delete;
+    DROP TRIGGER IF EXISTS trg_livros_contagens_update;
+    CREATE TRIGGER IF NOT EXISTS trg_livros_contagens_insert AFTER INSERT ON livros
+    BEGIN
+        INSERT INTO contagens_acervo (dimensao, valor, livros, livros_disponiveis, exemplares, exemplares_disponiveis)
+        SELECT dimensao, valor, 1, (COALESCE(NEW.exemplares_disponiveis, 0) > 0),
+               COALESCE(NEW.exemplares_total, 0), COALESCE(NEW.exemplares_disponiveis, 0)
+        FROM (
+            SELECT 'acervo' AS dimensao, '' AS valor
+            UNION ALL SELECT 'autor', COALESCE(NEW.autor_norm, '')
+            UNION ALL SELECT 'genero', COALESCE(NEW.genero_norm, '')
+        )
+        WHERE true
+        ON CONFLICT (dimensao, valor) DO UPDATE SET
+            livros = livros + excluded.livros,
+            livros_disponiveis = livros_disponiveis + excluded.livros_disponiveis,
+            exemplares = exemplares + excluded.exemplares,
+            exemplares_disponiveis = exemplares_disponiveis + excluded.exemplares_disponiveis;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_livros_contagens_delete AFTER DELETE ON livros
+    BEGIN
+        INSERT INTO contagens_acervo (dimensao, valor, livros, livros_disponiveis, exemplares, exemplares_disponiveis)
+        SELECT dimensao, valor, -1, -(COALESCE(OLD.exemplares_disponiveis, 0) > 0),
+               -COALESCE(OLD.exemplares_total, 0), -COALESCE(OLD.exemplares_disponiveis, 0)
+        FROM (
+            SELECT 'acervo' AS dimensao, '' AS valor
+            UNION ALL SELECT 'autor', COALESCE(OLD.autor_norm, '')
+            UNION ALL SELECT 'genero', COALESCE(OLD.genero_norm, '')
+        )
+        WHERE true
+        ON CONFLICT (dimensao, valor) DO UPDATE SET
+            livros = livros + excluded.livros,
+            livros_disponiveis = livros_disponiveis + excluded.livros_disponiveis,
+            exemplares = exemplares + excluded.exemplares,
+            exemplares_disponiveis = exemplares_disponiveis + excluded.exemplares_disponiveis;
+        DELETE FROM contagens_acervo
+        WHERE livros = 0 AND ((dimensao = 'autor' AND valor = COALESCE(OLD.autor_norm, ''))
+                           OR (dimensao = 'genero' AND valor = COALESCE(OLD.genero_norm, '')));
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_livros_contagens_update
+    AFTER UPDATE OF autor_norm, genero_norm, exemplares_total, exemplares_disponiveis ON livros
+    BEGIN
+        INSERT INTO contagens_acervo (dimensao, valor, livros, livros_disponiveis, exemplares, exemplares_disponiveis)
+        SELECT dimensao, valor, -1, -(COALESCE(OLD.exemplares_disponiveis, 0) > 0),
+               -COALESCE(OLD.exemplares_total, 0), -COALESCE(OLD.exemplares_disponiveis, 0)
+        FROM (
+            SELECT 'acervo' AS dimensao, '' AS valor
+            UNION ALL SELECT 'autor', COALESCE(OLD.autor_norm, '')
+            UNION ALL SELECT 'genero', COALESCE(OLD.genero_norm, '')
+        )
+        UNION ALL
+        SELECT dimensao, valor, 1, (COALESCE(NEW.exemplares_disponiveis, 0) > 0),
+               COALESCE(NEW.exemplares_total, 0), COALESCE(NEW.exemplares_disponiveis, 0)
+        FROM (
+            SELECT 'acervo' AS dimensao, '' AS valor
+            UNION ALL SELECT 'autor', COALESCE(NEW.autor_norm, '')
+            UNION ALL SELECT 'genero', COALESCE(NEW.genero_norm, '')
+        )
+        WHERE true
+        ON CONFLICT (dimensao, valor) DO UPDATE SET
+            livros = livros + excluded.livros,
+            livros_disponiveis = livros_disponiveis + excluded.livros_disponiveis,
+            exemplares = exemplares + excluded.exemplares,
+            exemplares_disponiveis = exemplares_disponiveis + excluded.exemplares_disponiveis;
+        DELETE FROM contagens_acervo
+        WHERE livros = 0 AND ((dimensao = 'autor' AND valor = COALESCE(OLD.autor_norm, ''))
+                           OR (dimensao = 'genero' AND valor = COALESCE(OLD.genero_norm, '')));
+    END;
+
+    DROP TRIGGER IF EXISTS trg_livros_alteracoes_update;
+    DROP TRIGGER IF EXISTS trg_livros_alteracoes_delete;
+    DROP TRIGGER IF EXISTS trg_livros_alteracoes_insert;
+    CREATE TRIGGER IF NOT EXISTS trg_livros_alteracoes_update
+    AFTER UPDATE OF titulo, titulo_norm, autor, genero, isbn, ano_publicacao, exemplares_total, exemplares_disponiveis ON livros
+    BEGIN
+        INSERT INTO alteracoes_livros (titulo_norm) SELECT OLD.titulo_norm WHERE OLD.titulo_norm IS NOT NULL;
+        INSERT INTO alteracoes_livros (titulo_norm)
+        SELECT NEW.titulo_norm WHERE NEW.titulo_norm IS NOT NULL AND NEW.titulo_norm IS NOT OLD.titulo_norm;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_livros_alteracoes_delete AFTER DELETE ON livros
+    WHEN OLD.titulo_norm IS NOT NULL
+    BEGIN
+        INSERT INTO alteracoes_livros (titulo_norm) VALUES (OLD.titulo_norm);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_livros_alteracoes_insert AFTER INSERT ON livros
+    WHEN NEW.titulo_norm IS NOT NULL
+    BEGIN
+        INSERT INTO alteracoes_livros (titulo_norm) VALUES (NEW.titulo_norm);
+    END;
+    """,
+    # 13: livros com recomendações a recalcular (ver recomendador.py). A versão
+    # aumenta a cada novo lote de co-empréstimos do livro, para um top-K
+    # calculado antes dele não apagar a pendência.
+    """
+    CREATE TABLE IF NOT EXISTS recomendacoes_pendentes (
+        id_livro INTEGER PRIMARY KEY,
+        versao INTEGER NOT NULL DEFAULT 0
+    );
+    """,
+    # 14: gatilhos de texto completo suspensos por uma importação em andamento
+    # (ver importacao.py), para serem recriados se o processo que importava
+    # for encerrado no meio. Nenhum índice das migrações era suspenso, então
+    # a tabela da migração 11 sai.
+    """
+    DROP TABLE IF EXISTS indices_suspensos;
+    CREATE TABLE IF NOT EXISTS gatilhos_suspensos (
+        nome TEXT PRIMARY KEY,
+        sql TEXT NOT NULL,
+        pid INTEGER
+    );
+    """,
+]
+
+# Gatilhos que mantêm livros_fts e livros_trigramas: a maior parte do custo
+# de gravar um livro. A importação os suspende e sincroniza os índices no final.
+GATILHOS_TEXTO = ("trg_livros_fts_insert", "trg_livros_fts_update", "trg_livros_fts_delete")
+
+# Colunas de cada índice de texto e as colunas de livros que elas copiam
+_COLUNAS_TEXTO = {
+    "livros_fts": ("titulo", "autor", "genero"),
+    "livros_trigramas": ("titulo", "autor"),
+}
+
+
+def registrar_funcoes(conn: sqlite3.Connection) -> None:
+    """Registra as funções SQL usadas pelos gatilhos e migrações."""
+    conn.create_function("normalizar", 1, normalizar, deterministic=True)
+
+
+def migrar(conn: sqlite3.Connection) -> int:
+    """
+    Aplica as migrações pendentes em uma conexão em modo autocommit.
+
+    Returns:
+        int: Versão do esquema após a migração.
+    """
+    versao = conn.execute("PRAGMA user_version").fetchone()[0]
+    if versao >= len(MIGRACOES):
+        return versao
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Outra conexão pode ter migrado enquanto esperávamos pela trava
+        versao = conn.execute("PRAGMA user_version").fetchone()[0]
+        for indice in range(versao, len(MIGRACOES)):
+            for comando in _separar_comandos(MIGRACOES[indice]):
+                conn.execute(comando)
+        conn.execute(f"PRAGMA user_version = {len(MIGRACOES)}")
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return len(MIGRACOES)
+
+
+def _separar_comandos(script: str) -> list:
+    # executescript() faria commit implícito; aqui separamos os comandos
+    # respeitando os blocos BEGIN ... END dos gatilhos.
+    comandos, atual = [], ""
+    for linha in script.splitlines(keepends=True):
+        atual += linha
+        if sqlite3.complete_statement(atual):
+            if atual.strip():
+                comandos.append(atual.strip())
+            atual = ""
+    if atual.strip():
+        comandos.append(atual.strip())
+    return comandos
+
+
+def _processo_ativo(pid) -> bool:
+    if pid is None or pid == os.getpid():
+        return pid is not None
+    if os.name == "nt":
+        # os.kill no Windows encerraria o processo; sem como conferir, considera encerrado
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sincronizar_texto(conn: sqlite3.Connection) -> int:
+    """
+    Atualiza livros_fts e livros_trigramas com os livros gravados enquanto os
+    gatilhos de texto estavam suspensos: remove as linhas de livros apagados
+    ou alterados e insere as que faltam. Deve ser chamada dentro de uma
+    transação de escrita. Se algo mudou, anota em `alteracoes_livros` uma
+    alteração sem título, que faz os outros processos descartarem os caches
+    inteiros (as buscas em cache não sabem quais livros novos incluir).
+
+    Returns:
+        int: Quantidade de linhas alteradas nos índices de texto.
+    """
+    alteradas = 0
+    for tabela, colunas in _COLUNAS_TEXTO.items():
+        diferentes = " OR ".join(f"l.{coluna}_norm IS NOT t.{coluna}" for coluna in colunas)
+        alteradas += conn.execute(
+            f"""
+            DELETE FROM {tabela} WHERE rowid IN (
+                SELECT t.rowid FROM {tabela} t LEFT JOIN livros l ON l.id = t.rowid
+                WHERE l.id IS NULL OR {diferentes}
+            )
+            """
+        ).rowcount
+        alteradas += conn.execute(
+            f"""
+            INSERT INTO {tabela} (rowid, {", ".join(colunas)})
+            SELECT id, {", ".join(f"{coluna}_norm" for coluna in colunas)} FROM livros
+            WHERE id NOT IN (SELECT rowid FROM {tabela})
+            """
+        ).rowcount
+    if alteradas:
+        conn.execute("INSERT INTO alteracoes_livros (titulo_norm) VALUES (NULL)")
+    return alteradas
+
+
+def restaurar_gatilhos_suspensos(conn: sqlite3.Connection) -> int:
+    """
+    Recria os gatilhos de texto que uma importação deixou suspensos e cujo
+    processo já terminou (encerrado no meio da carga), e sincroniza os índices
+    de texto com os livros gravados nesse meio-tempo.
+
+    Returns:
+        int: Quantidade de gatilhos recriados.
+    """
+    pendentes = conn.execute("SELECT pid FROM gatilhos_suspensos").fetchall()
+    if all(_processo_ativo(pid) for (pid,) in pendentes):
+        return 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        recriados = 0
+        for nome, sql, pid in conn.execute("SELECT nome, sql, pid FROM gatilhos_suspensos").fetchall():
+            if _processo_ativo(pid):
+                continue
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (nome,)).fetchone():
+                conn.execute(sql)
+                recriados += 1
+            conn.execute("DELETE FROM gatilhos_suspensos WHERE nome = ?", (nome,))
+        if recriados:
+            sincronizar_texto(conn)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return recriados
+
+
+def normalizar_pendentes(conn: sqlite3.Connection) -> int:
+    """
+    Preenche as colunas normalizadas dos livros e usuários gravados sem elas
+    (por programas fora do pool, ver a migração 12). Deve ser chamada dentro
+    de uma transação de escrita.
+
+    Returns:
+        int: Quantidade de linhas normalizadas.
+    """
+    livros = conn.execute("SELECT id, titulo, autor, genero FROM livros WHERE titulo_norm IS NULL").fetchall()
+    if livros:
+        conn.executemany(
+            "UPDATE livros SET titulo_norm = ?, autor_norm = ?, genero_norm = ? WHERE id = ?",
+            [(normalizar(titulo), normalizar(autor), normalizar(genero), id_livro) for id_livro, titulo, autor, genero in livros],
+        )
+    usuarios = conn.execute("SELECT id, nome FROM usuarios WHERE nome_norm IS NULL").fetchall()
+    if usuarios:
+        conn.executemany(
+            "UPDATE usuarios SET nome_norm = ? WHERE id = ?",
+            [(normalizar(nome), id_usuario) for id_usuario, nome in usuarios],
+        )
+    return len(livros) + len(usuarios)
+
+
+def corrigir_normalizacao(conn: sqlite3.Connection) -> int:
+    """
+    Normaliza as linhas pendentes, se houver, em uma transação própria (a
+    conexão deve estar em modo autocommit). A verificação usa os índices das
+    colunas normalizadas, então custa pouco quando não há pendências.
+    """
+    pendentes = conn.execute(
+        "SELECT EXISTS (SELECT 1 FROM livros WHERE titulo_norm IS NULL)"
+        " OR EXISTS (SELECT 1 FROM usuarios WHERE nome_norm IS NULL)"
+    ).fetchone()[0]
+    if not pendentes:
+        return 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        quantidade = normalizar_pendentes(conn)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return quantidade
+
+
+def preparar_conexao(conn: sqlite3.Connection) -> None:
+    registrar_funcoes(conn)
+    migrar(conn)
+    restaurar_gatilhos_suspensos(conn)
+    corrigir_normalizacao(conn)
@@ -0,0 +1,202 @@
+"""
+Contagens agregadas do acervo e dos empréstimos.
+
+As tabelas `contagens_acervo` e `emprestimos_ativos` são mantidas por
+gatilhos (migração 6 em esquema.py), então as consultas daqui leem uma
+linha pela chave em vez de percorrer `livros` ou `emprestimos`.
+`verificar_consistencia` recalcula tudo a partir das tabelas de origem:
+
+    python -m multi_agents.estatisticas [--corrigir]
+"""
+import argparse
+import datetime
+import logging
+import sys
+
+from .banco import conexao, executar_transacao
+from .esquema import normalizar
+from .memoria import memorizar
+from .metricas import instrumentar
+
+logger = logging.getLogger(__name__)
+
+_CAMPOS = ("livros", "livros_disponiveis", "exemplares", "exemplares_disponiveis")
+
+_SQL_ESPERADO_ACERVO = """
+    SELECT dimensao, valor, COUNT(*), SUM(disponiveis > 0), SUM(total), SUM(disponiveis)
+    FROM (
+        SELECT 'acervo' AS dimensao, '' AS valor,
+               COALESCE(exemplares_total, 0) AS total, COALESCE(exemplares_disponiveis, 0) AS disponiveis
+        FROM livros
+        UNION ALL
+        SELECT 'autor', COALESCE(autor_norm, ''),
+               COALESCE(exemplares_total, 0), COALESCE(exemplares_disponiveis, 0)
+        FROM livros
+        UNION ALL
+        SELECT 'genero', COALESCE(genero_norm, ''),
+               COALESCE(exemplares_total, 0), COALESCE(exemplares_disponiveis, 0)
+        FROM livros
+    )
+    GROUP BY dimensao, valor
+"""
+
+_SQL_ESPERADO_EMPRESTIMOS = """
+    SELECT COALESCE(date(data_devolucao), ''), COUNT(*)
+    FROM emprestimos
+    WHERE COALESCE(devolvido, 0) = 0
+    GROUP BY 1
+"""
+
+
+def contar_acervo(conn, dimensao: str = "acervo", valor: str = "") -> dict:
+    """
+    Lê as contagens do acervo inteiro, de um autor ou de um gênero.
+
+    Args:
+        dimensao (str): "acervo", "autor" ou "genero".
+        valor (str): Nome do autor ou gênero (ignorado para o acervo).
+
+    Returns:
+        dict: {"livros", "livros_disponiveis", "exemplares", "exemplares_disponiveis"}
+    """
+    valor = "" if dimensao == "acervo" else (normalizar(valor) or "")
+    linha = conn.execute(
+        f"SELECT {', '.join(_CAMPOS)} FROM contagens_acervo WHERE dimensao = ? AND valor = ?",
+        (dimensao, valor),
+    ).fetchone()
+    return dict(zip(_CAMPOS, linha or (0, 0, 0, 0)))
+
+
+def contar_emprestimos(conn, hoje: datetime.date = None) -> dict:
+    """
+    Conta os empréstimos em aberto e os atrasados (vencimento antes de hoje).
+
+    Lê a tabela `emprestimos_ativos`, que tem uma linha por dia de vencimento.
+
+    Returns:
+        dict: {"ativos": int, "atrasados": int}
+    """
+    hoje = (hoje or datetime.date.today()).isoformat()
+    ativos, atrasados = conn.execute(
+        """
+        SELECT COALESCE(SUM(quantidade), 0),
+               COALESCE(SUM(CASE WHEN vencimento < ? THEN quantidade END), 0)
+        FROM emprestimos_ativos
+        """,
+        (hoje,),
+    ).fetchone()
+    return {"ativos": ativos, "atrasados": atrasados}
+
+
+def verificar_consistencia(corrigir: bool = False) -> list:
+    """
+    Compara as tabelas de contagens com os valores recalculados de `livros`
+    e `emprestimos`.
+
+    Args:
+        corrigir (bool): Regrava as contagens divergentes com os valores recalculados.
+
+    Returns:
+        list: Divergências encontradas, cada uma {"tabela", "chave", "atual", "esperado"}.
+    """
+    def _verificar(conn):
+        divergencias = []
+        esperado = {(d, v): tuple(valores) for d, v, *valores in conn.execute(_SQL_ESPERADO_ACERVO)}
+        esperado.setdefault(("acervo", ""), (0, 0, 0, 0))
+        atual = {
+            (d, v): tuple(valores)
+            for d, v, *valores in conn.execute(f"SELECT dimensao, valor, {', '.join(_CAMPOS)} FROM contagens_acervo")
+        }
+        for chave in esperado.keys() | atual.keys():
+            if esperado.get(chave) != atual.get(chave):
+                divergencias.append({
+                    "tabela": "contagens_acervo",
+                    "chave": chave,
+                    "atual": atual.get(chave),
+                    "esperado": esperado.get(chave),
+                })
+
+        esperado_emp = dict(conn.execute(_SQL_ESPERADO_EMPRESTIMOS).fetchall())
+        atual_emp = dict(conn.execute("SELECT vencimento, quantidade FROM emprestimos_ativos").fetchall())
+        for chave in esperado_emp.keys() | atual_emp.keys():
+            if esperado_emp.get(chave) != atual_emp.get(chave):
+                divergencias.append({
+                    "tabela": "emprestimos_ativos",
+                    "chave": chave,
+                    "atual": atual_emp.get(chave),
+                    "esperado": esperado_emp.get(chave),
+                })
+
+        if corrigir and divergencias:
+            conn.execute("DELETE FROM contagens_acervo")
+            conn.executemany(
+                f"INSERT INTO contagens_acervo (dimensao, valor, {', '.join(_CAMPOS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                [chave + valores for chave, valores in esperado.items()],
+            )
+            conn.execute("DELETE FROM emprestimos_ativos")
+            conn.executemany(
+                "INSERT INTO emprestimos_ativos (vencimento, quantidade) VALUES (?, ?)",
+                esperado_emp.items(),
+            )
+        return divergencias
+
+    # Trava de escrita durante a verificação, para as contagens não mudarem no meio
+    divergencias = executar_transacao(_verificar)
+    for divergencia in divergencias:
+        logger.warning("Contagem divergente: %s", divergencia)
+    return divergencias
+
+
+@instrumentar
+@memorizar(qualquer_emprestimo=True)
+def estatisticas_acervo(autor: str = "", genero: str = "") -> dict:
+    """
+    Retorna quantos livros e exemplares existem e estão disponíveis no acervo,
+    de um autor ou de um gênero, além dos empréstimos em aberto e atrasados.
+
+    Args:
+        autor (str): Autor a consultar (opcional).
+        genero (str): Gênero a consultar (opcional).
+
+    Returns:
+        dict: {
+            "status": "success"|"error",
+            "acervo": {"livros": int, "livros_disponiveis": int, "exemplares": int, "exemplares_disponiveis": int},
+            "autor": {...} | None,
+            "genero": {...} | None,
+            "emprestimos": {"ativos": int, "atrasados": int},
+            "error_message": str | None
+        }
+    """
+    try:
+        with conexao() as conn:
+            resposta = {
+                "status": "success",
+                "acervo": contar_acervo(conn),
+                "emprestimos": contar_emprestimos(conn),
+            }
+            if autor:
+                resposta["autor"] = dict(contar_acervo(conn, "autor", autor), nome=autor)
+            if genero:
+                resposta["genero"] = dict(contar_acervo(conn, "genero", genero), nome=genero)
+        return resposta
+    except Exception as e:
+        return {"status": "error", "error_message": f"Erro ao consultar as estatísticas: {str(e)}"}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Verifica as contagens agregadas do acervo")
+    parser.add_argument("--corrigir", action="store_true", help="regrava as contagens divergentes")
+    args = parser.parse_args(argv)
+    divergencias = verificar_consistencia(args.corrigir)
+    for divergencia in divergencias:
+        print(f"{divergencia['tabela']} {divergencia['chave']}: atual={divergencia['atual']} esperado={divergencia['esperado']}")
+    if not divergencias:
+        print("Contagens consistentes.")
+    elif args.corrigir:
+        print(f"{len(divergencias)} contagens corrigidas.")
+    return 1 if divergencias and not args.corrigir else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Importação em massa do acervo e dos usuários a partir de exportações CSV ou JSONL.
+
+Execute a partir da pasta `multi_tool_agent`:
+
+    python -m multi_agents.importacao livros acervo.csv
+    python -m multi_agents.importacao usuarios leitores.jsonl --lote 10000
+
+O arquivo é lido em fluxo e gravado em lotes (executemany, uma transação por
+lote), então o uso de memória não depende do tamanho do arquivo. Livros são
+atualizados pelo ISBN e usuários pelo e-mail quando já existem.
+"""
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+
+from .banco import conexao, executar_transacao
+from .esquema import GATILHOS_TEXTO, normalizar, normalizar_pendentes, sincronizar_texto
+
+logger = logging.getLogger(__name__)
+
+LOTE_PADRAO = 5000
+EXEMPLARES_PADRAO = 1
+# A partir deste tamanho de arquivo, sincronizar os índices de texto ao final compensa
+TAMANHO_ADIAR_INDICES = 10 * 1024 * 1024
+
+# Nomes de coluna aceitos nos arquivos para cada campo das tabelas
+_ALIASES = {
+    "livros": {
+        "titulo": ("titulo", "título", "title"),
+        "autor": ("autor", "author"),
+        "ano_publicacao": ("ano_publicacao", "ano", "year"),
+        "isbn": ("isbn",),
+        "genero": ("genero", "gênero", "genre"),
+        "exemplares": ("exemplares", "exemplares_total", "copies"),
+    },
+    "usuarios": {
+        "nome": ("nome", "name"),
+        "email": ("email", "e-mail"),
+        "telefone": ("telefone", "phone"),
+    },
+}
+
+_SQL = {
+    "livros": """
+        INSERT INTO livros (titulo, autor, ano_publicacao, isbn, genero,
+                            exemplares_total, exemplares_disponiveis, disponibilidade,
+                            titulo_norm, autor_norm, genero_norm)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (isbn) DO UPDATE SET
+            titulo = excluded.titulo,
+            autor = excluded.autor,
+            ano_publicacao = COALESCE(excluded.ano_publicacao, ano_publicacao),
+            genero = COALESCE(excluded.genero, genero),
+            titulo_norm = excluded.titulo_norm,
+            autor_norm = excluded.autor_norm,
+            genero_norm = COALESCE(excluded.genero_norm, genero_norm),
+            exemplares_total = excluded.exemplares_total,
+            exemplares_disponiveis = MAX(0, COALESCE(exemplares_disponiveis, 0)
+                + excluded.exemplares_total - COALESCE(exemplares_total, 0))
+    """,
+    "usuarios": """
+        INSERT INTO usuarios (nome, email, telefone, nome_norm)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (email) DO UPDATE SET
+            nome = excluded.nome,
+            nome_norm = excluded.nome_norm,
+            telefone = COALESCE(excluded.telefone, telefone)
+    """,
+}
+
+
+def _ler_csv(caminho: str, delimitador: str):
+    with open(caminho, newline="", encoding="utf-8-sig") as arquivo:
+        yield from csv.DictReader(arquivo, delimiter=delimitador)
+
+
+def _ler_jsonl(caminho: str):
+    with open(caminho, encoding="utf-8") as arquivo:
+        for numero, linha in enumerate(arquivo, 1):
+            if not linha.strip():
+                continue
+            try:
+                yield json.loads(linha)
+            except json.JSONDecodeError:
+                logger.warning("Linha %d de %s ignorada: JSON inválido", numero, caminho)
+                yield {}
+
+
+def ler_registros(caminho: str, formato: str = None, delimitador: str = ","):
+    """
+    Lê os registros de um arquivo CSV ou JSONL, um por vez.
+
+    Args:
+        caminho (str): Arquivo de origem.
+        formato (str): "csv" ou "jsonl"; se omitido, é deduzido pela extensão.
+        delimitador (str): Separador de colunas do CSV.
+
+    Returns:
+        Iterador de dicionários com as chaves em minúsculas.
+    """
+    formato = formato or os.path.splitext(caminho)[1].lstrip(".").lower()
+    if formato in ("jsonl", "ndjson", "json"):
+        registros = _ler_jsonl(caminho)
+    elif formato in ("csv", "tsv", "txt"):
+        registros = _ler_csv(caminho, "\t" if formato == "tsv" else delimitador)
+    else:
+        raise ValueError(f"Formato não suportado: {formato!r} (use csv ou jsonl)")
+    for registro in registros:
+        yield {str(chave).strip().lower(): valor for chave, valor in registro.items() if chave is not None}
+
+
+def _campo(registro: dict, nomes: tuple):
+    for nome in nomes:
+        valor = registro.get(nome)
+        if valor is not None:
+            valor = str(valor).strip()
+            if valor:
+                return valor
+    return None
+
+
+def _inteiro(valor):
+    try:
+        return int(float(valor)) if valor is not None else None
+    except ValueError:
+        return None
+
+
+def _linha_livro(registro: dict):
+    campos = {campo: _campo(registro, nomes) for campo, nomes in _ALIASES["livros"].items()}
+    if not campos["titulo"] or not campos["autor"]:
+        return None
+    exemplares = _inteiro(campos["exemplares"])
+    exemplares = EXEMPLARES_PADRAO if exemplares is None else max(0, exemplares)
+    # O ISBN é gravado como veio (com ou sem hífens), igual aos já cadastrados,
+    # para o ON CONFLICT (isbn) encontrar o livro existente
+    return (
+        campos["titulo"], campos["autor"], _inteiro(campos["ano_publicacao"]), campos["isbn"],
+        campos["genero"], exemplares, exemplares, exemplares > 0,
+        normalizar(campos["titulo"]), normalizar(campos["autor"]), normalizar(campos["genero"]),
+    )
+
+
+def _linha_usuario(registro: dict):
+    campos = {campo: _campo(registro, nomes) for campo, nomes in _ALIASES["usuarios"].items()}
+    if not campos["nome"]:
+        return None
+    return (campos["nome"], campos["email"].lower() if campos["email"] else None, campos["telefone"],
+            normalizar(campos["nome"]))
+
+
+_CONVERSORES = {"livros": _linha_livro, "usuarios": _linha_usuario}
+
+
+def _suspender_gatilhos(tabela: str) -> list:
+    """
+    Remove os gatilhos de texto completo da tabela (ver `esquema.GATILHOS_TEXTO`)
+    e devolve os pares (nome, comando) para recriá-los. Os comandos ficam
+    anotados em `gatilhos_suspensos` até serem recriados, para que outro
+    processo os recrie se este for encerrado no meio da carga.
+    """
+    if tabela != "livros":
+        return []
+
+    def _remover(conn):
+        marcadores = ", ".join("?" * len(GATILHOS_TEXTO))
+        gatilhos = conn.execute(
+            f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({marcadores})",
+            GATILHOS_TEXTO,
+        ).fetchall()
+        for nome, sql in gatilhos:
+            conn.execute(
+                "INSERT OR REPLACE INTO gatilhos_suspensos (nome, sql, pid) VALUES (?, ?, ?)", (nome, sql, os.getpid())
+            )
+            conn.execute(f'DROP TRIGGER "{nome}"')
+        return gatilhos
+
+    return executar_transacao(_remover)
+
+
+def _restaurar_gatilhos(gatilhos: list) -> None:
+    def _criar(conn):
+        for nome, sql in gatilhos:
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (nome,)).fetchone():
+                conn.execute(sql)
+            conn.execute("DELETE FROM gatilhos_suspensos WHERE nome = ?", (nome,))
+        sincronizar_texto(conn)
+
+    if gatilhos:
+        executar_transacao(_criar)
+
+
+def _gravar_lote(conn, sql: str, linhas: list) -> None:
+    conn.executemany(sql, linhas)
+    # Atualizações que só mudaram acentos ou espaços ficam marcadas como pendentes pelos gatilhos
+    normalizar_pendentes(conn)
+
+
+def importar(tabela: str, registros, lote: int = LOTE_PADRAO, adiar_indices: bool = True, progresso=None) -> dict:
+    """
+    Grava os registros em `livros` ou `usuarios` em lotes transacionais.
+
+    Linhas sem os campos obrigatórios (título e autor, ou nome) são ignoradas.
+    Com `adiar_indices`, os índices de texto completo dos livros (livros_fts e
+    livros_trigramas) deixam de ser atualizados linha a linha durante a carga
+    e são sincronizados uma única vez ao final, mesmo em caso de erro; até
+    lá, a busca por texto não encontra os livros novos. Os índices comuns, as
+    contagens e o registro de alterações continuam atualizados a cada lote.
+    Se o processo for encerrado antes do fim, a próxima conexão aberta por
+    outro processo recria os gatilhos e sincroniza os índices (ver
+    `esquema.restaurar_gatilhos_suspensos`).
+
+    Args:
+        tabela (str): "livros" ou "usuarios".
+        registros: Iterável de dicionários (ver `ler_registros`).
+        lote (int): Linhas por transação.
+        adiar_indices (bool): Sincroniza os índices de texto só ao final da carga.
+        progresso: Função opcional chamada após cada lote com (linhas_lidas, linhas_gravadas, segundos).
+
+    Returns:
+        dict: {"lidas": int, "gravadas": int, "ignoradas": int, "segundos": float, "linhas_por_segundo": float}
+    """
+    if tabela not in _SQL:
+        raise ValueError(f"Tabela não suportada: {tabela!r} (use livros ou usuarios)")
+    converter = _CONVERSORES[tabela]
+    sql = _SQL[tabela]
+    inicio = time.perf_counter()
+    lidas = gravadas = 0
+
+    gatilhos = _suspender_gatilhos(tabela) if adiar_indices else []
+    try:
+        registros = iter(registros)
+        while True:
+            pedaco = list(itertools.islice(registros, lote))
+            if not pedaco:
+                break
+            lidas += len(pedaco)
+            linhas = [linha for linha in map(converter, pedaco) if linha is not None]
+            if linhas:
+                executar_transacao(lambda conn: _gravar_lote(conn, sql, linhas))
+                gravadas += len(linhas)
+            if progresso:
+                progresso(lidas, gravadas, time.perf_counter() - inicio)
+    finally:
+        _restaurar_gatilhos(gatilhos)
+
+    with conexao() as conn:
+        conn.execute("PRAGMA optimize")
+    segundos = time.perf_counter() - inicio
+    return {
+        "lidas": lidas,
+        "gravadas": gravadas,
+        "ignoradas": lidas - gravadas,
+        "segundos": segundos,
+        "linhas_por_segundo": lidas / segundos if segundos else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Importa livros ou usuários de arquivos CSV/JSONL")
+    parser.add_argument("tabela", choices=sorted(_SQL))
+    parser.add_argument("arquivo")
+    parser.add_argument("--formato", choices=("csv", "tsv", "jsonl"), default=None)
+    parser.add_argument("--delimitador", default=",")
+    parser.add_argument("--lote", type=int, default=LOTE_PADRAO)
+    parser.add_argument("--indices", choices=("auto", "adiar", "manter"), default="auto",
+                        help="adiar: sincroniza os índices de texto ao final; manter: atualiza linha a linha; "
+                             "auto: adia para arquivos a partir de 10 MB")
+    args = parser.parse_args(argv)
+
+    def _progresso(lidas, gravadas, segundos):
+        print(f"\r{lidas} linhas lidas, {gravadas} gravadas ({lidas / segundos:.0f} linhas/s)",
+              end="", file=sys.stderr, flush=True)
+
+    try:
+        if args.indices == "auto":
+            adiar_indices = os.path.getsize(args.arquivo) >= TAMANHO_ADIAR_INDICES
+        else:
+            adiar_indices = args.indices == "adiar"
+        registros = ler_registros(args.arquivo, args.formato, args.delimitador)
+        resultado = importar(args.tabela, registros, args.lote, adiar_indices, _progresso)
+    except (OSError, ValueError) as e:
+        print(f"Erro na importação: {e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    print(
+        f"{resultado['gravadas']} linhas gravadas em {args.tabela}, {resultado['ignoradas']} ignoradas, "
+        f"em {resultado['segundos']:.1f}s ({resultado['linhas_por_segundo']:.0f} linhas/s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
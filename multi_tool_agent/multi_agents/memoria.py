@@ -0,0 +1,131 @@
+import copy
+import functools
+import inspect
+import threading
+
+from .cache import CacheLRU
+from .esquema import normalizar
+from .metricas import marcar_acerto_cache, registrar_fonte
+from .sincronizacao import registrar_invalidador, sincronizar
+
+# Respostas das ferramentas de consulta, por (ferramenta, argumentos normalizados).
+# Cada entrada guarda também os títulos normalizados que aparecem na resposta,
+# usados para invalidá-la quando um desses livros é emprestado ou devolvido.
+respostas_ferramentas = CacheLRU(capacidade=2048, ttl=30.0)
+registrar_fonte("cache_respostas", respostas_ferramentas.estatisticas)
+
+# Etiqueta das respostas que mudam com qualquer empréstimo ou devolução
+_QUALQUER_LIVRO = object()
+_CAMPOS_TITULO = ("titulo", "nome_livro")
+# Incrementada a cada invalidação: uma resposta calculada enquanto um livro
+# mudava não é guardada, pois pode ter lido o estoque anterior
+_geracao = 0
+# Torna atômicos a conferência da geração com a gravação da resposta e o
+# incremento da geração com a remoção das entradas
+_trava = threading.Lock()
+
+
+def _etiquetas(resposta) -> set:
+    etiquetas = set()
+    pendentes = [resposta]
+    while pendentes:
+        item = pendentes.pop()
+        if isinstance(item, dict):
+            for campo, valor in item.items():
+                if campo in _CAMPOS_TITULO and isinstance(valor, str):
+                    etiquetas.add(normalizar(valor))
+                elif isinstance(valor, (dict, list)):
+                    pendentes.append(valor)
+        elif isinstance(item, list):
+            pendentes.extend(item)
+    return etiquetas
+
+
+def _normalizar_argumento(valor):
+    if isinstance(valor, str):
+        return normalizar(valor)
+    if isinstance(valor, list):
+        return tuple(_normalizar_argumento(v) for v in valor)
+    return valor
+
+
+def memorizar(ttl: float = None, qualquer_emprestimo: bool = False):
+    """
+    Decorador que guarda as respostas de uma ferramenta somente leitura.
+
+    A chave é a ferramenta com os argumentos normalizados (sem acentos e sem
+    diferença de maiúsculas), então "Dom Casmurro" e "dom casmurro" caem na
+    mesma entrada. Respostas com erro não são guardadas. Quem chama recebe
+    sempre uma cópia, então alterar a resposta não altera o cache.
+
+    Args:
+        ttl (float): Validade das entradas, em segundos (padrão: o do cache).
+        qualquer_emprestimo (bool): A resposta depende do acervo como um todo
+            (listagens, contagens) e é invalidada por qualquer empréstimo ou
+            devolução, e não só pelos dos livros que aparecem nela.
+    """
+    def decorador(funcao):
+        assinatura = inspect.signature(funcao)
+        nome = f"{funcao.__module__.rsplit('.', 1)[-1]}.{funcao.__name__}"
+
+        @functools.wraps(funcao)
+        def _memorizada(*args, **kwargs):
+            sincronizar()
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            chave = (nome,) + tuple(
+                (parametro, _normalizar_argumento(valor))
+                for parametro, valor in argumentos.arguments.items()
+                if parametro != "tool_context"
+            )
+            item = respostas_ferramentas.obter(chave)
+            if item is not None:
+                marcar_acerto_cache()
+                return copy.deepcopy(item[0])
+            geracao = _geracao
+            resposta = funcao(*args, **kwargs)
+            if geracao != _geracao:
+                return resposta
+            if isinstance(resposta, dict) and resposta.get("status") != "error" and "error_message" not in resposta:
+                etiquetas = {_QUALQUER_LIVRO} if qualquer_emprestimo else _etiquetas(resposta)
+                item = (copy.deepcopy(resposta), frozenset(etiquetas))
+                with _trava:
+                    # Uma invalidação durante as etiquetas e a cópia também descarta a resposta
+                    if geracao == _geracao:
+                        respostas_ferramentas.definir(chave, item, ttl)
+            return resposta
+
+        return _memorizada
+
+    return decorador
+
+
+def invalidar_livros(titulos) -> int:
+    """
+    Remove as respostas guardadas que mostram algum dos livros informados e as
+    que dependem do acervo inteiro. Chamada após empréstimos e devoluções.
+
+    Returns:
+        int: Quantidade de entradas removidas.
+    """
+    global _geracao
+    titulos = {normalizar(titulo) for titulo in titulos}
+    with _trava:
+        _geracao += 1
+        return respostas_ferramentas.invalidar_se(
+            lambda chave, item: _QUALQUER_LIVRO in item[1] or not item[1].isdisjoint(titulos)
+        )
+
+
+def _alteracoes_externas(titulos) -> None:
+    # Alterações feitas por outros processos (ver sincronizacao.py)
+    global _geracao
+    if titulos is None:
+        with _trava:
+            _geracao += 1
+            respostas_ferramentas.limpar()
+    else:
+        invalidar_livros(titulos)
+
+
+registrar_invalidador(_alteracoes_externas)
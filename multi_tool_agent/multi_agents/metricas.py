@@ -0,0 +1,274 @@
+import contextvars
+import functools
+import os
+import sqlite3
+import threading
+import time
+
+# Desligadas por padrão; com BIBLIOTECA_METRICAS=1 ou ativar_metricas(True) as
+# ferramentas passam a registrar tempos e contagens.
+_ativas = os.environ.get("BIBLIOTECA_METRICAS", "0") == "1"
+
+# Limites (em segundos) do histograma de latência exportado para o Prometheus
+LIMITES_HISTOGRAMA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# A cada quantas instruções da VM do SQLite o contador de trabalho é incrementado
+PASSOS_POR_AVISO = 1000
+
+_chamada_atual = contextvars.ContextVar("chamada_atual", default=None)
+_trava = threading.Lock()
+_ferramentas = {}
+_fontes = {}
+
+
+class _Chamada:
+    __slots__ = ("tempo_sql", "comandos_sql", "linhas_retornadas", "passos_vm", "acerto_cache")
+
+    def __init__(self):
+        self.tempo_sql = 0.0
+        self.comandos_sql = 0
+        self.linhas_retornadas = 0
+        self.passos_vm = 0
+        self.acerto_cache = False
+
+
+def _estatisticas_vazias() -> dict:
+    return {
+        "chamadas": 0,
+        "erros": 0,
+        "excecoes": 0,
+        "tempo_total_ms": 0.0,
+        "tempo_max_ms": 0.0,
+        "tempo_sql_ms": 0.0,
+        "comandos_sql": 0,
+        "linhas_retornadas": 0,
+        "passos_vm": 0,
+        "acertos_cache": 0,
+        "histograma": [0] * (len(LIMITES_HISTOGRAMA) + 1),
+    }
+
+
+def ativar_metricas(ativas: bool = True) -> None:
+    global _ativas
+    _ativas = ativas
+
+
+def metricas_ativas() -> bool:
+    return _ativas
+
+
+def _resposta_com_erro(resposta) -> bool:
+    return isinstance(resposta, dict) and (
+        resposta.get("status") == "error" or "error_message" in resposta
+    )
+
+
+def _registrar(nome: str, duracao: float, chamada: _Chamada, erro: bool, excecao: bool) -> None:
+    with _trava:
+        estatisticas = _ferramentas.setdefault(nome, _estatisticas_vazias())
+        estatisticas["chamadas"] += 1
+        estatisticas["erros"] += erro
+        estatisticas["excecoes"] += excecao
+        estatisticas["tempo_total_ms"] += duracao * 1000
+        estatisticas["tempo_max_ms"] = max(estatisticas["tempo_max_ms"], duracao * 1000)
+        estatisticas["tempo_sql_ms"] += chamada.tempo_sql * 1000
+        estatisticas["comandos_sql"] += chamada.comandos_sql
+        estatisticas["linhas_retornadas"] += chamada.linhas_retornadas
+        estatisticas["passos_vm"] += chamada.passos_vm
+        estatisticas["acertos_cache"] += chamada.acerto_cache
+        indice = len(LIMITES_HISTOGRAMA)
+        for i, limite in enumerate(LIMITES_HISTOGRAMA):
+            if duracao <= limite:
+                indice = i
+                break
+        estatisticas["histograma"][indice] += 1
+
+
+def instrumentar(funcao):
+    """
+    Decorador que mede as chamadas de uma ferramenta: quantidade, tempo total,
+    tempo gasto no SQLite, comandos executados, linhas retornadas e erros.
+
+    Com as métricas desligadas, apenas repassa a chamada.
+    """
+    # Inclui o módulo: busca.buscar_livro e emprestimo.buscar_livro são ferramentas diferentes
+    nome = f"{funcao.__module__.rsplit('.', 1)[-1]}.{funcao.__name__}"
+
+    @functools.wraps(funcao)
+    def _instrumentada(*args, **kwargs):
+        if not _ativas or _chamada_atual.get() is not None:
+            return funcao(*args, **kwargs)
+        chamada = _Chamada()
+        token = _chamada_atual.set(chamada)
+        inicio = time.perf_counter()
+        try:
+            resposta = funcao(*args, **kwargs)
+        except BaseException:
+            _registrar(nome, time.perf_counter() - inicio, chamada, True, True)
+            raise
+        finally:
+            _chamada_atual.reset(token)
+        _registrar(nome, time.perf_counter() - inicio, chamada, _resposta_com_erro(resposta), False)
+        return resposta
+
+    return _instrumentada
+
+
+def marcar_acerto_cache() -> None:
+    """Indica que a chamada atual foi respondida pelo cache de respostas."""
+    chamada = _chamada_atual.get()
+    if chamada is not None:
+        chamada.acerto_cache = True
+
+
+class CursorInstrumentado(sqlite3.Cursor):
+    """Cursor que soma o tempo de busca e as linhas lidas à chamada atual."""
+
+    def _medir(self, metodo, *args):
+        chamada = _chamada_atual.get()
+        if chamada is None:
+            return metodo(*args)
+        inicio = time.perf_counter()
+        resultado = metodo(*args)
+        chamada.tempo_sql += time.perf_counter() - inicio
+        if isinstance(resultado, list):
+            chamada.linhas_retornadas += len(resultado)
+        elif resultado is not None:
+            chamada.linhas_retornadas += 1
+        return resultado
+
+    def fetchone(self):
+        return self._medir(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._medir(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._medir(super().fetchall)
+
+    def __next__(self):
+        return self._medir(super().__next__)
+
+
+class ConexaoInstrumentada(sqlite3.Connection):
+    """
+    Conexão usada pelo pool. Fora de uma chamada instrumentada, execute() segue
+    direto para o sqlite3; dentro dela, mede o tempo de cada comando.
+    """
+
+    _contando_passos = False
+
+    def _preparar_contagem(self):
+        def _contar():
+            chamada = _chamada_atual.get()
+            if chamada is not None:
+                chamada.passos_vm += PASSOS_POR_AVISO
+            return 0
+
+        self.set_progress_handler(_contar, PASSOS_POR_AVISO)
+        self._contando_passos = True
+
+    def execute(self, sql, parametros=()):
+        chamada = _chamada_atual.get()
+        if chamada is None:
+            return super().execute(sql, parametros)
+        if not self._contando_passos:
+            self._preparar_contagem()
+        cursor = self.cursor(CursorInstrumentado)
+        inicio = time.perf_counter()
+        cursor.execute(sql, parametros)
+        chamada.tempo_sql += time.perf_counter() - inicio
+        chamada.comandos_sql += 1
+        return cursor
+
+    def executemany(self, sql, parametros):
+        chamada = _chamada_atual.get()
+        if chamada is None:
+            return super().executemany(sql, parametros)
+        if not self._contando_passos:
+            self._preparar_contagem()
+        inicio = time.perf_counter()
+        cursor = super().executemany(sql, parametros)
+        chamada.tempo_sql += time.perf_counter() - inicio
+        chamada.comandos_sql += 1
+        return cursor
+
+
+def registrar_fonte(nome: str, funcao) -> None:
+    """Registra uma função que devolve contadores extras (ex.: caches) para o snapshot."""
+    _fontes[nome] = funcao
+
+
+def snapshot() -> dict:
+    """Retorna uma cópia das métricas acumuladas por ferramenta."""
+    with _trava:
+        ferramentas = {}
+        for nome, estatisticas in _ferramentas.items():
+            copia = dict(estatisticas, histograma=list(estatisticas["histograma"]))
+            chamadas = copia["chamadas"]
+            copia["tempo_medio_ms"] = copia["tempo_total_ms"] / chamadas if chamadas else 0.0
+            ferramentas[nome] = copia
+    resultado = {"ativas": _ativas, "ferramentas": ferramentas}
+    for nome, funcao in _fontes.items():
+        resultado[nome] = funcao()
+    return resultado
+
+
+def _numero(valor) -> bool:
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool)
+
+
+def zerar() -> None:
+    with _trava:
+        _ferramentas.clear()
+
+
+def exportar_prometheus() -> str:
+    """Exporta as métricas no formato de texto do Prometheus."""
+    dados = snapshot()
+    linhas = []
+
+    def _metrica(nome, tipo, ajuda, valores):
+        linhas.append(f"# HELP {nome} {ajuda}")
+        linhas.append(f"# TYPE {nome} {tipo}")
+        for rotulos, valor in valores:
+            linhas.append(f"{nome}{{{rotulos}}} {valor}")
+
+    ferramentas = sorted(dados["ferramentas"].items())
+    _metrica("biblioteca_ferramenta_chamadas_total", "counter", "Chamadas de cada ferramenta.",
+             [(f'ferramenta="{nome}"', e["chamadas"]) for nome, e in ferramentas])
+    _metrica("biblioteca_ferramenta_erros_total", "counter", "Respostas com erro de cada ferramenta.",
+             [(f'ferramenta="{nome}"', e["erros"]) for nome, e in ferramentas])
+    _metrica("biblioteca_ferramenta_excecoes_total", "counter", "Exceções lançadas por cada ferramenta.",
+             [(f'ferramenta="{nome}"', e["excecoes"]) for nome, e in ferramentas])
+    _metrica("biblioteca_ferramenta_sql_segundos_total", "counter", "Tempo gasto no SQLite.",
+             [(f'ferramenta="{nome}"', e["tempo_sql_ms"] / 1000) for nome, e in ferramentas])
+    _metrica("biblioteca_ferramenta_sql_comandos_total", "counter", "Comandos SQL executados.",
+             [(f'ferramenta="{nome}"', e["comandos_sql"]) for nome, e in ferramentas])
+    _metrica("biblioteca_ferramenta_linhas_retornadas_total", "counter", "Linhas lidas do SQLite.",
+             [(f'ferramenta="{nome}"', e["linhas_retornadas"]) for nome, e in ferramentas])
+    _metrica("biblioteca_ferramenta_passos_vm_total", "counter",
+             "Instruções da VM do SQLite executadas (aproximação das linhas percorridas).",
+             [(f'ferramenta="{nome}"', e["passos_vm"]) for nome, e in ferramentas])
+    _metrica("biblioteca_ferramenta_cache_acertos_total", "counter",
+             "Chamadas respondidas pelo cache de respostas, sem executar a ferramenta.",
+             [(f'ferramenta="{nome}"', e["acertos_cache"]) for nome, e in ferramentas])
+
+    # Contadores das fontes registradas (caches), um rótulo por fonte
+    campos = {}
+    for fonte in sorted(_fontes):
+        for campo, valor in dados.get(fonte, {}).items():
+            if _numero(valor):
+                campos.setdefault(campo, []).append((f'fonte="{fonte}"', valor))
+    for campo, valores in sorted(campos.items()):
+        _metrica(f"biblioteca_fonte_{campo}", "gauge", f"Valor de '{campo}' informado pela fonte.", valores)
+
+    linhas.append("# HELP biblioteca_ferramenta_duracao_segundos Duração das chamadas de cada ferramenta.")
+    linhas.append("# TYPE biblioteca_ferramenta_duracao_segundos histogram")
+    for nome, e in ferramentas:
+        acumulado = 0
+        for limite, quantidade in zip(LIMITES_HISTOGRAMA + ("+Inf",), e["histograma"]):
+            acumulado += quantidade
+            linhas.append(f'biblioteca_ferramenta_duracao_segundos_bucket{{ferramenta="{nome}",le="{limite}"}} {acumulado}')
+        linhas.append(f'biblioteca_ferramenta_duracao_segundos_sum{{ferramenta="{nome}"}} {e["tempo_total_ms"] / 1000}')
+        linhas.append(f'biblioteca_ferramenta_duracao_segundos_count{{ferramenta="{nome}"}} {e["chamadas"]}')
+    return "\n".join(linhas) + "\n"
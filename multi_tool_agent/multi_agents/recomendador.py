@@ -0,0 +1,327 @@
+"""
+Recomendações pré-calculadas "quem leu este livro também leu".
+
+O estágio de construção roda fora do atendimento (cron ou linha de comando):
+
+    python -m multi_agents.recomendador [--reconstruir]
+
+Cada execução processa apenas os empréstimos com id acima da última marca
+salva em `recomendador_estado`, soma os pares de livros lidos pelo mesmo
+usuário na matriz esparsa `coemprestimos` e recalcula o top-K só dos livros
+afetados em `recomendacoes`. Os cálculos rodam em transações de leitura e as
+gravações em transações curtas, para não travar os empréstimos dos workers.
+A ferramenta do sugestor lê os vizinhos de um livro com uma única leitura
+pela chave primária.
+
+Os empréstimos são lidos pela visão `emprestimos_historico`, que inclui os
+já movidos para o arquivo (ver arquivamento.py).
+"""
+import argparse
+import logging
+import math
+import sys
+import time
+from collections import Counter
+
+from .banco import conexao, executar_transacao, transacao
+
+logger = logging.getLogger(__name__)
+
+# Quantos vizinhos são guardados por livro
+VIZINHOS_POR_LIVRO = 10
+# Empréstimos somados por lote; as contagens de cada lote são gravadas numa
+# transação curta, que os empréstimos dos workers esperam terminar
+LOTE_EMPRESTIMOS = 2000
+# Livros com o top-K gravado por transação
+LOTE_LIVROS = 200
+# Leitores com histórico maior que isso não geram pares (quase tudo co-ocorre)
+LIMITE_HISTORICO_LEITOR = 500
+# Candidatos de mesmo autor/gênero considerados além dos co-empréstimos
+CANDIDATOS_POR_CONTEUDO = 20
+# Peso da semelhança de conteúdo somado à similaridade de co-empréstimo (0 a 1)
+PESO_AUTOR = 0.5
+PESO_GENERO = 0.2
+
+_MARCA = "ultimo_emprestimo"
+
+
+def _ler_marca(conn) -> int:
+    linha = conn.execute(
+        "SELECT valor FROM recomendador_estado WHERE chave = ?", (_MARCA,)
+    ).fetchone()
+    return linha[0] if linha else 0
+
+
+def _vizinhos_calculados(conn, id_livro: int, autor_norm: str, genero_norm: str) -> list:
+    """Calcula o top-K de um livro a partir dos co-empréstimos e do autor/gênero."""
+    notas = {}
+    leitores = conn.execute(
+        "SELECT leitores FROM coemprestimos WHERE id_livro = ? AND id_outro = ?",
+        (id_livro, id_livro),
+    ).fetchone()
+    leitores = leitores[0] if leitores else 0
+
+    # Similaridade de cosseno entre os conjuntos de leitores (a diagonal guarda o total)
+    for id_outro, juntos, leitores_outro, autor_outro, genero_outro in conn.execute(
+        """
+        SELECT c.id_outro, c.leitores, d.leitores, l.autor_norm, l.genero_norm
+        FROM coemprestimos c
+        JOIN coemprestimos d ON d.id_livro = c.id_outro AND d.id_outro = c.id_outro
+        JOIN livros l ON l.id = c.id_outro
+        WHERE c.id_livro = ? AND c.id_outro <> c.id_livro
+        """,
+        (id_livro,),
+    ):
+        nota = juntos / math.sqrt(leitores * leitores_outro) if leitores and leitores_outro else 0.0
+        if autor_norm and autor_outro == autor_norm:
+            nota += PESO_AUTOR
+        if genero_norm and genero_outro == genero_norm:
+            nota += PESO_GENERO
+        notas[id_outro] = nota
+
+    # Livros do mesmo autor ou gênero completam a lista, inclusive sem empréstimos
+    for coluna, valor in (("autor_norm", autor_norm), ("genero_norm", genero_norm)):
+        if not valor:
+            continue
+        for id_outro, autor_outro, genero_outro in conn.execute(
+            f"SELECT id, autor_norm, genero_norm FROM livros WHERE {coluna} = ? AND id <> ? LIMIT ?",
+            (valor, id_livro, CANDIDATOS_POR_CONTEUDO),
+        ):
+            if id_outro not in notas:
+                notas[id_outro] = (PESO_AUTOR if autor_outro == autor_norm else 0.0) + (
+                    PESO_GENERO if genero_outro == genero_norm else 0.0
+                )
+
+    melhores = sorted(notas.items(), key=lambda item: (-item[1], item[0]))
+    return melhores[:VIZINHOS_POR_LIVRO]
+
+
+def _topk_pendentes(apos: int, limite: int) -> tuple:
+    # Só leitura: calcula o top-K do próximo bloco de livros pendentes
+    with transacao() as conn:
+        pendentes = conn.execute(
+            "SELECT id_livro, versao FROM recomendacoes_pendentes WHERE id_livro > ? ORDER BY id_livro LIMIT ?",
+            (apos, limite),
+        ).fetchall()
+        calculados = []
+        for id_livro, versao in pendentes:
+            linha = conn.execute(
+                "SELECT autor_norm, genero_norm FROM livros WHERE id = ?", (id_livro,)
+            ).fetchone()
+            vizinhos = _vizinhos_calculados(conn, id_livro, linha[0], linha[1]) if linha else []
+            calculados.append((id_livro, versao, vizinhos))
+    return calculados
+
+
+def _recalcular_pendentes(lote: int = LOTE_LIVROS) -> int:
+    """
+    Recalcula o top-K dos livros em `recomendacoes_pendentes`.
+
+    O cálculo roda em transações de leitura; cada bloco de `lote` livros é
+    gravado numa transação curta, para não segurar a escrita dos empréstimos.
+
+    Returns:
+        int: Quantidade de livros recalculados.
+    """
+    recalculados, apos = 0, 0
+    while True:
+        calculados = _topk_pendentes(apos, lote)
+        if not calculados:
+            return recalculados
+
+        def _gravar(conn):
+            for id_livro, versao, vizinhos in calculados:
+                # Um lote gravado depois da leitura aumentou a versão: o livro continua pendente
+                cursor = conn.execute(
+                    "DELETE FROM recomendacoes_pendentes WHERE id_livro = ? AND versao = ?", (id_livro, versao)
+                )
+                if cursor.rowcount != 1:
+                    continue
+                conn.execute("DELETE FROM recomendacoes WHERE id_livro = ?", (id_livro,))
+                conn.executemany(
+                    "INSERT INTO recomendacoes (id_livro, posicao, id_vizinho, pontuacao) VALUES (?, ?, ?, ?)",
+                    [(id_livro, posicao, id_vizinho, nota) for posicao, (id_vizinho, nota) in enumerate(vizinhos)],
+                )
+
+        executar_transacao(_gravar)
+        recalculados += len(calculados)
+        apos = calculados[-1][0]
+
+
+def _agregar(historicos: dict, marca_inicial: int, lote: int):
+    # Só leitura: soma os pares do próximo lote de empréstimos depois da marca
+    with transacao() as conn:
+        marca = _ler_marca(conn)
+        novos = conn.execute(
+            "SELECT id, id_usuario, id_livro FROM emprestimos_historico WHERE id > ? ORDER BY id LIMIT ?",
+            (marca, lote),
+        ).fetchall()
+        if not novos:
+            return None
+
+        # Cópias dos históricos alterados: só valem depois da gravação, que é
+        # descartada se outra execução tiver avançado a marca
+        alterados = {}
+        contagens = Counter()
+        for _, usuario, livro in novos:
+            historico = alterados.get(usuario)
+            if historico is None:
+                base = historicos.get(usuario)
+                if base is None:
+                    base = {
+                        id_livro for (id_livro,) in conn.execute(
+                            "SELECT DISTINCT id_livro FROM emprestimos_historico WHERE id_usuario = ? AND id <= ?",
+                            (usuario, marca_inicial),
+                        )
+                    }
+                historico = alterados[usuario] = set(base)
+            if livro in historico:
+                continue
+            contagens[(livro, livro)] += 1
+            if len(historico) < LIMITE_HISTORICO_LEITOR:
+                for outro in historico:
+                    contagens[(livro, outro)] += 1
+                    contagens[(outro, livro)] += 1
+            historico.add(livro)
+    return marca, novos[-1][0], len(novos), alterados, contagens
+
+
+def atualizar_recomendacoes(reconstruir: bool = False, lote: int = LOTE_EMPRESTIMOS) -> dict:
+    """
+    Processa os empréstimos novos e atualiza a tabela de recomendações.
+
+    Os pares de cada lote são somados numa transação de leitura. As contagens,
+    a nova marca e os livros afetados (em `recomendacoes_pendentes`) são
+    gravados juntos numa transação curta, então uma execução interrompida pode
+    ser retomada. O top-K dos livros pendentes é recalculado no final, em
+    blocos pequenos (ver `_recalcular_pendentes`).
+
+    Args:
+        reconstruir (bool): Descarta a matriz e recomeça do primeiro empréstimo.
+        lote (int): Quantidade de empréstimos por transação.
+
+    Returns:
+        dict: {"emprestimos_processados": int, "livros_atualizados": int, "ultimo_emprestimo": int}
+    """
+    if reconstruir:
+        def _zerar(conn):
+            conn.execute("DELETE FROM coemprestimos")
+            conn.execute("DELETE FROM recomendacoes")
+            conn.execute("DELETE FROM recomendacoes_pendentes")
+            conn.execute("DELETE FROM recomendador_estado WHERE chave = ?", (_MARCA,))
+
+        executar_transacao(_zerar)
+
+    with conexao() as conn:
+        marca_inicial = _ler_marca(conn)
+    # Livros já lidos por cada usuário, carregados sob demanda e mantidos durante a execução
+    historicos = {}
+    processados = 0
+
+    while True:
+        agregado = _agregar(historicos, marca_inicial, lote)
+        if agregado is None:
+            break
+        marca, nova_marca, quantidade, alterados, contagens = agregado
+
+        def _gravar(conn):
+            if _ler_marca(conn) != marca:
+                return False
+            conn.executemany(
+                """
+                INSERT INTO coemprestimos (id_livro, id_outro, leitores) VALUES (?, ?, ?)
+                ON CONFLICT (id_livro, id_outro) DO UPDATE SET leitores = leitores + excluded.leitores
+                """,
+                [(a, b, total) for (a, b), total in contagens.items()],
+            )
+            conn.executemany(
+                """
+                INSERT INTO recomendacoes_pendentes (id_livro) VALUES (?)
+                ON CONFLICT (id_livro) DO UPDATE SET versao = versao + 1
+                """,
+                [(id_livro,) for id_livro in {a for a, _ in contagens}],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO recomendador_estado (chave, valor) VALUES (?, ?)", (_MARCA, nova_marca)
+            )
+            return True
+
+        if not executar_transacao(_gravar):
+            # Outra execução processou este lote: recomeça da marca atual
+            historicos.clear()
+            with conexao() as conn:
+                marca_inicial = _ler_marca(conn)
+            continue
+        historicos.update(alterados)
+        processados += quantidade
+        logger.info("Recomendações: %d empréstimos processados", processados)
+
+    atualizados = _recalcular_pendentes()
+    with conexao() as conn:
+        ultimo = _ler_marca(conn)
+    return {
+        "emprestimos_processados": processados,
+        "livros_atualizados": atualizados,
+        "ultimo_emprestimo": ultimo,
+    }
+
+
+def livros_semelhantes(conn, id_livro: int, limite: int = VIZINHOS_POR_LIVRO) -> list:
+    """
+    Lê os vizinhos pré-calculados de um livro, do mais para o menos parecido.
+
+    Returns:
+        list: Tuplas (titulo, autor, genero, disponibilidade, exemplares_disponiveis, pontuacao).
+    """
+    return conn.execute(
+        """
+        SELECT l.titulo, l.autor, l.genero, l.disponibilidade, l.exemplares_disponiveis, r.pontuacao
+        FROM recomendacoes r
+        JOIN livros l ON l.id = r.id_vizinho
+        WHERE r.id_livro = ?
+        ORDER BY r.posicao
+        LIMIT ?
+        """,
+        (id_livro, limite),
+    ).fetchall()
+
+
+def calcular_semelhantes(conn, id_livro: int, limite: int = VIZINHOS_POR_LIVRO) -> list:
+    """
+    Calcula na hora os vizinhos de um livro que ainda não passou pelo
+    estágio de construção (por exemplo, recém-cadastrado).
+
+    Returns:
+        list: Tuplas no mesmo formato de `livros_semelhantes`.
+    """
+    linha = conn.execute(
+        "SELECT autor_norm, genero_norm FROM livros WHERE id = ?", (id_livro,)
+    ).fetchone()
+    if linha is None:
+        return []
+    resultado = []
+    for id_vizinho, nota in _vizinhos_calculados(conn, id_livro, linha[0], linha[1])[:limite]:
+        livro = conn.execute(
+            "SELECT titulo, autor, genero, disponibilidade, exemplares_disponiveis FROM livros WHERE id = ?",
+            (id_vizinho,),
+        ).fetchone()
+        resultado.append(livro + (nota,))
+    return resultado
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Atualiza as recomendações pré-calculadas")
+    parser.add_argument("--reconstruir", action="store_true", help="recomeça do primeiro empréstimo")
+    parser.add_argument("--lote", type=int, default=LOTE_EMPRESTIMOS)
+    args = parser.parse_args(argv)
+    inicio = time.perf_counter()
+    resultado = atualizar_recomendacoes(args.reconstruir, args.lote)
+    print(
+        f"{resultado['emprestimos_processados']} empréstimos processados, "
+        f"{resultado['livros_atualizados']} livros atualizados em {time.perf_counter() - inicio:.1f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+from .armazenamento import Armazenamento
+from .banco import localizar_usuario
+from .cache import CacheLRU
+from .esquema import normalizar
+from .metricas import registrar_fonte
+
+# Usuários já identificados em cada sessão do ADK, por (id da sessão, nome normalizado)
+usuarios_resolvidos = CacheLRU(capacidade=10000, ttl=1800.0)
+registrar_fonte("cache_usuarios", usuarios_resolvidos.estatisticas)
+
+
+def id_sessao(tool_context) -> str:
+    """Retorna o id da sessão do ADK a partir do contexto da ferramenta, se houver."""
+    sessao = getattr(tool_context, "session", None)
+    return getattr(sessao, "id", None)
+
+
+def _nome_confere(nome_completo: str, nome_usuario: str) -> bool:
+    completo, informado = normalizar(nome_completo), normalizar(nome_usuario)
+    return completo == informado or completo.startswith(informado + " ")
+
+
+def _usuario_por_id(conn, id_usuario: int):
+    if isinstance(conn, Armazenamento):
+        return conn.obter_usuario(id_usuario)
+    return conn.execute("SELECT id, nome FROM usuarios WHERE id = ?", (id_usuario,)).fetchone()
+
+
+def _usuario_por_nome(conn, nome_usuario: str):
+    if isinstance(conn, Armazenamento):
+        return conn.localizar_usuario(nome_usuario)
+    return localizar_usuario(conn, nome_usuario)
+
+
+def resolver_usuario(conn, nome_usuario: str, tool_context=None, id_usuario: int = 0):
+    """
+    Identifica o usuário reaproveitando o que já foi resolvido na sessão.
+
+    Se `id_usuario` for informado (ex.: devolvido por usuario_existe), confere
+    pela chave primária se ele corresponde ao nome. Caso contrário, consulta o
+    cache da sessão antes de buscar pelo nome no banco.
+
+    Args:
+        conn: Conexão do pool ou um `Armazenamento` (armazenamento.py).
+
+    Returns:
+        tuple | None: (id, nome) do usuário.
+    """
+    if id_usuario:
+        row = _usuario_por_id(conn, id_usuario)
+        if row and (not nome_usuario or _nome_confere(row[1], nome_usuario)):
+            lembrar_usuario(tool_context, nome_usuario, row)
+            return row
+    sessao = id_sessao(tool_context)
+    chave = (sessao, normalizar(nome_usuario))
+    if sessao is not None:
+        row = usuarios_resolvidos.obter(chave)
+        if row:
+            return row
+    row = _usuario_por_nome(conn, nome_usuario)
+    if row and sessao is not None:
+        usuarios_resolvidos.definir(chave, tuple(row))
+    return row
+
+
+def lembrar_usuario(tool_context, nome_usuario: str, row) -> None:
+    sessao = id_sessao(tool_context)
+    if sessao is not None and nome_usuario:
+        usuarios_resolvidos.definir((sessao, normalizar(nome_usuario)), tuple(row))
+
+
+def esquecer_usuarios(sessao: str = None, id_usuario: int = None) -> int:
+    """
+    Invalida usuários resolvidos: de uma sessão, de um usuário (ex.: após
+    alterar ou remover o cadastro) ou, sem argumentos, todos.
+
+    Returns:
+        int: Quantidade de entradas removidas.
+    """
+    if sessao is None and id_usuario is None:
+        quantidade = len(usuarios_resolvidos)
+        usuarios_resolvidos.limpar()
+        return quantidade
+    return usuarios_resolvidos.invalidar_se(
+        lambda chave, row: (sessao is None or chave[0] == sessao)
+        and (id_usuario is None or row[0] == id_usuario)
+    )
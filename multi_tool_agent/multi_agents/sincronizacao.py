@@ -0,0 +1,139 @@
+"""
+Invalidação dos caches em memória entre processos.
+
+Com vários workers servindo o mesmo banco, cada processo tem os seus caches
+(livros do acervo e respostas das ferramentas), e um empréstimo feito em um
+worker não passa pelos caches dos outros. Os gatilhos da migração 9 anotam
+em `alteracoes_livros` o título de cada livro alterado; antes de usar um
+cache, o processo confere (no máximo a cada INTERVALO_SINCRONIZACAO) se o
+banco mudou, com `PRAGMA data_version`, e, se mudou, descarta as entradas
+dos livros anotados desde a última verificação.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .banco import TIMEOUT_OCUPADO_MS, conexao, obter_pool
+from .esquema import corrigir_normalizacao
+from .metricas import registrar_fonte
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_SINCRONIZACAO = float(os.environ.get("BIBLIOTECA_SINCRONIZACAO_MS", "100")) / 1000
+
+# Funções chamadas com o conjunto de títulos normalizados alterados, ou com
+# None quando não dá para saber quais mudaram (o cache inteiro deve ser descartado)
+_invalidadores = []
+
+
+def registrar_invalidador(funcao) -> None:
+    _invalidadores.append(funcao)
+
+
+class Sincronizador:
+    """
+    Acompanha as alterações de livros feitas por qualquer conexão ao banco.
+
+    Usa uma conexão própria, fora do pool: `PRAGMA data_version` só muda
+    quando outra conexão faz commit, então a mesma conexão precisa ser
+    consultada a cada verificação.
+    """
+
+    def __init__(self, intervalo: float = INTERVALO_SINCRONIZACAO):
+        self.intervalo = intervalo
+        self._trava = threading.Lock()
+        self._conn = None
+        self._caminho = None
+        self._versao = None
+        self._ultima_seq = 0
+        self._proxima = 0.0
+        self.verificacoes = 0
+        self.alteracoes = 0
+        self.descartes_completos = 0
+
+    def _abrir(self, caminho: str) -> None:
+        if self._conn is not None:
+            self._conn.close()
+        # Uma conexão do pool garante que a migração 9 já foi aplicada
+        with conexao():
+            pass
+        self._conn = sqlite3.connect(
+            caminho, timeout=TIMEOUT_OCUPADO_MS / 1000, isolation_level=None, check_same_thread=False
+        )
+        self._caminho = caminho
+        # data_version antes de MAX(seq): um commit entre as duas leituras aparece na próxima verificação
+        self._versao = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._ultima_seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM alteracoes_livros").fetchone()[0]
+
+    def verificar(self) -> None:
+        """Invalida os caches se outro processo alterou livros desde a última verificação."""
+        agora = time.monotonic()
+        if agora < self._proxima:
+            return
+        # Se outra thread já está verificando, segue com o cache atual
+        if not self._trava.acquire(blocking=False):
+            return
+        try:
+            self._proxima = agora + self.intervalo
+            self._verificar()
+        except sqlite3.Error as erro:
+            # A ferramenta que chamou ainda pode funcionar (e relatar o erro) sozinha
+            logger.warning("Falha ao verificar alterações no banco: %s", erro)
+        finally:
+            self._trava.release()
+
+    def _verificar(self) -> None:
+        caminho = obter_pool().caminho
+        if caminho != self._caminho:
+            # Primeira verificação ou banco trocado por configurar_banco: os caches
+            # podem ter entradas de outro banco
+            primeira = self._caminho is None
+            self._abrir(caminho)
+            if not primeira:
+                self._notificar(None)
+            return
+        self.verificacoes += 1
+        versao = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if versao == self._versao:
+            return
+        self._versao = versao
+        # Livros ou usuários gravados por outro programa, sem as colunas normalizadas
+        with conexao() as conn:
+            corrigir_normalizacao(conn)
+        linhas = self._conn.execute(
+            "SELECT seq, titulo_norm FROM alteracoes_livros WHERE seq > ? ORDER BY seq",
+            (self._ultima_seq,),
+        ).fetchall()
+        if not linhas:
+            return
+        # Buraco na sequência: as alterações mais antigas já foram descartadas.
+        # Uma alteração sem título (ver esquema.sincronizar_texto) também vale para todos os livros.
+        completo = linhas[0][0] > self._ultima_seq + 1 or any(titulo is None for _, titulo in linhas)
+        self._ultima_seq = linhas[-1][0]
+        self.alteracoes += len(linhas)
+        self._notificar(None if completo else {titulo for _, titulo in linhas})
+
+    def _notificar(self, titulos) -> None:
+        if titulos is None:
+            self.descartes_completos += 1
+        for funcao in _invalidadores:
+            funcao(titulos)
+
+    def estatisticas(self) -> dict:
+        return {
+            "verificacoes": self.verificacoes,
+            "alteracoes": self.alteracoes,
+            "descartes_completos": self.descartes_completos,
+            "ultima_seq": self._ultima_seq,
+        }
+
+
+_sincronizador = Sincronizador()
+registrar_fonte("sincronizacao", _sincronizador.estatisticas)
+
+
+def sincronizar() -> None:
+    """Aplica aos caches deste processo as alterações de livros feitas por outros processos."""
+    _sincronizador.verificar()
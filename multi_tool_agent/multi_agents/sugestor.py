@@ -1,12 +1,25 @@
-import sqlite3
-from google.adk.agents import Agent
+import functools
 
-def sugerir_livros_por_autor(autor: str) -> dict:
+from .assincrono import assincrona
+from .banco import conexao, localizar_livro
+from .catalogo import obter_catalogo
+from .esquema import normalizar
+from .memoria import memorizar
+from .metricas import instrumentar
+from .recomendador import calcular_semelhantes, livros_semelhantes
+
+LIMITE_SUGESTOES = 20
+
+@instrumentar
+@memorizar()
+def sugerir_livros_por_autor(autor: str, titulo_atual: str = "", limite: int = LIMITE_SUGESTOES) -> dict:
     """
     Sugere livros do mesmo autor disponíveis no acervo da biblioteca.
     
     Args:
         autor (str): Nome do autor para buscar livros relacionados.
+        titulo_atual (str): Livro que o usuário acabou de citar, omitido das sugestões.
+        limite (int): Quantidade máxima de sugestões (padrão 20).
         
     Returns:
         dict: {
@@ -16,18 +29,21 @@ def sugerir_livros_por_autor(autor: str) -> dict:
         }
     """
     try:
-        conn = sqlite3.connect("./multi_agents/biblioteca.db")
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT titulo, disponibilidade, exemplares_disponiveis
-            FROM livros
-            WHERE LOWER(autor) = LOWER(?)
-            ORDER BY titulo
-        """, (autor,))
+        catalogo = obter_catalogo()
+        if catalogo is not None:
+            linhas = catalogo.sugerir_por_autor(normalizar(autor), normalizar(titulo_atual) or "", max(1, int(limite)))
+        else:
+            with conexao() as conn:
+                linhas = conn.execute("""
+                    SELECT titulo, disponibilidade, exemplares_disponiveis
+                    FROM livros
+                    WHERE autor_norm = ? AND titulo_norm <> ?
+                    ORDER BY titulo
+                    LIMIT ?
+                """, (normalizar(autor), normalizar(titulo_atual) or "", max(1, int(limite)))).fetchall()
         
         livros = []
-        for row in cursor.fetchall():
+        for row in linhas:
             titulo, disponibilidade, exemplares = row
             livros.append({
                 "titulo": titulo,
@@ -35,8 +51,6 @@ def sugerir_livros_por_autor(autor: str) -> dict:
                 "exemplares_disponiveis": exemplares
             })
         
-        conn.close()
-        
         if livros:
             return {
                 "status": "success",
@@ -59,12 +73,16 @@ def sugerir_livros_por_autor(autor: str) -> dict:
         
 
 
-def sugerir_livros_por_genero(genero: str) -> dict:
+@instrumentar
+@memorizar()
+def sugerir_livros_por_genero(genero: str, titulo_atual: str = "", limite: int = LIMITE_SUGESTOES) -> dict:
     """
     Sugere livros do mesmo gênero disponíveis no acervo da biblioteca.
 
     Args:
         genero (str): Nome do gênero para buscar livros relacionados.
+        titulo_atual (str): Livro que o usuário acabou de citar, omitido das sugestões.
+        limite (int): Quantidade máxima de sugestões (padrão 20).
 
     Returns:
         dict: {
@@ -74,18 +92,21 @@ def sugerir_livros_por_genero(genero: str) -> dict:
         }
     """
     try:
-        conn = sqlite3.connect("./multi_agents/biblioteca.db")
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT titulo, disponibilidade, exemplares_disponiveis
-            FROM livros
-            WHERE LOWER(genero) = LOWER(?)
-            ORDER BY titulo
-        """, (genero,))
+        catalogo = obter_catalogo()
+        if catalogo is not None:
+            linhas = catalogo.sugerir_por_genero(normalizar(genero), normalizar(titulo_atual) or "", max(1, int(limite)))
+        else:
+            with conexao() as conn:
+                linhas = conn.execute("""
+                    SELECT titulo, disponibilidade, exemplares_disponiveis
+                    FROM livros
+                    WHERE genero_norm = ? AND titulo_norm <> ?
+                    ORDER BY titulo
+                    LIMIT ?
+                """, (normalizar(genero), normalizar(titulo_atual) or "", max(1, int(limite)))).fetchall()
         
         livros = []
-        for row in cursor.fetchall():
+        for row in linhas:
             titulo, disponibilidade, exemplares = row
             livros.append({
                 "titulo": titulo,
@@ -93,8 +114,6 @@ def sugerir_livros_por_genero(genero: str) -> dict:
                 "exemplares_disponiveis": exemplares
             })
         
-        conn.close()
-        
         if livros:
             return {
                 "status": "success",
@@ -115,23 +134,98 @@ def sugerir_livros_por_genero(genero: str) -> dict:
             "error_message": f"Erro ao buscar sugestões: {str(e)}"
         }
 
-agente_sugestor = Agent(
-    name="sugestor_leituras",
-    model="gemini-2.0-flash",
-    description="Agente especializado em sugerir livros do mesmo autor ou gênero",
-    instruction=(
-        "Você é um assistente de biblioteca especializado em recomendações de leitura.\n"
-        "Sua função é sugerir outros livros do mesmo autor quando um usuário demonstrar interesse em uma obra.\n\n"
-        
-        "Instruções de funcionamento:\n"
-        "1. Sempre que um usuário mencionar um livro ou autor ou gênero, ofereça para verificar se há outras obras do mesmo autor ou do gênero que o usuario informou.\n"
-        "2. Utiliza a função sugerir_livros_por_genero caso o usuário mencione um gênero e a função sugerir_livros_por_autor caso mencione um autor.\n"
-        "3. Se não encontrar outros livros do autor, informe educadamente e sugira consultar o acervo completo.\n"
-        "4. Mantenha um tom amigável e encorajador para promover a leitura.\n\n"
-        
-        "Exemplo de interação:\n"
-        "Usuário: 'Estou interessado em livros de Machado de Assis'\n"
-        "Você: 'Encontrei 3 obras de Machado de Assis em nosso acervo: Dom Casmurro (disponível), Memórias Póstumas de Brás Cubas (disponível), e Quincas Borba (indisponível no momento).'"
-    ),
-    tools=[sugerir_livros_por_autor,sugerir_livros_por_genero],
-)
\ No newline at end of file
+@instrumentar
+@memorizar()
+def sugerir_livros_semelhantes(titulo: str, limite: int = 5) -> dict:
+    """
+    Sugere livros parecidos com um título: lidos pelos mesmos leitores,
+    do mesmo autor ou do mesmo gênero. O próprio livro nunca é sugerido.
+
+    Args:
+        titulo (str): Título do livro de que o usuário gostou.
+        limite (int): Quantidade máxima de sugestões (padrão 5).
+
+    Returns:
+        dict: {
+            "status": "success"|"error",
+            "livros": [{"titulo": str, "autor": str, "genero": str, "disponibilidade": bool, "exemplares_disponiveis": int}] | None,
+            "error_message": str | None
+        }
+    """
+    try:
+        limite = max(1, min(int(limite), LIMITE_SUGESTOES))
+        with conexao() as conn:
+            livro = localizar_livro(conn, titulo)
+            if not livro:
+                return {
+                    "status": "error",
+                    "livros": None,
+                    "error_message": f"Livro '{titulo}' não encontrado no acervo."
+                }
+            linhas = livros_semelhantes(conn, livro[0], limite)
+            if not linhas:
+                linhas = calcular_semelhantes(conn, livro[0], limite)
+
+        livros = []
+        for titulo_vizinho, autor, genero, disponibilidade, exemplares, _ in linhas:
+            livros.append({
+                "titulo": titulo_vizinho,
+                "autor": autor,
+                "genero": genero,
+                "disponibilidade": bool(disponibilidade),
+                "exemplares_disponiveis": exemplares
+            })
+
+        if livros:
+            return {
+                "status": "success",
+                "livros": livros,
+                "message": f"Encontrados {len(livros)} livros parecidos com {livro[1]}"
+            }
+        else:
+            return {
+                "status": "success",
+                "livros": [],
+                "message": f"Nenhum livro parecido com {livro[1]} encontrado no acervo."
+            }
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "livros": None,
+            "error_message": f"Erro ao buscar sugestões: {str(e)}"
+        }
+
+@functools.cache
+def criar_agente_sugestor():
+    """Cria (uma única vez) o agente de sugestões de leitura; o ADK só é importado aqui."""
+    from google.adk.agents import Agent
+
+    return Agent(
+        name="sugestor_leituras",
+        model="gemini-2.0-flash",
+        description="Agente especializado em sugerir livros do mesmo autor ou gênero",
+        instruction=(
+            "Você é um assistente de biblioteca especializado em recomendações de leitura.\n"
+            "Sua função é sugerir outros livros do mesmo autor quando um usuário demonstrar interesse em uma obra.\n\n"
+            
+            "Instruções de funcionamento:\n"
+            "1. Sempre que um usuário mencionar um livro ou autor ou gênero, ofereça para verificar se há outras obras do mesmo autor ou do gênero que o usuario informou.\n"
+            "2. Utiliza a função sugerir_livros_por_genero caso o usuário mencione um gênero e a função sugerir_livros_por_autor caso mencione um autor. Se ele também citou um livro, passe-o em titulo_atual para não sugerir o mesmo livro. "
+            "Quando o usuário perguntar o que mais pode gostar a partir de um livro, use sugerir_livros_semelhantes com o título.\n"
+            "3. Se não encontrar outros livros do autor, informe educadamente e sugira consultar o acervo completo.\n"
+            "4. Mantenha um tom amigável e encorajador para promover a leitura.\n\n"
+            
+            "Exemplo de interação:\n"
+            "Usuário: 'Estou interessado em livros de Machado de Assis'\n"
+            "Você: 'Encontrei 3 obras de Machado de Assis em nosso acervo: Dom Casmurro (disponível), Memórias Póstumas de Brás Cubas (disponível), e Quincas Borba (indisponível no momento).'"
+        ),
+        tools=[assincrona(sugerir_livros_por_autor),assincrona(sugerir_livros_por_genero),assincrona(sugerir_livros_semelhantes)],
+    )
+
+
+def __getattr__(nome):
+    # Compatibilidade com o antigo atributo do módulo, criado sob demanda
+    if nome == "agente_sugestor":
+        return criar_agente_sugestor()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
\ No newline at end of file